@@ -0,0 +1,288 @@
+"""
+Benchmarks for the crypto, scanning and FHE hot paths.
+
+Generates a synthetic repository in a temporary directory and measures:
+    - encrypt_source_to_encrypted: files/s and MB/s (full, parallel, no-op incremental)
+    - single-file decrypt latency per file size
+    - AEAD backend/cipher throughput (cryptography vs pycryptodome, AES vs ChaCha20)
+    - RSA unwrap of aes_key.bin (private key load + decrypt)
+    - RepoIgnore.is_ignored ops/s
+    - FHE context build, encrypt, sum/dot and decrypt latency per parameter set
+
+Results are written as JSON (benchmarks/results/<timestamp>.json by
+default) so runs can be compared with --compare.
+
+Everything runs on the synthetic repository; no real source/ or keys are
+needed. RSA timings use the real KeyManager from source/crypto when the
+checkout has it, otherwise a generated throwaway RSA-4096 key pair
+(benchmarks/throwaway_keys.py); the report's "key_manager" field says
+which.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --files 2000 --workers 0 --skip-fhe
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/old.json
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+import tempfile
+from pathlib import Path
+
+# Run against the working tree (source/ first, as the root scripts do)
+repo_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(repo_root))
+sys.path.insert(0, str(repo_root / "source"))
+
+from benchmarks import throwaway_keys
+from benchmarks.synthetic_repo import generate_repo
+
+
+FHE_PARAMETER_SETS = [
+    {'poly_modulus_degree': 4096, 'coeff_mod_bit_sizes': [40, 20, 40], 'global_scale': 2 ** 20},
+    {'poly_modulus_degree': 8192, 'coeff_mod_bit_sizes': [60, 40, 40, 60], 'global_scale': 2 ** 40},
+    {'poly_modulus_degree': 16384, 'coeff_mod_bit_sizes': [60, 40, 40, 40, 40, 60], 'global_scale': 2 ** 40},
+]
+
+DECRYPT_SIZES = [4 * 1024, 64 * 1024, 1024 * 1024]
+
+
+def _timed(fn, repeat=5):
+    """Run fn repeat times; return (median seconds, last result)."""
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times), result
+
+
+@contextlib.contextmanager
+def _in_directory(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def bench_encrypt(stats, workers):
+    """Full, parallel and no-op incremental encrypt of ./source."""
+    import manage_encryption
+
+    def run(**kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            manage_encryption.encrypt_source_to_encrypted(**kwargs)
+
+    mb = stats['bytes'] / (1024 * 1024)
+    run()  # warm-up: generates RSA keys, fills the page cache
+
+    results = {}
+    for label, kwargs in (("sequential", {'workers': 1}),
+                          (f"workers_{workers}", {'workers': workers})):
+        seconds, _ = _timed(lambda: run(**kwargs), repeat=3)
+        results[label] = {
+            'seconds': seconds,
+            'files_per_s': stats['files'] / seconds,
+            'mb_per_s': mb / seconds,
+        }
+
+    seconds, _ = _timed(lambda: run(workers=1, incremental=True), repeat=3)
+    results['incremental_noop'] = {'seconds': seconds,
+                                   'files_per_s': stats['files'] / seconds}
+    return results
+
+
+def bench_decrypt(aes_key):
+    """Latency of decrypting one .enc file into memory, per size."""
+    from mvp17.crypto.file_encryptor import FileEncryptor
+
+    encryptor = FileEncryptor(aes_key)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in DECRYPT_SIZES:
+            path = Path(tmp) / f"{size}.enc"
+            path.write_bytes(encryptor.encrypt_bytes(os.urandom(size)))
+            seconds, _ = _timed(lambda: encryptor.read_file(path), repeat=20)
+            results[str(size)] = {'latency_ms': seconds * 1000,
+                                  'mb_per_s': size / (1024 * 1024) / seconds}
+    return results
+
+
+def bench_aead(size=8 * 1024 * 1024):
+    """MB/s of a v2 encrypt + decrypt round trip per AEAD backend and cipher."""
+    from mvp17.crypto.file_encryptor import CIPHERS, FileEncryptor, available_backends, fastest_backend
+
+    data = os.urandom(size)
+    results = {'selected': fastest_backend()}
+    for backend in available_backends():
+        for cipher in CIPHERS:
+            encryptor = FileEncryptor(os.urandom(32), compression="none",
+                                      cipher=cipher, backend=backend)
+            seconds, _ = _timed(lambda: encryptor.decrypt_bytes(encryptor.encrypt_bytes(data)))
+            results[f"{backend}/{cipher}"] = {'mb_per_s': 2 * size / (1024 * 1024) / seconds}
+    return results
+
+
+def bench_unwrap():
+    """RSA private key load and AES key unwrap (no key agent)."""
+    from crypto.key_manager import KeyManager
+
+    with open(Path("encrypted") / "aes_key.bin", 'rb') as f:
+        wrapped = f.read()
+
+    def load():
+        key_manager = KeyManager()
+        key_manager.load_private_key()
+        return key_manager
+
+    load_seconds, key_manager = _timed(load, repeat=5)
+    unwrap_seconds, aes_key = _timed(lambda: key_manager.decrypt_data(wrapped), repeat=5)
+    return {'load_private_key_ms': load_seconds * 1000,
+            'decrypt_ms': unwrap_seconds * 1000}, aes_key
+
+
+def bench_repoignore(paths=50000):
+    """RepoIgnore.is_ignored throughput on a mix of kept and ignored paths."""
+    from mvp17.utils.repoignore import RepoIgnore
+
+    repoignore = RepoIgnore(".repoignore")
+    rng = random.Random(0)
+    dirs = ["pkg1", "pkg2/sub", "build/lib", "venv/lib/site-packages", "web/node_modules/x"]
+    names = ["module.py", "run.log", "README.md", "data.json"]
+    samples = [f"{rng.choice(dirs)}/{rng.choice(names)}" for _ in range(paths)]
+
+    seconds, ignored = _timed(lambda: sum(map(repoignore.is_ignored, samples)), repeat=3)
+    return {'ops_per_s': paths / seconds, 'ignored_fraction': ignored / paths}
+
+
+def bench_fhe(vector_size):
+    """Context build and per-operation latency for each FHE parameter set."""
+    from mvp17.crypto.fhe_engine import FHEEngine
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    values = rng.random(vector_size)
+    other = rng.random(vector_size)
+
+    results = {}
+    for params in FHE_PARAMETER_SETS:
+        engine = FHEEngine(**params)
+        context_seconds, _ = _timed(engine.create_context, repeat=1)
+        encrypt_seconds, encrypted = _timed(lambda: engine.encrypt(values), repeat=3)
+        sum_seconds, _ = _timed(lambda: engine.sum(encrypted), repeat=3)
+        dot_seconds, dot = _timed(lambda: engine.dot(encrypted, other), repeat=3)
+        decrypt_seconds, _ = _timed(lambda: engine.decrypt(dot), repeat=3)
+        results[str(params['poly_modulus_degree'])] = {
+            'params': params,
+            'ciphertexts': encrypted.ciphertext_count,
+            'context_ms': context_seconds * 1000,
+            'encrypt_ms': encrypt_seconds * 1000,
+            'sum_ms': sum_seconds * 1000,
+            'dot_ms': dot_seconds * 1000,
+            'decrypt_ms': decrypt_seconds * 1000,
+        }
+    return results
+
+
+def compare(current, baseline_path):
+    """Print numeric results that moved by more than 10% against a baseline run."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def flatten(data, prefix=""):
+        for key, value in data.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)):
+                yield f"{prefix}{key}", value
+
+    old = dict(flatten(baseline['results']))
+    print(f"\n📊 Compared with {baseline_path}:")
+    for name, value in flatten(current['results']):
+        if old.get(name):
+            change = (value - old[name]) / old[name] * 100
+            if abs(change) >= 10:
+                print(f"   {name}: {old[name]:.4g} -> {value:.4g} ({change:+.0f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark crypto, scanning and FHE hot paths')
+    parser.add_argument('--files', type=int, default=500, help='Synthetic repo file count')
+    parser.add_argument('--median-size', type=int, default=4096, help='Median file size (bytes)')
+    parser.add_argument('--sigma', type=float, default=1.0, help='Log-normal size spread')
+    parser.add_argument('--ignore-ratio', type=float, default=0.2,
+                       help='Ignored files as a fraction of --files')
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                       help='Workers for the parallel encrypt run (0 = all cores)')
+    parser.add_argument('--fhe-size', type=int, default=10000, help='FHE vector length')
+    parser.add_argument('--skip-fhe', action='store_true', help='Skip the FHE benchmarks')
+    parser.add_argument('-o', '--output', help='Result file (default benchmarks/results/<time>.json)')
+    parser.add_argument('--compare', help='Earlier result file to compare against')
+    args = parser.parse_args()
+
+    workers = args.workers or os.cpu_count() or 1
+    output = Path(args.output) if args.output else \
+        repo_root / "benchmarks" / "results" / time.strftime("%Y%m%d-%H%M%S.json")
+
+    # Bypass a running key agent so unwrap timings measure RSA
+    os.environ["MVP17_KEY_AGENT_SOCK"] = os.devnull + ".absent"
+    key_manager = throwaway_keys.install_if_missing()
+    if key_manager == "throwaway":
+        print("🔑 source/crypto/key_manager.py not found - using a throwaway RSA-4096 key")
+
+    report = {
+        'timestamp': time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'key_manager': key_manager,
+        'config': vars(args),
+        'results': {},
+    }
+    results = report['results']
+
+    with tempfile.TemporaryDirectory(prefix="mvp17-bench-") as tmp:
+        print(f"📁 Generating synthetic repository ({args.files} files)...")
+        stats = generate_repo(tmp, files=args.files, median_size=args.median_size,
+                              sigma=args.sigma, ignore_ratio=args.ignore_ratio)
+        report['repo'] = stats
+
+        with _in_directory(tmp):
+            print("🔐 Encrypt...")
+            results['encrypt'] = bench_encrypt(stats, workers)
+            print("🔑 RSA unwrap...")
+            results['unwrap'], aes_key = bench_unwrap()
+            print("🔓 Decrypt...")
+            results['decrypt'] = bench_decrypt(aes_key)
+            print("🧮 AEAD backends...")
+            results['aead'] = bench_aead()
+            print("🚫 RepoIgnore...")
+            results['repoignore'] = bench_repoignore()
+
+    if not args.skip_fhe:
+        print("🔬 FHE...")
+        results['fhe'] = bench_fhe(args.fhe_size)
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Results written to {output}")
+    print(json.dumps(results, indent=2))
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Synthetic repository generator for the benchmarks.
+
+Creates a source/ tree of Python-like files with a log-normal size
+distribution, plus a share of files that .repoignore excludes (build
+output, logs, a vendored venv), so scanning and encryption see a realistic
+mix of kept and pruned paths.
+"""
+
+import math
+import random
+from pathlib import Path
+from typing import Dict, Union
+
+
+IGNORE_PATTERNS = [
+    "# Generated by benchmarks/synthetic_repo.py",
+    "*.log",
+    "build/",
+    "venv/",
+    "**/node_modules/",
+]
+
+_WORDS = ["encrypt", "decrypt", "manifest", "segment", "context", "vector",
+          "search", "index", "token", "cipher", "key", "nonce", "stream",
+          "worker", "scanner", "pattern", "result", "buffer", "cache", "path"]
+
+
+def _python_source(rng: random.Random, size: int) -> bytes:
+    """Roughly size bytes of plausible Python source."""
+    lines = []
+    length = 0
+    while length < size:
+        name = "_".join(rng.sample(_WORDS, 2))
+        line = (f"def {name}_{rng.randrange(10000)}(value):\n"
+                f"    return value * {rng.randrange(1, 100)}  # {rng.choice(_WORDS)}\n\n")
+        lines.append(line)
+        length += len(line)
+    return "".join(lines).encode("utf-8")[:size]
+
+
+def generate_repo(root: Union[str, Path], files: int = 500,
+                  median_size: int = 4096, sigma: float = 1.0,
+                  max_size: int = 2 * 1024 * 1024, ignore_ratio: float = 0.2,
+                  seed: int = 0) -> Dict[str, int]:
+    """
+    Write a synthetic source/ tree and .repoignore under root.
+
+    Args:
+        root: Directory to create the repository in
+        files: Number of kept (non-ignored) files
+        median_size: Median file size in bytes (log-normal distribution)
+        sigma: Log-normal shape; larger means a longer tail of big files
+        max_size: Upper bound on a single file's size
+        ignore_ratio: Extra ignored files as a fraction of files
+        seed: RNG seed, so runs are comparable
+
+    Returns:
+        Counts and total bytes of kept and ignored files
+    """
+    rng = random.Random(seed)
+    root = Path(root)
+    source_dir = root / "source"
+    source_dir.mkdir(parents=True, exist_ok=True)
+    (root / ".repoignore").write_text("\n".join(IGNORE_PATTERNS) + "\n")
+
+    stats = {"files": 0, "bytes": 0, "ignored_files": 0, "ignored_bytes": 0}
+
+    packages = max(1, int(math.sqrt(files)))
+    for i in range(files):
+        size = min(max_size, max(16, int(rng.lognormvariate(math.log(median_size), sigma))))
+        path = source_dir / f"pkg{i % packages}" / f"module_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(_python_source(rng, size))
+        stats["files"] += 1
+        stats["bytes"] += size
+
+    ignored_dirs = ["build/lib", "venv/lib/site-packages", "web/node_modules/dep"]
+    for i in range(int(files * ignore_ratio)):
+        size = min(max_size, max(16, int(rng.lognormvariate(math.log(median_size), sigma))))
+        if i % 4 == 0:
+            path = source_dir / f"pkg{i % packages}" / f"run_{i}.log"
+        else:
+            path = source_dir / ignored_dirs[i % len(ignored_dirs)] / f"file_{i}.py"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(_python_source(rng, size))
+        stats["ignored_files"] += 1
+        stats["ignored_bytes"] += size
+
+    return stats
@@ -19,8 +19,8 @@ import subprocess
 source_folder = Path(__file__).parent / "source"
 sys.path.insert(0, str(source_folder))
 
-from crypto.key_manager import KeyManager
-from Crypto.Cipher import AES
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto.file_encryptor import FileEncryptor
 
 
 def decrypt_file_for_editing(encrypted_file_path: str):
@@ -44,40 +44,31 @@ def decrypt_file_for_editing(encrypted_file_path: str):
     
     # Load and decrypt the AES key
     print("🔑 Loading encryption key...")
-    key_manager = KeyManager()
-    if not key_manager.load_private_key():
-        print("❌ Error: Private key not found!")
-        return None
-    
     with open(key_path, 'rb') as f:
         encrypted_key = f.read()
     
-    key = key_manager.decrypt_data(encrypted_key)
-    
-    # Read encrypted file
-    print(f"🔓 Decrypting {encrypted_path.name}...")
-    with open(encrypted_path, 'rb') as f:
-        encrypted_data = f.read()
-    
-    # Extract nonce, tag, and ciphertext
-    nonce = encrypted_data[:16]
-    tag = encrypted_data[16:32]
-    ciphertext = encrypted_data[32:]
-    
-    # Decrypt
-    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-    decrypted_code = cipher.decrypt_and_verify(ciphertext, tag)
+    # Served by the key agent if it is running, else unwrapped with the private key
+    key = unwrap_aes_key(encrypted_key)
+    if key is None:
+        print("❌ Error: Private key not found!")
+        return None
     
     # Create temporary file
     temp_file = tempfile.NamedTemporaryFile(
-        mode='w',
         suffix='.py',
         prefix='copilot_edit_',
-        delete=False,
-        encoding='utf-8'
+        delete=False
     )
     
-    temp_file.write(decrypted_code.decode('utf-8'))
+    # Decrypt straight into it (streamed, v1 or v2 format)
+    print(f"🔓 Decrypting {encrypted_path.name}...")
+    try:
+        with open(encrypted_path, 'rb') as src:
+            FileEncryptor(key).decrypt_stream(src, temp_file)
+    except Exception:
+        temp_file.close()
+        os.unlink(temp_file.name)
+        raise
     temp_file.close()
     
     print(f"✅ Temporary file created: {temp_file.name}")
@@ -110,29 +101,19 @@ def encrypt_edited_file(temp_file_path: str, original_encrypted_path: str):
     
     # Load encryption key
     key_path = Path("encrypted/aes_key.bin")
-    key_manager = KeyManager()
-    key_manager.load_private_key()
-    
     with open(key_path, 'rb') as f:
         encrypted_key = f.read()
     
-    key = key_manager.decrypt_data(encrypted_key)
+    # Served by the key agent if it is running, else unwrapped with the private key
+    key = unwrap_aes_key(encrypted_key)
+    if key is None:
+        print("❌ Error: Private key not found!")
+        return False
     
-    # Read edited file
+    # Encrypt edited file (streamed into the v2 format)
     print(f"📖 Reading edited file...")
-    with open(temp_path, 'rb') as f:
-        edited_code = f.read()
-    
-    # Encrypt
     print(f"🔐 Encrypting changes...")
-    cipher = AES.new(key, AES.MODE_GCM)
-    ciphertext, tag = cipher.encrypt_and_digest(edited_code)
-    
-    # Write encrypted file
-    with open(encrypted_path, 'wb') as f:
-        f.write(cipher.nonce)  # 16 bytes
-        f.write(tag)           # 16 bytes
-        f.write(ciphertext)
+    FileEncryptor(key).encrypt_file(temp_path, encrypted_path)
     
     print(f"✅ Updated: {encrypted_path}")
     
@@ -5,10 +5,27 @@ This script prepares encrypted code for production deployment.
 
 import sys
 import shutil
+import argparse
 from pathlib import Path
 
-def deploy_production():
-    """Prepare encrypted code for production deployment."""
+# Add source folder to path
+source_folder = Path(__file__).parent / "source"
+sys.path.insert(0, str(source_folder))
+
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto.packfile import PACK_FILENAME, build_pack
+from mvp17.utils import deploy_delta
+
+def deploy_production(pack=False, delta=False):
+    """
+    Prepare encrypted code for production deployment.
+    
+    Args:
+        pack: Ship encrypted/ as a single encrypted.pack (plus aes_key.bin)
+              instead of the loose tree
+        delta: Also write deltas/delta-*.tar.gz holding only what changed
+               since the previous package in deploy/
+    """
     print("\n" + "="*60)
     print("🚀 MVP17 - Production Deployment from Encrypted Code")
     print("="*60)
@@ -41,6 +58,16 @@ def deploy_production():
     
     # Create deployment package
     deploy_dir = Path("deploy")
+    
+    # The previous package is the base of the delta
+    base_manifest = None
+    if delta:
+        base_manifest = deploy_delta.load_manifest(deploy_dir)
+        if base_manifest is None:
+            print(f"❌ Error: No {deploy_delta.MANIFEST_NAME} in deploy/ to build a delta against!")
+            print("   Run a full deployment first: python deploy_production.py")
+            sys.exit(1)
+    
     if deploy_dir.exists():
         print("🗑️  Cleaning previous deployment...")
         shutil.rmtree(deploy_dir)
@@ -50,8 +77,20 @@ def deploy_production():
     print("📦 Creating deployment package...")
     
     # Copy encrypted folder
-    shutil.copytree(encrypted_dir, deploy_dir / "encrypted")
-    print("   ✅ Copied encrypted code")
+    if pack:
+        with open(encrypted_dir / "aes_key.bin", 'rb') as f:
+            aes_key = unwrap_aes_key(f.read())
+        if aes_key is None:
+            print("❌ Error: Private key not found (needed to build the pack index)!")
+            sys.exit(1)
+        (deploy_dir / "encrypted").mkdir()
+        shutil.copy2(encrypted_dir / "aes_key.bin", deploy_dir / "encrypted" / "aes_key.bin")
+        count = build_pack(encrypted_dir, aes_key, deploy_dir / "encrypted" / PACK_FILENAME)
+        print(f"   ✅ Packed {count} encrypted files into encrypted/{PACK_FILENAME}")
+    else:
+        shutil.copytree(encrypted_dir, deploy_dir / "encrypted",
+                        ignore=shutil.ignore_patterns(PACK_FILENAME, "*.tmp"))
+        print("   ✅ Copied encrypted code")
     
     # Copy templates
     if Path("templates").exists():
@@ -63,13 +102,19 @@ def deploy_production():
     
     # Copy launcher
     shutil.copy("run_encrypted_webapp.py", deploy_dir / "run_encrypted_webapp.py")
-    print("   ✅ Copied launcher script")
+    shutil.copytree(Path(__file__).parent / "mvp17", deploy_dir / "mvp17",
+                    ignore=shutil.ignore_patterns("__pycache__"))
+    print("   ✅ Copied launcher script and mvp17/ runtime")
     
     # Copy requirements if exists
     if Path("requirements.txt").exists():
         shutil.copy("requirements.txt", deploy_dir / "requirements.txt")
         print("   ✅ Copied requirements.txt")
     
+    # Server-side delta tool (standard library only)
+    shutil.copy(Path(__file__).parent / "mvp17" / "utils" / "deploy_delta.py", deploy_dir / "apply_delta.py")
+    print("   ✅ Copied apply_delta.py")
+    
     # Create deployment README
     deploy_readme = deploy_dir / "DEPLOY_README.md"
     with open(deploy_readme, 'w') as f:
@@ -80,10 +125,14 @@ def deploy_production():
 This package contains ENCRYPTED source code ready for production deployment.
 
 ### 📦 Contents:
-- `encrypted/` - Encrypted source code (AES-256-GCM)
+- `encrypted/` - Encrypted source code (AES-256-GCM), either as loose
+  `.enc` files or as a single memory-mapped `encrypted.pack`
 - `templates/` - Web application templates
 - `run_encrypted_webapp.py` - Production launcher
+- `mvp17/` - Decryption runtime used by the launcher
 - `requirements.txt` - Python dependencies
+- `apply_delta.py` - Applies delta updates in place
+- `deploy_manifest.json` - SHA-256 of every file (package version)
 
 ### 🚀 Deployment Steps:
 
@@ -107,8 +156,9 @@ This package contains ENCRYPTED source code ready for production deployment.
 
 4. **Run production server**:
    ```bash
-   # Using Gunicorn (recommended)
-   gunicorn -w 4 -b 0.0.0.0:5000 run_encrypted_webapp:app
+   # Using Gunicorn (recommended); --preload decrypts once in the master
+   # and shares the loaded app with the workers
+   gunicorn --preload -w 4 -b 0.0.0.0:5000 run_encrypted_webapp:app
    
    # Or simple Python (development only)
    python run_encrypted_webapp.py
@@ -131,10 +181,18 @@ This package contains ENCRYPTED source code ready for production deployment.
 ### 🔄 Updates:
 
 1. Update source code locally
-2. Re-encrypt: `python manage_encryption.py encrypt`
-3. Re-deploy: `python deploy_production.py`
-4. Upload new package to server
-5. Restart application
+2. Re-encrypt: `python manage_encryption.py encrypt --incremental`
+3. Re-deploy: `python deploy_production.py --delta`
+4. Upload only the new `deltas/delta-*.tar.gz` to the server
+5. Apply it: `python apply_delta.py delta-*.tar.gz`
+6. Restart application
+
+The delta only holds files that changed since the previous package, and
+`apply_delta.py` refuses it unless the server runs exactly that previous
+package; every file is verified before anything is replaced. A full
+re-encrypt (new key) or a packed deployment changes every file, so those
+are best shipped as a full package. Check a package any time with
+`python apply_delta.py --verify`.
 
 ---
 
@@ -144,6 +202,21 @@ This package contains ENCRYPTED source code ready for production deployment.
 """)
     print("   ✅ Created deployment README")
     
+    # Record the package version; the next --delta run diffs against it
+    manifest = deploy_delta.build_manifest(deploy_dir)
+    deploy_delta.write_manifest(deploy_dir, manifest)
+    print(f"   ✅ Wrote {deploy_delta.MANIFEST_NAME} ({manifest['id'][:12]})")
+    
+    delta_path = None
+    if delta:
+        changed, removed = deploy_delta.diff_manifests(base_manifest, manifest)
+        delta_path = deploy_delta.create_delta(deploy_dir, base_manifest, manifest, Path("deltas"))
+        if delta_path is None:
+            print("   ✅ Nothing changed since the previous package - no delta needed")
+        else:
+            print(f"   ✅ Delta: {len(changed)} changed, {len(removed)} removed "
+                  f"-> {delta_path} ({delta_path.stat().st_size / 1024:.1f} KB)")
+    
     print()
     print("="*60)
     print("✅ Production Deployment Package Ready!")
@@ -155,7 +228,10 @@ This package contains ENCRYPTED source code ready for production deployment.
     print("Next steps:")
     print("  1. Review: deploy/DEPLOY_README.md")
     print("  2. Test: cd deploy && python run_encrypted_webapp.py")
-    print("  3. Deploy: Upload deploy/ folder to production server")
+    if delta_path is not None:
+        print(f"  3. Deploy: Upload {delta_path} and run python apply_delta.py {delta_path.name}")
+    else:
+        print("  3. Deploy: Upload deploy/ folder to production server")
     print()
     print("⚠️  Security reminders:")
     print("  - Transfer keys securely (not in git)")
@@ -166,4 +242,10 @@ This package contains ENCRYPTED source code ready for production deployment.
 
 
 if __name__ == "__main__":
-    deploy_production()
+    parser = argparse.ArgumentParser(description='Prepare a production deployment package')
+    parser.add_argument('--pack', action='store_true',
+                       help='Ship encrypted/ as one packed archive instead of loose files')
+    parser.add_argument('--delta', action='store_true',
+                       help='Also write a delta archive against the previous package in deploy/')
+    args = parser.parse_args()
+    deploy_production(pack=args.pack, delta=args.delta)
@@ -13,96 +13,217 @@ This way:
 - You get Copilot help on temporary decrypted files
 - Changes go back to encrypted/ folder
 - No permanent unencrypted files
+
+Both steps take several paths, globs or folders at once, e.g.
+`python edit_with_copilot.py 'crypto/*.py' utils/` - the AES key is
+unwrapped once per run, files are processed in parallel, and files whose
+content did not change are not re-encrypted on save.
 """
 
+import os
 import sys
+import json
+import fnmatch
+import argparse
 from pathlib import Path
-from Crypto.Cipher import AES
+from concurrent.futures import ThreadPoolExecutor
 
 # Add source folder to path
 source_folder = Path(__file__).parent / "source"
 sys.path.insert(0, str(source_folder))
 
-from crypto.key_manager import KeyManager
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto.file_encryptor import FileEncryptor
+from mvp17.crypto.blind_index import MAX_INDEXED_BYTES, BlindIndex, index_exists
+from mvp17.crypto.blob_store import (BLOBS_DIRNAME, file_content_hash, load_blob_map, locate,
+                                     update_blobs, update_manifest_entries)
+
+
+ENCRYPTED_DIR = Path("encrypted")
+TEMP_DIR = Path("temp_edit")
+# Keyed content hash of each file as decrypted, to skip unchanged files on save
+EDIT_STATE = TEMP_DIR / ".edit_state.json"
+
+
+def _available_files():
+    """Relative paths (without .enc) of every file in encrypted/."""
+    names = set(load_blob_map(ENCRYPTED_DIR))
+    for f in ENCRYPTED_DIR.rglob("*.enc"):
+        parts = f.relative_to(ENCRYPTED_DIR).parts
+        if parts[0] != BLOBS_DIRNAME and "__pycache__" not in parts:
+            names.add("/".join(parts))
+    return sorted(name[:-len('.enc')] for name in names)
 
 
-def edit_encrypted_file(encrypted_file_rel_path: str):
+def _edited_files():
+    """Relative paths of the decrypted files waiting in temp_edit/."""
+    if not TEMP_DIR.is_dir():
+        return []
+    return sorted(f.relative_to(TEMP_DIR).as_posix() for f in TEMP_DIR.rglob("*")
+                  if f.is_file() and f != EDIT_STATE)
+
+
+def resolve_paths(patterns, candidates):
     """
-    Workflow to edit an encrypted file with Copilot.
-    
+    Expand file names, globs and folders against candidate relative paths.
+
     Args:
-        encrypted_file_rel_path: e.g., "web_app.py" (will look in encrypted/)
-    
+        patterns: e.g. "web_app.py", "crypto/*.py" or "utils/" (whole subtree);
+                  a trailing .enc is ignored and * also matches across folders
+        candidates: Relative paths to choose from
+
+    Returns:
+        (matched paths, patterns that matched nothing)
+    """
+    matched, unmatched = set(), []
+    for pattern in patterns:
+        pattern = pattern.replace('\\', '/').strip('/')
+        if pattern.endswith('.enc'):
+            pattern = pattern[:-len('.enc')]
+        if any(c in pattern for c in '*?['):
+            hits = [name for name in candidates if fnmatch.fnmatchcase(name, pattern)]
+        else:
+            hits = [name for name in candidates
+                    if name == pattern or name.startswith(pattern + '/') or not pattern]
+        if hits:
+            matched.update(hits)
+        else:
+            unmatched.append(pattern)
+    return sorted(matched), unmatched
+
+
+def _load_key():
+    """Unwrap the AES key once for the whole batch."""
+    print("🔑 Loading encryption key...")
+    with open(ENCRYPTED_DIR / "aes_key.bin", 'rb') as f:
+        encrypted_key = f.read()
+
+    # Served by the key agent if it is running, else unwrapped with the private key
+    return unwrap_aes_key(encrypted_key)
+
+
+def _load_state():
+    try:
+        with open(EDIT_STATE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_state(state):
+    if not state:
+        if EDIT_STATE.exists():
+            EDIT_STATE.unlink()
+        return
+    TEMP_DIR.mkdir(exist_ok=True)
+    tmp_path = EDIT_STATE.with_name(EDIT_STATE.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, EDIT_STATE)
+
+
+def _update_search_index(key, names):
+    """Re-index saved files so search finds their new content."""
+    if not names or not index_exists(ENCRYPTED_DIR):
+        return
+    index = BlindIndex(key, ENCRYPTED_DIR).load()
+    for name in names:
+        temp_file = TEMP_DIR / name
+        if temp_file.stat().st_size > MAX_INDEXED_BYTES:
+            index.remove_file(name)
+        else:
+            index.update_file(name, temp_file.read_bytes())
+    index.save()
+    print(f"🔎 Updated search index for {len(names)} file(s)")
+
+
+def _remove_empty_dirs(path):
+    """Remove empty folders from path up to and including temp_edit/."""
+    while True:
+        try:
+            path.rmdir()
+        except OSError:
+            return
+        if path == TEMP_DIR:
+            print(f"🗑️  Removed: temp_edit/")
+            return
+        path = path.parent
+
+
+def edit_encrypted_files(patterns, workers=0):
+    """
+    Workflow to edit encrypted files with Copilot.
+
+    Args:
+        patterns: Paths, globs or folders relative to encrypted/, e.g.
+                  ["web_app.py"] or ["crypto/*.py", "utils/"]
+        workers: Parallel decrypt threads (0 = all cores)
+
     Example:
-        python edit_with_copilot.py web_app.py
+        python edit_with_copilot.py web_app.py 'crypto/*.py'
     """
-    # Setup paths
-    if not encrypted_file_rel_path.endswith('.enc'):
-        encrypted_file_rel_path += '.enc'
-    
-    encrypted_path = Path(f"encrypted/{encrypted_file_rel_path}")
-    
-    if not encrypted_path.exists():
-        print(f"❌ Error: {encrypted_path} not found!")
+    available = _available_files()
+    selected, unmatched = resolve_paths(patterns, available)
+
+    if unmatched:
+        for pattern in unmatched:
+            print(f"❌ Error: encrypted/{pattern} not found!")
         print(f"\nAvailable files in encrypted/:")
-        for f in Path("encrypted").rglob("*.py.enc"):
-            print(f"   {f.relative_to('encrypted')}")
+        for name in available:
+            print(f"   {name}")
         return
-    
+
     print("\n" + "="*60)
     print("🔐 SAFE COPILOT EDITING WORKFLOW")
     print("="*60)
     print()
-    
-    # Load and decrypt AES key
-    print("🔑 Loading encryption key...")
-    key_path = Path("encrypted/aes_key.bin")
-    key_manager = KeyManager()
-    key_manager.load_private_key()
-    
-    with open(key_path, 'rb') as f:
-        encrypted_key = f.read()
-    
-    key = key_manager.decrypt_data(encrypted_key)
-    
-    # Decrypt the file
-    print(f"🔓 Decrypting: {encrypted_path.name}")
-    with open(encrypted_path, 'rb') as f:
-        encrypted_data = f.read()
-    
-    nonce = encrypted_data[:16]
-    tag = encrypted_data[16:32]
-    ciphertext = encrypted_data[32:]
-    
-    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-    decrypted_code = cipher.decrypt_and_verify(ciphertext, tag)
-    
-    # Create temp file in a Copilot-visible location
-    temp_dir = Path("temp_edit")
-    temp_dir.mkdir(exist_ok=True)
-    
-    original_name = encrypted_path.stem.replace('.enc', '')
-    temp_file = temp_dir / f"{original_name}.py"
-    
-    with open(temp_file, 'wb') as f:
-        f.write(decrypted_code)
-    
-    print(f"✅ Temporary file: {temp_file}")
+
+    key = _load_key()
+    if key is None:
+        print("❌ Error: Private key not found!")
+        return
+
+    # Never overwrite a temp file holding edits that were not saved yet
+    state = _load_state()
+    pending = []
+    for name in selected:
+        temp_file = TEMP_DIR / name
+        if temp_file.exists() and file_content_hash(key, temp_file) != state.get(name):
+            print(f"⚠️  Skipping {name}: {temp_file} has unsaved changes")
+        else:
+            pending.append(name)
+
+    encryptor = FileEncryptor(key)
+
+    def decrypt(name):
+        temp_file = TEMP_DIR / name
+        temp_file.parent.mkdir(parents=True, exist_ok=True)
+        # Deduplicated trees keep the content in a shared blob (streamed, v1 or v2 format)
+        encryptor.decrypt_file(locate(ENCRYPTED_DIR, name + '.enc'), temp_file)
+        return name, file_content_hash(key, temp_file)
+
+    print(f"🔓 Decrypting {len(pending)} file(s)...")
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for name, content_hash in pool.map(decrypt, pending):
+            state[name] = content_hash
+            print(f"✅ Temporary file: {TEMP_DIR / name}")
+    _save_state(state)
+
     print()
     print("="*60)
     print("📝 NEXT STEPS:")
     print("="*60)
     print()
     print(f"1. Open in VS Code:")
-    print(f"   code {temp_file}")
+    print(f"   code {TEMP_DIR}")
     print()
     print(f"2. Edit with Copilot assistance")
-    print(f"   - Copilot CAN see this temp file")
+    print(f"   - Copilot CAN see these temp files")
     print(f"   - Make your changes")
-    print(f"   - Save the file")
+    print(f"   - Save the files")
     print()
     print(f"3. Re-encrypt your changes:")
-    print(f"   python save_encrypted.py {encrypted_file_rel_path}")
+    print(f"   python save_encrypted.py {' '.join(patterns)}")
     print()
     print("="*60)
     print("⚠️  REMEMBER:")
@@ -114,102 +235,117 @@ def edit_encrypted_file(encrypted_file_rel_path: str):
     print()
 
 
-def save_edited_file(encrypted_file_rel_path: str):
+def save_edited_files(patterns, workers=0):
     """
-    Re-encrypt edited file and clean up temp.
-    
+    Re-encrypt edited files and clean up temp.
+
+    Only files whose content differs from what edit_with_copilot.py
+    decrypted are re-encrypted; unchanged ones are just removed.
+
     Args:
-        encrypted_file_rel_path: e.g., "web_app.py" or "web_app.py.enc"
+        patterns: Paths, globs or folders, e.g. ["web_app.py"] or ["crypto/"]
+        workers: Parallel encrypt threads (0 = all cores)
     """
-    if not encrypted_file_rel_path.endswith('.enc'):
-        encrypted_file_rel_path += '.enc'
-    
-    encrypted_path = Path(f"encrypted/{encrypted_file_rel_path}")
-    original_name = encrypted_path.stem.replace('.enc', '')
-    temp_file = Path("temp_edit") / f"{original_name}.py"
-    
-    if not temp_file.exists():
-        print(f"❌ Error: {temp_file} not found!")
-        print(f"   Run: python edit_with_copilot.py {encrypted_file_rel_path}")
+    selected, unmatched = resolve_paths(patterns, _edited_files())
+
+    if unmatched:
+        for pattern in unmatched:
+            print(f"❌ Error: {TEMP_DIR / pattern} not found!")
+            print(f"   Run: python edit_with_copilot.py {pattern}")
         return
-    
+
     print("\n" + "="*60)
-    print("🔐 RE-ENCRYPTING EDITED FILE")
+    print("🔐 RE-ENCRYPTING EDITED FILES")
     print("="*60)
     print()
-    
-    # Load key
-    print("🔑 Loading encryption key...")
-    key_path = Path("encrypted/aes_key.bin")
-    key_manager = KeyManager()
-    key_manager.load_private_key()
-    
-    with open(key_path, 'rb') as f:
-        encrypted_key = f.read()
-    
-    key = key_manager.decrypt_data(encrypted_key)
-    
-    # Read edited file
-    print(f"📖 Reading: {temp_file}")
-    with open(temp_file, 'rb') as f:
-        edited_code = f.read()
-    
-    # Encrypt
-    print(f"🔐 Encrypting changes...")
-    cipher = AES.new(key, AES.MODE_GCM)
-    ciphertext, tag = cipher.encrypt_and_digest(edited_code)
-    
-    # Save encrypted
-    with open(encrypted_path, 'wb') as f:
-        f.write(cipher.nonce)
-        f.write(tag)
-        f.write(ciphertext)
-    
-    print(f"✅ Saved: {encrypted_path}")
-    
+
+    key = _load_key()
+    if key is None:
+        print("❌ Error: Private key not found!")
+        return
+
+    state = _load_state()
+    encryptor = FileEncryptor(key)
+    blob_map = load_blob_map(ENCRYPTED_DIR)
+
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        hashes = dict(zip(selected, pool.map(
+            lambda name: file_content_hash(key, TEMP_DIR / name), selected)))
+        changed = [name for name in selected if hashes[name] != state.get(name)]
+
+        # Encrypt edited files (streamed into the v2 format)
+        print(f"🔐 Encrypting {len(changed)} changed file(s), "
+              f"{len(selected) - len(changed)} unchanged...")
+        deduplicated = {name: TEMP_DIR / name for name in changed if name + '.enc' in blob_map}
+        loose = [name for name in changed if name not in deduplicated]
+        sizes = pool.map(lambda name: encryptor.encrypt_file(
+            TEMP_DIR / name, ENCRYPTED_DIR / f"{name}.enc"), loose)
+        # Keep manifest.json in step, as update_blobs() does for blobs
+        loose_entries = {name: {'content_hash': hashes[name], 'size': size}
+                         for name, size in zip(loose, sizes)}
+        if loose_entries and (ENCRYPTED_DIR / "manifest.json").exists():
+            update_manifest_entries(ENCRYPTED_DIR, loose_entries)
+        if deduplicated:
+            update_blobs(key, ENCRYPTED_DIR, deduplicated, executor=pool)
+
+    _update_search_index(key, changed)
+
+    for name in changed:
+        print(f"✅ Saved: {ENCRYPTED_DIR / name}.enc")
+
     # Clean up temp
-    temp_file.unlink()
-    print(f"🗑️  Deleted: {temp_file}")
-    
-    # Try to remove temp_edit directory if empty
-    try:
-        Path("temp_edit").rmdir()
-        print(f"🗑️  Removed: temp_edit/")
-    except:
-        pass
-    
+    for name in selected:
+        temp_file = TEMP_DIR / name
+        temp_file.unlink()
+        state.pop(name, None)
+        print(f"🗑️  Deleted: {temp_file}")
+    _save_state(state)
+    for parent in sorted({(TEMP_DIR / name).parent for name in selected},
+                         key=lambda path: len(path.parts), reverse=True):
+        _remove_empty_dirs(parent)
+
     print()
     print("="*60)
     print("✅ SUCCESS!")
     print("="*60)
     print()
-    print("🔄 Restart server to see changes:")
-    print("   python run_local.py")
+    if changed:
+        print("♻️  A running run_local.py picks up the changes automatically")
+        print("   (otherwise start it: python run_local.py)")
+    else:
+        print("ℹ️  No changes - encrypted/ left untouched")
     print()
 
 
 if __name__ == "__main__":
-    import sys
-    
+    script_name = Path(sys.argv[0]).name
+
     if len(sys.argv) < 2:
         print("\n" + "="*60)
         print("USAGE:")
         print("="*60)
         print()
-        print("1. Edit encrypted file:")
+        print("1. Edit encrypted files:")
         print("   python edit_with_copilot.py web_app.py")
+        print("   python edit_with_copilot.py 'crypto/*.py' utils/")
         print()
         print("2. Save changes:")
         print("   python save_encrypted.py web_app.py")
+        print("   python save_encrypted.py 'crypto/*.py' utils/")
         print()
         sys.exit(1)
-    
-    script_name = Path(sys.argv[0]).name
-    file_to_edit = sys.argv[1]
-    
+
+    parser = argparse.ArgumentParser(
+        description='Decrypt files for editing / re-encrypt edited files')
+    parser.add_argument('paths', nargs='+',
+                       help='Files, globs or folders relative to encrypted/ (without .enc)')
+    parser.add_argument('-j', '--workers', type=int, default=0,
+                       help='Parallel threads (default 0 = all cores)')
+    args = parser.parse_args()
+
     if 'edit_with_copilot' in script_name:
-        edit_encrypted_file(file_to_edit)
+        edit_encrypted_files(args.paths, args.workers)
     elif 'save_encrypted' in script_name:
-        save_edited_file(file_to_edit)
+        save_edited_files(args.paths, args.workers)
     else:
         print("❌ Unknown script name")
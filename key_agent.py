@@ -0,0 +1,99 @@
+"""
+Local key agent for the encryption workflow (like ssh-agent).
+
+Unwraps encrypted/aes_key.bin once with the RSA private key and serves the
+AES key to run_local.py, edit_with_copilot.py, save_encrypted.py,
+copilot_edit.py and manage_encryption.py over a Unix socket, so they skip
+the RSA-4096 operation while the agent is running.
+"""
+
+import sys
+import time
+import argparse
+import subprocess
+from pathlib import Path
+
+# Add source folder to path
+source_folder = Path(__file__).parent / "source"
+sys.path.insert(0, str(source_folder))
+
+from crypto.key_manager import KeyManager
+from mvp17.crypto import key_agent
+
+
+def start_agent(ttl: int):
+    """Start the agent in the background and wait until it answers."""
+    if key_agent.request({"op": "ping"}):
+        print(f"✅ Key agent already running: {key_agent.socket_path()}")
+        return
+    
+    subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "serve", "--ttl", str(ttl)],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        start_new_session=True
+    )
+    
+    for _ in range(100):
+        if key_agent.request({"op": "ping"}):
+            print(f"✅ Key agent started: {key_agent.socket_path()}")
+            print(f"   Keys expire in {ttl}s")
+            return
+        time.sleep(0.1)
+    
+    print("❌ Error: Key agent did not start!")
+    print("   Run in the foreground to see why: python key_agent.py serve")
+    sys.exit(1)
+
+
+def serve_agent(ttl: int):
+    """Run the agent in the foreground."""
+    key_manager = KeyManager()
+    if not key_manager.load_private_key():
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    agent = key_agent.KeyAgent(key_manager, ttl=ttl)
+    print(f"🔑 Key agent listening on {agent.path} (TTL {ttl}s)")
+    agent.serve_until_expired()
+
+
+def show_status():
+    """Show whether the agent is running."""
+    response = key_agent.request({"op": "ping"})
+    if response:
+        print(f"🔑 Key agent: ✅ running ({key_agent.socket_path()})")
+        print(f"   Cached keys: {response['keys']}")
+        print(f"   Expires in: {response['expires_in']}s")
+    else:
+        print("🔑 Key agent: ❌ not running")
+
+
+def main():
+    """Main entry point."""
+    parser = argparse.ArgumentParser(description='Cache the unwrapped AES key in a local agent')
+    parser.add_argument('action', choices=['start', 'serve', 'stop', 'status'],
+                       help='start (background), serve (foreground), stop or status')
+    parser.add_argument('--ttl', type=int, default=key_agent.DEFAULT_TTL,
+                       help='Seconds until the agent forgets the key and exits')
+    
+    args = parser.parse_args()
+    
+    if not key_agent.agent_supported():
+        print("❌ Error: Unix sockets are not available on this platform")
+        sys.exit(1)
+    
+    if args.action == 'start':
+        start_agent(args.ttl)
+    elif args.action == 'serve':
+        serve_agent(args.ttl)
+    elif args.action == 'stop':
+        if key_agent.request({"op": "stop"}):
+            print("🛑 Key agent stopped")
+        else:
+            print("🔑 Key agent: not running")
+    elif args.action == 'status':
+        show_status()
+
+
+if __name__ == "__main__":
+    main()
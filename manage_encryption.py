@@ -3,22 +3,313 @@ Helper script to manage source code encryption workflow.
 This ensures clear separation between source/ and encrypted/ folders.
 """
 
+import os
 import sys
+import json
+import time
 import shutil
+import argparse
+import tempfile
 from pathlib import Path
+from itertools import repeat
+from concurrent.futures import ProcessPoolExecutor
 
 # Add source folder to path
 source_folder = Path(__file__).parent / "source"
 sys.path.insert(0, str(source_folder))
 
 from crypto.key_manager import KeyManager
-from crypto.file_encryptor import FileEncryptor
-from utils.file_scanner import FileScanner
-from utils.repoignore import RepoIgnore
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto.blind_index import BlindIndex, MAX_INDEXED_BYTES, index_exists
+from mvp17.crypto.blob_store import (
+    content_hasher, file_content_hash, remove_unreferenced_blobs, store_file,
+    blob_path, uses_blob_store
+)
+from mvp17.crypto.file_encryptor import FileEncryptor
+from mvp17.crypto.packfile import PACK_FILENAME, build_pack
+from mvp17.utils.file_scanner import FileScanner
+from mvp17.utils.io_pipeline import DEFAULT_IN_FLIGHT, run_pipeline
+from mvp17.utils.repoignore import RepoIgnore
+from mvp17.utils.watch import ChangeCollector
 
 
-def encrypt_source_to_encrypted():
-    """Encrypt all files from source/ folder to encrypted/ folder."""
+def _encrypt_file(aes_key, source_dir, encrypted_dir, file_path, known_hash=None,
+                  dedup=False):
+    """
+    Encrypt a single source file into encrypted/.
+    
+    Runs in a worker process when encrypting in parallel, so it only takes
+    picklable arguments and reports failures instead of raising them.
+    
+    Args:
+        known_hash: Content hash from the previous manifest; if the file
+                    still hashes to it, the existing .enc file is kept
+        dedup: Store the content as a shared blob (see mvp17.crypto.blob_store)
+               instead of a per-path .enc file
+    
+    Returns:
+        (relative_path, manifest_entry, error, written, search_tokens)
+        - entry is None on failure, search_tokens is None unless written
+    """
+    relative_path = Path(file_path).relative_to(source_dir).as_posix()
+    try:
+        # Stat before reading so a concurrent edit shows up on the next run
+        stat = os.stat(file_path)
+        
+        # Determine output path (preserve directory structure)
+        output_path = encrypted_dir / f"{relative_path}.enc"
+        entry = {
+            'original': Path(file_path).as_posix(),
+            'encrypted': output_path.as_posix(),
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+        }
+        
+        if dedup:
+            # Content that already has a blob is neither encrypted nor written
+            blob_id, entry['size'], _ = store_file(aes_key, encrypted_dir, file_path)
+            entry['encrypted'] = blob_path(encrypted_dir, blob_id).as_posix()
+            entry['content_hash'] = entry['blob'] = blob_id
+            if output_path.exists():
+                output_path.unlink()  # loose .enc from before deduplication
+            if blob_id == known_hash:
+                return relative_path, entry, None, False, None
+        else:
+            # Content unchanged (e.g. touched by a git checkout) - keep the blob
+            if known_hash is not None and output_path.exists():
+                digest = file_content_hash(aes_key, file_path)
+                if digest == known_hash:
+                    entry['content_hash'] = digest
+                    return relative_path, entry, None, False, None
+            
+            # Stream through AES-256-GCM (v2 segmented .enc), hashing on the way
+            hasher = content_hasher(aes_key)
+            entry['size'] = FileEncryptor(aes_key).encrypt_file(file_path, output_path, hasher=hasher)
+            entry['content_hash'] = hasher.hexdigest()
+        
+        # Blind-index tokens for search, computed here so they parallelise too
+        tokens = None
+        if entry['size'] <= MAX_INDEXED_BYTES:
+            with open(file_path, 'rb') as f:
+                tokens = BlindIndex(aes_key).tokens_for(f.read())
+        
+        return relative_path, entry, None, True, tokens
+        
+    except Exception as e:
+        return relative_path, None, str(e), False, None
+
+
+def _encrypt_loaded(encryptor, source_dir, encrypted_dir, file_path, loaded,
+                    known_hash=None, dedup=False):
+    """
+    _encrypt_file for a file the pipeline has already read into memory.
+    
+    Args:
+        encryptor: FileEncryptor holding the AES key
+        loaded: (stat taken before the read, file content)
+    
+    Returns:
+        (result, write) - result as from _encrypt_file; write is the
+        arguments of _write_encrypted for the write stage, or None
+    """
+    relative_path = Path(file_path).relative_to(source_dir).as_posix()
+    stat, data = loaded
+    output_path = encrypted_dir / f"{relative_path}.enc"
+    entry = {
+        'original': Path(file_path).as_posix(),
+        'encrypted': output_path.as_posix(),
+        'size': len(data),
+        'mtime': stat.st_mtime_ns,
+    }
+    hasher = content_hasher(encryptor.key)
+    hasher.update(data)
+    entry['content_hash'] = digest = hasher.hexdigest()
+    
+    if dedup:
+        # Content that already has a blob is neither encrypted nor written
+        target = blob_path(encrypted_dir, digest)
+        entry['encrypted'] = target.as_posix()
+        entry['blob'] = digest
+        data_to_write = None if target.exists() else encryptor.encrypt_bytes(data)
+        # A loose .enc from before deduplication goes once the blob is written
+        loose = output_path if output_path.exists() else None
+        write = None
+        if data_to_write is not None or loose is not None:
+            write = (target, data_to_write, True, loose)
+        if digest == known_hash:
+            return (relative_path, entry, None, False, None), write
+    else:
+        # Content unchanged (e.g. touched by a git checkout) - keep the blob
+        if digest == known_hash and output_path.exists():
+            return (relative_path, entry, None, False, None), None
+        write = (output_path, encryptor.encrypt_bytes(data), False)
+    
+    tokens = None
+    if len(data) <= MAX_INDEXED_BYTES:
+        tokens = BlindIndex(encryptor.key).tokens_for(data)
+    return (relative_path, entry, None, True, tokens), write
+
+
+def _read_file(file_path):
+    """(stat, content) - stat first so a concurrent edit shows up on the next run."""
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        return stat, f.read()
+
+
+def _write_file(path, data, unique=False):
+    """
+    Write data to path atomically.
+    
+    Args:
+        unique: Use a unique temp name (several items may target one blob)
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if unique:
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        f = os.fdopen(fd, 'wb')
+    else:
+        tmp_path = path.with_name(path.name + ".tmp")
+        f = open(tmp_path, 'wb')
+    try:
+        with f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _write_encrypted(path, data, unique=False, replaces=None):
+    """
+    Write stage of the encrypt pipeline.
+    
+    Args:
+        data: Encrypted bytes for path, or None if path is already up to date
+        replaces: File made redundant by path (a loose .enc of deduplicated
+                  content); only removed after path was written
+    """
+    if data is not None:
+        _write_file(path, data, unique)
+    if replaces is not None and replaces.exists():
+        replaces.unlink()
+
+
+def _encrypt_files(aes_key, source_dir, encrypted_dir, pending, known_hashes, workers=1,
+                   dedup=False, in_flight=DEFAULT_IN_FLIGHT):
+    """
+    Run _encrypt_file over pending files.
+    
+    With workers > 1 files go to worker processes; otherwise reading,
+    encrypting and writing overlap in the I/O pipeline (mvp17.utils.io_pipeline)
+    within in_flight bytes. Files too big to hold in memory are streamed.
+    """
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    
+    if workers > 1 and len(pending) > 1:
+        print(f"⚡ Encrypting with {workers} worker processes...")
+        # Hand out files in batches so IPC overhead stays small on large trees
+        chunksize = max(1, len(pending) // (workers * 8))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(
+                _encrypt_file,
+                repeat(aes_key), repeat(source_dir), repeat(encrypted_dir),
+                pending, known_hashes, repeat(dedup),
+                chunksize=chunksize
+            ))
+    
+    encryptor = FileEncryptor(aes_key)
+    known = dict(zip(pending, known_hashes))
+    stream_size = in_flight // 4
+    
+    def read(file_path):
+        if os.stat(file_path).st_size > stream_size:
+            return None
+        return _read_file(file_path)
+    
+    def process(file_path, loaded):
+        if loaded is None:
+            return _encrypt_file(aes_key, source_dir, encrypted_dir, file_path,
+                                 known[file_path], dedup), None
+        return _encrypt_loaded(encryptor, source_dir, encrypted_dir, file_path, loaded,
+                               known[file_path], dedup)
+    
+    def on_error(file_path, error):
+        return Path(file_path).relative_to(source_dir).as_posix(), None, str(error), False, None
+    
+    # Streamed files only hold a segment or two in memory
+    size_of = lambda file_path: min(os.stat(file_path).st_size, stream_size)
+    return run_pipeline(pending, read, process, lambda _, write: _write_encrypted(*write),
+                        size_of=size_of, max_in_flight=in_flight, on_error=on_error)
+
+
+def load_manifest(encrypted_dir):
+    """Load manifest.json, normalising keys written with Windows separators."""
+    manifest_path = Path(encrypted_dir) / "manifest.json"
+    if not manifest_path.exists():
+        return {}
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    return {key.replace('\\', '/'): entry for key, entry in manifest.items()}
+
+
+def save_manifest(encrypted_dir, manifest):
+    """Write manifest.json atomically (sorted by path)."""
+    manifest_path = Path(encrypted_dir) / "manifest.json"
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def _is_unchanged(entry, file_path):
+    """Cheap stat-only check against a manifest entry (no read, no hashing)."""
+    if not entry or 'content_hash' not in entry:
+        return False
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return False
+    return stat.st_size == entry['size'] and stat.st_mtime_ns == entry.get('mtime')
+
+
+def _remove_orphan(encrypted_dir, relative_path):
+    """Delete the .enc file of a source file that no longer exists."""
+    output_path = encrypted_dir / f"{relative_path}.enc"
+    if output_path.exists():
+        output_path.unlink()
+    
+    # Drop its encrypted bytecode caches as well
+    if relative_path.endswith(".py"):
+        cache_dir = output_path.parent / "__pycache__"
+        for cache_file in cache_dir.glob(f"{Path(relative_path).stem}.*.pyc.enc"):
+            cache_file.unlink()
+        if cache_dir.exists() and not any(cache_dir.iterdir()):
+            cache_dir.rmdir()
+    
+    # Prune directories left empty, but never encrypted/ itself
+    parent = output_path.parent
+    while parent != encrypted_dir and parent.exists() and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def encrypt_source_to_encrypted(workers=1, incremental=False, dedup=None,
+                                in_flight=DEFAULT_IN_FLIGHT):
+    """
+    Encrypt all files from source/ folder to encrypted/ folder.
+    
+    Args:
+        workers: Number of worker processes (1 = pipelined, 0 = all cores)
+        incremental: Only re-encrypt added/changed files and delete orphaned
+                     .enc files, reusing the existing AES key
+        dedup: Store each unique content once under encrypted/blobs/
+               (None = keep the layout of an incrementally updated tree)
+        in_flight: Bytes the single-process pipeline may hold in memory
+    """
     print("\n" + "="*60)
     print("🔐 Encrypting Source Code")
     print("="*60)
@@ -27,8 +318,8 @@ def encrypt_source_to_encrypted():
     # Initialize
     key_manager = KeyManager()
     encryptor = FileEncryptor()
-    scanner = FileScanner()
     repoignore = RepoIgnore()
+    scanner = FileScanner(repoignore)
     
     # Load or create keys
     if not key_manager.load_private_key():
@@ -44,19 +335,34 @@ def encrypt_source_to_encrypted():
         print("❌ Error: source/ folder not found!")
         sys.exit(1)
     
-    # Clear encrypted folder
     encrypted_dir = Path("encrypted")
-    if encrypted_dir.exists():
-        print("🗑️  Cleaning encrypted/ folder...")
-        shutil.rmtree(encrypted_dir)
-    encrypted_dir.mkdir(exist_ok=True)
+    key_path = encrypted_dir / "aes_key.bin"
+    manifest_path = encrypted_dir / "manifest.json"
+    
+    if incremental and not (key_path.exists() and manifest_path.exists()):
+        print("⚠️  No previous encryption found, doing a full encrypt...")
+        incremental = False
+    
+    previous = load_manifest(encrypted_dir) if incremental else {}
+    if dedup is None:
+        dedup = incremental and uses_blob_store(encrypted_dir)
+    
+    # Clear encrypted folder
+    if not incremental:
+        if encrypted_dir.exists():
+            print("🗑️  Cleaning encrypted/ folder...")
+            shutil.rmtree(encrypted_dir)
+        encrypted_dir.mkdir(exist_ok=True)
     
     # Scan source folder
     print("📁 Scanning source/ folder...")
     files = []
-    for file_path in source_dir.rglob("*"):
-        if file_path.is_file() and not repoignore.is_ignored(str(file_path)):
-            files.append(str(file_path))
+    # Patterns match relative to source/; ignored directories are pruned
+    for file_path in scanner.iter_files(source_dir):
+        # Interpreter bytecode is never source - encrypted/ keeps its own cache
+        if "__pycache__" in file_path.parts or file_path.suffix in (".pyc", ".pyo"):
+            continue
+        files.append(str(file_path))
     
     print(f"   Found {len(files)} files to encrypt")
     print()
@@ -65,63 +371,110 @@ def encrypt_source_to_encrypted():
         print("❌ No files found to encrypt!")
         sys.exit(1)
     
-    # Generate AES key for file encryption
-    aes_key, _ = encryptor.generate_key()
+    # Split into files that need work and files whose stat still matches
+    manifest = {}
+    pending = []
+    for file_path in files:
+        relative_path = Path(file_path).relative_to(source_dir).as_posix()
+        entry = previous.get(relative_path)
+        if incremental and _is_unchanged(entry, file_path):
+            manifest[relative_path] = entry
+        else:
+            pending.append(file_path)
+    
+    seen = {Path(f).relative_to(source_dir).as_posix() for f in files}
+    orphans = sorted(set(previous) - seen)
+    
+    index_missing = not index_exists(encrypted_dir)
+    
+    if incremental and not pending and not orphans and not index_missing:
+        print("✅ Encrypted folder is up to date")
+        print()
+        return
+    
+    if incremental:
+        # Reuse the existing AES key so unchanged .enc files stay valid
+        # (served by the key agent if it is running)
+        with open(key_path, 'rb') as f:
+            aes_key = unwrap_aes_key(f.read(), key_manager)
+    else:
+        # Generate AES key for file encryption
+        aes_key, _ = encryptor.generate_key()
+    
+    # Search index keys are derived from the AES key, so a full encrypt
+    # (new key) always starts a fresh index
+    search_index = BlindIndex(aes_key, encrypted_dir)
+    if incremental:
+        search_index.load()
     
     # Encrypt each file
-    manifest = {}
     success_count = 0
+    written_count = 0
+    known_hashes = [
+        previous.get(Path(f).relative_to(source_dir).as_posix(), {}).get('content_hash')
+        for f in pending
+    ]
     
-    for file_path in files:
-        try:
-            # Read file
-            with open(file_path, 'rb') as f:
-                data = f.read()
-            
-            # Encrypt using AES-256-GCM
-            from Crypto.Cipher import AES
-            cipher = AES.new(aes_key, AES.MODE_GCM)
-            ciphertext, tag = cipher.encrypt_and_digest(data)
-            
-            # Determine output path (preserve directory structure)
-            relative_path = Path(file_path).relative_to(source_dir)
-            output_path = encrypted_dir / f"{relative_path}.enc"
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Write encrypted file: [nonce][tag][ciphertext]
-            with open(output_path, 'wb') as f:
-                f.write(cipher.nonce)  # 16 bytes
-                f.write(tag)           # 16 bytes
-                f.write(ciphertext)
-            
-            manifest[str(relative_path)] = {
-                'original': file_path,
-                'encrypted': str(output_path),
-                'size': len(data)
-            }
-            
+    results = _encrypt_files(aes_key, source_dir, encrypted_dir, pending,
+                             known_hashes, workers, dedup, in_flight)
+    
+    # Merge results in path order so manifest.json is deterministic
+    for relative_path, entry, error, written, tokens in sorted(results, key=lambda r: r[0]):
+        if error is None:
+            manifest[relative_path] = entry
             success_count += 1
-            print(f"   ✅ {relative_path}")
-            
-        except Exception as e:
-            print(f"   ❌ {file_path}: {e}")
+            if written:
+                written_count += 1
+                search_index.set_tokens(relative_path, tokens)
+                print(f"   ✅ {relative_path}")
+        else:
+            print(f"   ❌ {source_dir / relative_path}: {error}")
+            # Keep the old entry so its .enc file is still tracked and retried
+            if relative_path in previous:
+                manifest[relative_path] = previous[relative_path]
     
-    # Encrypt and save AES key using RSA
-    encrypted_key = key_manager.encrypt_data(aes_key)
-    key_path = encrypted_dir / "aes_key.bin"
-    with open(key_path, 'wb') as f:
-        f.write(encrypted_key)
+    for relative_path in orphans:
+        _remove_orphan(encrypted_dir, relative_path)
+        search_index.remove_file(relative_path)
+        print(f"   🗑️  {relative_path}")
+    
+    # Blobs of deleted or changed content that nothing points to any more
+    removed_blobs = remove_unreferenced_blobs(encrypted_dir, manifest)
+    
+    if incremental and index_missing:
+        # First incremental run after upgrading: index files that were kept
+        print("🔎 Building search index...")
+        written_paths = {r[0] for r in results if r[3]}
+        for relative_path, entry in manifest.items():
+            if relative_path not in written_paths and entry['size'] <= MAX_INDEXED_BYTES:
+                with open(source_dir / relative_path, 'rb') as f:
+                    search_index.update_file(relative_path, f.read())
+    
+    search_index.save()
+    
+    if not incremental:
+        # Encrypt and save AES key using RSA
+        encrypted_key = key_manager.encrypt_data(aes_key)
+        with open(key_path, 'wb') as f:
+            f.write(encrypted_key)
     
     # Save manifest
-    import json
-    manifest_path = encrypted_dir / "manifest.json"
-    with open(manifest_path, 'w') as f:
-        json.dump(manifest, f, indent=2)
+    save_manifest(encrypted_dir, manifest)
     
     print()
     print("="*60)
     print(f"✅ Encryption Complete!")
-    print(f"   Encrypted {success_count}/{len(files)} files")
+    if incremental:
+        print(f"   Re-encrypted {written_count} changed files, "
+              f"removed {len(orphans)}, kept {len(files) - len(pending)} unchanged")
+        if success_count < len(pending):
+            print(f"   Failed: {len(pending) - success_count} files")
+    else:
+        print(f"   Encrypted {success_count}/{len(files)} files")
+    if dedup:
+        blobs = {entry['blob'] for entry in manifest.values() if entry.get('blob')}
+        print(f"   Deduplicated into {len(blobs)} unique blobs"
+              f"{f', removed {removed_blobs} unused' if removed_blobs else ''}")
     print(f"   Source folder: source/")
     print(f"   Encrypted folder: encrypted/")
     print(f"   Manifest: {manifest_path}")
@@ -132,6 +485,276 @@ def encrypt_source_to_encrypted():
     print()
 
 
+def _sync_changes(aes_key, source_dir, encrypted_dir, scanner, manifest,
+                  search_index, changed, workers=1, dedup=False):
+    """
+    Bring encrypted/ in line with source/ for a batch of changed paths.
+    
+    Changed files are re-encrypted, deleted (or newly ignored) ones are
+    removed, and a changed directory re-checks everything below it, which
+    covers directory moves and deletes. manifest is updated in place.
+    
+    Returns:
+        (written, removed) relative paths
+    """
+    repoignore = scanner.repoignore
+    root = source_dir.resolve()
+    candidates = set()
+    
+    for path in changed:
+        try:
+            relative_path = Path(path).resolve().relative_to(root).as_posix()
+        except (ValueError, OSError):
+            continue
+        if relative_path == ".":
+            relative_path = ""
+        
+        full_path = source_dir / relative_path
+        if full_path.is_dir():
+            if not relative_path or not repoignore.is_ignored(relative_path, is_dir=True):
+                candidates.update(
+                    p.relative_to(source_dir).as_posix()
+                    for p in scanner.iter_files(source_dir, relative_path)
+                )
+        elif relative_path:
+            candidates.add(relative_path)
+        
+        # Files tracked below a directory that was moved away or deleted
+        prefix = relative_path + "/" if relative_path else ""
+        candidates.update(k for k in manifest if k.startswith(prefix))
+    
+    pending, removed = [], []
+    for relative_path in sorted(candidates):
+        parts = relative_path.split("/")
+        if "__pycache__" in parts or relative_path.endswith((".pyc", ".pyo")):
+            continue
+        full_path = source_dir / relative_path
+        if full_path.is_file() and not repoignore.is_ignored(relative_path):
+            if not _is_unchanged(manifest.get(relative_path), full_path):
+                pending.append(str(full_path))
+        elif relative_path in manifest:
+            removed.append(relative_path)
+    
+    known_hashes = [
+        manifest.get(Path(f).relative_to(source_dir).as_posix(), {}).get('content_hash')
+        for f in pending
+    ]
+    results = _encrypt_files(aes_key, source_dir, encrypted_dir, pending,
+                             known_hashes, workers, dedup)
+    
+    written = []
+    for relative_path, entry, error, was_written, tokens in sorted(results, key=lambda r: r[0]):
+        if error is not None:
+            print(f"   ❌ {source_dir / relative_path}: {error}")
+            continue
+        manifest[relative_path] = entry
+        if was_written:
+            written.append(relative_path)
+            search_index.set_tokens(relative_path, tokens)
+    
+    for relative_path in removed:
+        _remove_orphan(encrypted_dir, relative_path)
+        search_index.remove_file(relative_path)
+        del manifest[relative_path]
+    
+    if dedup:
+        remove_unreferenced_blobs(encrypted_dir, manifest)
+    
+    return written, removed
+
+
+def watch_source(debounce=0.5, workers=1):
+    """
+    Keep encrypted/ in sync with source/ until interrupted.
+    
+    Starts with an incremental encrypt, then re-encrypts only the files
+    touched by each burst of file-system events once it has been quiet for
+    `debounce` seconds (an editor save or a git checkout is one batch).
+    
+    Args:
+        debounce: Quiet period in seconds before a batch is processed
+        workers: Worker processes per batch (1 = sequential, 0 = all cores)
+    """
+    try:
+        from watchdog.observers import Observer
+    except ImportError:
+        print("❌ Error: watchdog is not installed (pip install watchdog)")
+        sys.exit(1)
+    
+    encrypt_source_to_encrypted(workers=workers, incremental=True)
+    
+    source_dir = Path("source")
+    encrypted_dir = Path("encrypted")
+    scanner = FileScanner(RepoIgnore())
+    
+    # Unwrap the AES key once for the whole session
+    with open(encrypted_dir / "aes_key.bin", 'rb') as f:
+        aes_key = unwrap_aes_key(f.read())
+    if aes_key is None:
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    manifest = load_manifest(encrypted_dir)
+    search_index = BlindIndex(aes_key, encrypted_dir).load()
+    dedup = uses_blob_store(encrypted_dir)
+    
+    collector = ChangeCollector()
+    observer = Observer()
+    observer.schedule(collector, str(source_dir), recursive=True)
+    observer.start()
+    
+    print(f"👀 Watching source/ (debounce {debounce}s) - press Ctrl+C to stop")
+    print()
+    try:
+        while True:
+            changed = collector.drain(debounce)
+            written, removed = _sync_changes(aes_key, source_dir, encrypted_dir, scanner,
+                                             manifest, search_index, changed, workers, dedup)
+            if not written and not removed:
+                continue
+            search_index.save()
+            save_manifest(encrypted_dir, manifest)
+            for relative_path in written:
+                print(f"   ✅ {relative_path}")
+            for relative_path in removed:
+                print(f"   🗑️  {relative_path}")
+            print(f"🔄 {time.strftime('%H:%M:%S')} synced "
+                  f"{len(written)} encrypted, {len(removed)} removed")
+    except KeyboardInterrupt:
+        print("\n🛑 Stopped watching")
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def decrypt_encrypted_to(output="decrypted", in_flight=DEFAULT_IN_FLIGHT):
+    """
+    Decrypt every file in manifest.json from encrypted/ into output/.
+    
+    Reading, decrypting and writing overlap in the I/O pipeline
+    (mvp17.utils.io_pipeline); deduplicated paths are read from their blob.
+    
+    Args:
+        output: Folder to write the plaintext tree to
+        in_flight: Bytes the pipeline may hold in memory
+    """
+    encrypted_dir = Path("encrypted")
+    output_dir = Path(output)
+    key_path = encrypted_dir / "aes_key.bin"
+    
+    if not key_path.exists() or not (encrypted_dir / "manifest.json").exists():
+        print("❌ Error: Encrypted code not found!")
+        print("   Please encrypt source code first:")
+        print("   python manage_encryption.py encrypt")
+        sys.exit(1)
+    if output_dir.resolve() == encrypted_dir.resolve():
+        print("❌ Error: Output folder must not be encrypted/")
+        sys.exit(1)
+    
+    with open(key_path, 'rb') as f:
+        aes_key = unwrap_aes_key(f.read())
+    if aes_key is None:
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    manifest = load_manifest(encrypted_dir)
+    encryptor = FileEncryptor(aes_key)
+    stream_size = in_flight // 4
+    
+    def stored_path(relative_path):
+        blob = manifest[relative_path].get('blob')
+        return blob_path(encrypted_dir, blob) if blob else encrypted_dir / f"{relative_path}.enc"
+    
+    def read(relative_path):
+        path = stored_path(relative_path)
+        if os.stat(path).st_size > stream_size:
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    def process(relative_path, blob):
+        if blob is None:
+            # Too big to hold in memory - stream it straight to disk
+            encryptor.decrypt_file(stored_path(relative_path), output_dir / relative_path)
+            return (relative_path, None), None
+        return (relative_path, None), encryptor.decrypt_bytes(blob)
+    
+    def write(relative_path, data):
+        _write_file(output_dir / relative_path, data)
+    
+    print(f"🔓 Decrypting {len(manifest)} files into {output_dir}/...")
+    start = time.perf_counter()
+    results = run_pipeline(
+        sorted(manifest), read, process, write,
+        size_of=lambda relative_path: min(os.stat(stored_path(relative_path)).st_size, stream_size),
+        max_in_flight=in_flight,
+        on_error=lambda relative_path, error: (relative_path, str(error)),
+    )
+    failed = [(relative_path, error) for relative_path, error in results if error is not None]
+    for relative_path, error in failed:
+        print(f"   ❌ {relative_path}: {error}")
+    
+    print(f"✅ Decrypted {len(results) - len(failed)}/{len(results)} files "
+          f"in {time.perf_counter() - start:.2f}s")
+    print(f"⚠️  {output_dir}/ holds plaintext - keep it out of git and Copilot's view")
+    if failed:
+        sys.exit(1)
+
+
+def pack_encrypted():
+    """Pack encrypted/ into encrypted/encrypted.pack (one mmap-able file)."""
+    encrypted_dir = Path("encrypted")
+    key_path = encrypted_dir / "aes_key.bin"
+    
+    if not key_path.exists():
+        print("❌ Error: Encrypted code not found!")
+        print("   Please encrypt source code first:")
+        print("   python manage_encryption.py encrypt")
+        sys.exit(1)
+    
+    with open(key_path, 'rb') as f:
+        aes_key = unwrap_aes_key(f.read())
+    if aes_key is None:
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    pack_path = encrypted_dir / PACK_FILENAME
+    count = build_pack(encrypted_dir, aes_key, pack_path)
+    print(f"📦 Packed {count} files into {pack_path} "
+          f"({pack_path.stat().st_size / 1024:.1f} KB)")
+    print("   The launchers use it until a file in encrypted/ changes")
+
+
+def search_encrypted(query, prefix=False):
+    """Search the encrypted tree through its blind index (no file is decrypted)."""
+    encrypted_dir = Path("encrypted")
+    key_path = encrypted_dir / "aes_key.bin"
+    
+    if not query:
+        print("❌ Error: No keyword given!")
+        print("   Use: python manage_encryption.py search KEYWORD")
+        sys.exit(1)
+    
+    if not key_path.exists() or not index_exists(encrypted_dir):
+        print("❌ Error: Search index not found!")
+        print("   Please encrypt source code first:")
+        print("   python manage_encryption.py encrypt")
+        sys.exit(1)
+    
+    with open(key_path, 'rb') as f:
+        aes_key = unwrap_aes_key(f.read())
+    if aes_key is None:
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    matches = BlindIndex(aes_key, encrypted_dir).load().search(query, prefix=prefix)
+    
+    print(f"\n🔎 {len(matches)} file(s) matching '{query}'{' (prefix)' if prefix else ''}:")
+    for relative_path in matches:
+        print(f"   {relative_path}")
+    print()
+
+
 def show_status():
     """Show current encryption status."""
     print("\n" + "="*60)
@@ -151,9 +774,13 @@ def show_status():
     
     # Check encrypted folder
     if encrypted_dir.exists():
-        encrypted_files = list(encrypted_dir.rglob("*.enc"))
+        encrypted_files = [
+            f for f in encrypted_dir.rglob("*.enc") if "__pycache__" not in f.parts
+        ]
         manifest_path = encrypted_dir / "manifest.json"
         print(f"🔐 Encrypted folder: {len(encrypted_files)} encrypted files")
+        if uses_blob_store(encrypted_dir):
+            print(f"   Deduplicated: {len(load_manifest(encrypted_dir))} paths share these blobs")
         if manifest_path.exists():
             print(f"   Manifest: ✅ Found")
         else:
@@ -188,6 +815,19 @@ def main():
         print("Usage:")
         print("  python manage_encryption.py encrypt   - Encrypt source/ to encrypted/")
         print("  python manage_encryption.py status    - Show encryption status")
+        print("  python manage_encryption.py search KEYWORD - Search encrypted files")
+        print("  python manage_encryption.py watch     - Re-encrypt changes as they happen")
+        print("  python manage_encryption.py pack      - Pack encrypted/ into one archive")
+        print("  python manage_encryption.py decrypt   - Decrypt encrypted/ into decrypted/")
+        print()
+        print("Options:")
+        print("  encrypt --workers N   - Encrypt with N processes (0 = all cores)")
+        print("  encrypt --incremental - Only re-encrypt changed files")
+        print("  encrypt --dedup       - Store identical files once (content-addressed)")
+        print("  --in-flight MB        - Memory budget of the encrypt/decrypt pipeline")
+        print("  decrypt --output DIR  - Folder to decrypt into (default decrypted/)")
+        print("  search --prefix       - Match identifier prefixes")
+        print("  watch --debounce S    - Quiet period before syncing (default 0.5s)")
         print()
         print("Folder Structure:")
         print("  source/      - Original unencrypted source code")
@@ -196,15 +836,45 @@ def main():
         print()
         sys.exit(1)
     
-    command = sys.argv[1].lower()
+    parser = argparse.ArgumentParser(description='Manage source code encryption')
+    parser.add_argument('command', type=str.lower,
+                       help='Command: encrypt, status, search, watch, pack, decrypt')
+    parser.add_argument('query', nargs='*', help='Keywords for search')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                       help='Worker processes for encrypt (1 = sequential, 0 = all cores)')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                       help='Only re-encrypt added/changed files and remove orphans')
+    parser.add_argument('--dedup', action='store_true',
+                       help='Encrypt: store each unique file content once under encrypted/blobs/')
+    parser.add_argument('--in-flight', type=int, default=DEFAULT_IN_FLIGHT // (1024 * 1024),
+                       help='Encrypt/decrypt: MB read but not yet written (default %(default)s)')
+    parser.add_argument('-o', '--output', default='decrypted',
+                       help='Decrypt: folder to write the plaintext tree to')
+    parser.add_argument('--prefix', action='store_true',
+                       help='Search: match keywords as identifier prefixes')
+    parser.add_argument('--debounce', type=float, default=0.5,
+                       help='Watch: seconds without events before a batch is synced')
+    
+    args = parser.parse_intermixed_args()
+    command = args.command
+    in_flight = max(1, args.in_flight) * 1024 * 1024
     
     if command == "encrypt":
-        encrypt_source_to_encrypted()
+        encrypt_source_to_encrypted(workers=args.workers, incremental=args.incremental,
+                                    dedup=True if args.dedup else None, in_flight=in_flight)
     elif command == "status":
         show_status()
+    elif command == "search":
+        search_encrypted(" ".join(args.query), prefix=args.prefix)
+    elif command == "watch":
+        watch_source(debounce=args.debounce, workers=args.workers)
+    elif command == "pack":
+        pack_encrypted()
+    elif command == "decrypt":
+        decrypt_encrypted_to(args.output, in_flight=in_flight)
     else:
         print(f"❌ Unknown command: {command}")
-        print("   Use: encrypt, status")
+        print("   Use: encrypt, status, search, watch, pack, decrypt")
         sys.exit(1)
 
 
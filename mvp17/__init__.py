@@ -0,0 +1,7 @@
+"""
+Encryption tooling used by the root scripts (manage_encryption.py,
+run_local.py, run_encrypted_webapp.py, ...).
+
+Kept in its own package so the protected code in source/crypto and
+source/utils, which the scripts put first on sys.path, cannot shadow it.
+"""
@@ -0,0 +1,256 @@
+"""
+Blind-index keyword search over the encrypted tree.
+
+Built at encrypt time next to manifest.json (encrypted/search_index.json):
+
+    postings:  token       -> encrypted [document ids], where
+                              token = HMAC(k_token, term); kept sorted
+    docs:      document id -> encrypted relative path
+    doc_terms: document id -> encrypted list of its tokens
+
+Terms are whole identifiers, their snake_case/camelCase parts and their
+prefixes (3-16 characters), all lower-cased. A query is hashed the same way
+and answered with one small decrypt per query word - the posting list of
+that token and nothing else. Every posting list is sealed on its own, so
+re-indexing one file (through doc_terms) re-seals only the postings of
+the tokens it had or has, however large the repository.
+
+Without the key the index reveals neither terms nor paths. The number of
+distinct tokens and the length of each posting list (how many files share
+an unknown term) are visible.
+"""
+
+import os
+import re
+import hmac
+import json
+import base64
+import hashlib
+from pathlib import Path
+from typing import AbstractSet, Dict, Iterable, List, Optional, Set, Union
+
+from mvp17.crypto.file_encryptor import FileEncryptor
+
+
+INDEX_FILENAME = "search_index.json"
+INDEX_VERSION = 1
+
+MIN_PREFIX = 3
+MAX_PREFIX = 16
+MAX_INDEXED_BYTES = 1024 * 1024  # larger files are stored but not indexed
+
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+_WORD_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+
+
+def extract_terms(text: str) -> Set[str]:
+    """Identifiers in text plus their snake_case / camelCase sub-words."""
+    terms = set()
+    for identifier in set(_IDENTIFIER.findall(text)):
+        terms.add(identifier.lower())
+        for chunk in identifier.split('_'):
+            for part in _WORD_PART.findall(chunk):
+                if len(part) > 1:
+                    terms.add(part.lower())
+    return terms
+
+
+def index_exists(encrypted_dir: Union[str, Path] = "encrypted") -> bool:
+    """True if encrypted/ holds a search index in the current format."""
+    path = Path(encrypted_dir) / INDEX_FILENAME
+    if not path.exists():
+        return False
+    try:
+        with open(path, 'r') as f:
+            return json.load(f).get('version') == INDEX_VERSION
+    except (OSError, ValueError):
+        return False
+
+
+class BlindIndex:
+    """Keyed keyword index whose tokens and posting lists are opaque without the key."""
+
+    def __init__(self, key: bytes, encrypted_dir: Union[str, Path] = "encrypted"):
+        """
+        Args:
+            key: The repository AES key (index keys are derived from it)
+            encrypted_dir: Folder holding manifest.json and the index
+        """
+        self.path = Path(encrypted_dir) / INDEX_FILENAME
+        token_key = hmac.new(key, b"mvp17-blind-index-token", hashlib.sha256).digest()
+        # Keyed once; copying the primed HMAC is much cheaper than hmac.new()
+        self._token_mac = hmac.new(token_key, digestmod=hashlib.sha256)
+        self._doc_key = hmac.new(key, b"mvp17-blind-index-doc", hashlib.sha256).digest()
+        self._encryptor = FileEncryptor(
+            hmac.new(key, b"mvp17-blind-index-postings", hashlib.sha256).digest()
+        )
+        self.postings: Dict[str, str] = {}
+        self.docs: Dict[str, str] = {}
+        self.doc_terms: Dict[str, str] = {}
+        # Posting lists changed since the last save(), re-sealed there
+        self._changed: Dict[str, Set[str]] = {}
+
+    # ------------------------------------------------------------------
+    # Tokens
+    # ------------------------------------------------------------------
+
+    def _token(self, kind: str, term: str) -> str:
+        mac = self._token_mac.copy()
+        mac.update(f"{kind}:{term}".encode('utf-8'))
+        return mac.hexdigest()[:32]
+
+    def doc_id(self, relative_path: str) -> str:
+        return hmac.new(self._doc_key, relative_path.encode('utf-8'),
+                        hashlib.sha256).hexdigest()[:24]
+
+    def tokens_for(self, data: bytes) -> Optional[List[str]]:
+        """
+        Blind tokens for a file's contents (exact terms and prefixes).
+
+        Safe to call in worker processes. Returns None for files that are
+        too large or not UTF-8 text, which are left out of the index.
+        """
+        if len(data) > MAX_INDEXED_BYTES:
+            return None
+        try:
+            text = data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+        tokens = set()
+        for term in extract_terms(text):
+            tokens.add(self._token("t", term))
+            for length in range(MIN_PREFIX, min(len(term), MAX_PREFIX) + 1):
+                tokens.add(self._token("p", term[:length]))
+        return sorted(tokens)
+
+    # ------------------------------------------------------------------
+    # Encrypted values
+    # ------------------------------------------------------------------
+
+    def _seal(self, value) -> str:
+        data = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        return base64.b64encode(self._encryptor.encrypt_bytes(data)).decode('ascii')
+
+    def _open(self, sealed: str):
+        return json.loads(self._encryptor.decrypt_bytes(base64.b64decode(sealed)))
+
+    def _posting(self, token: str) -> AbstractSet[str]:
+        """Document ids for a token; read-only, never changes the index."""
+        posting = self._changed.get(token)
+        if posting is not None:
+            return posting
+        sealed = self.postings.get(token)
+        return frozenset(self._open(sealed)) if sealed else frozenset()
+
+    def _editable_posting(self, token: str) -> Set[str]:
+        """Document ids for a token, to be changed and re-sealed in save()."""
+        posting = self._changed.get(token)
+        if posting is None:
+            posting = self._changed[token] = set(self._posting(token))
+        return posting
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def set_tokens(self, relative_path: str, tokens: Optional[Iterable[str]]):
+        """(Re-)index one file from tokens produced by tokens_for()."""
+        self.remove_file(relative_path)
+        if tokens is None:
+            return
+        tokens = list(tokens)
+        doc_id = self.doc_id(relative_path)
+        self.docs[doc_id] = self._seal(relative_path)
+        self.doc_terms[doc_id] = self._seal(tokens)
+        for token in tokens:
+            self._editable_posting(token).add(doc_id)
+
+    def update_file(self, relative_path: str, data: bytes):
+        """(Re-)index one file from its plaintext."""
+        self.set_tokens(relative_path, self.tokens_for(data))
+
+    def remove_file(self, relative_path: str):
+        """Drop a file from every posting list it appears in."""
+        doc_id = self.doc_id(relative_path)
+        sealed_terms = self.doc_terms.pop(doc_id, None)
+        self.docs.pop(doc_id, None)
+        if sealed_terms is None:
+            return
+        for token in self._open(sealed_terms):
+            self._editable_posting(token).discard(doc_id)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def search(self, query: str, prefix: bool = False) -> List[str]:
+        """
+        Files containing every word of the query.
+
+        Args:
+            query: One or more identifiers / words (case-insensitive)
+            prefix: Match words as identifier prefixes ("enc" finds
+                    "encrypt_file"); prefixes longer than 16 characters
+                    are truncated, so such results are candidates
+
+        Returns:
+            Sorted relative paths of matching files
+        """
+        words = [w.lower() for w in _IDENTIFIER.findall(query)]
+        if not words:
+            return []
+
+        matches: Optional[Set[str]] = None
+        for word in words:
+            if prefix:
+                token = self._token("p", word[:MAX_PREFIX]) if len(word) >= MIN_PREFIX \
+                    else self._token("t", word)
+            else:
+                token = self._token("t", word)
+            posting = self._posting(token)
+            matches = set(posting) if matches is None else matches & posting
+            if not matches:
+                return []
+
+        return sorted(self._open(self.docs[doc_id]) for doc_id in matches
+                      if doc_id in self.docs)
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def exists(self) -> bool:
+        return index_exists(self.path.parent)
+
+    def load(self) -> "BlindIndex":
+        """Load the index from disk (no-op if it doesn't exist yet)."""
+        if self.path.exists():
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            if data.get('version') == INDEX_VERSION:
+                self.postings = data['postings']
+                self.docs = data['docs']
+                self.doc_terms = data['doc_terms']
+                self._changed.clear()
+        return self
+
+    def save(self):
+        """Re-seal changed posting lists and write the index atomically."""
+        for token, ids in self._changed.items():
+            if ids:
+                self.postings[token] = self._seal(sorted(ids))
+            else:
+                self.postings.pop(token, None)
+        self._changed.clear()
+
+        data = {
+            'version': INDEX_VERSION,
+            'docs': dict(sorted(self.docs.items())),
+            'doc_terms': dict(sorted(self.doc_terms.items())),
+            'postings': dict(sorted(self.postings.items())),
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,237 @@
+"""
+Content-addressed, deduplicated storage for the encrypted tree.
+
+With deduplication on, encrypted/ keeps one encrypted blob per unique
+plaintext instead of one .enc file per path:
+
+    encrypted/blobs/<id[:2]>/<id>.enc
+
+The blob id is the keyed content hash manifest.json already records
+(HMAC-SHA256 under a key derived from the AES key), so ids reveal nothing
+about contents without the key. manifest.json maps each path to its blob
+("blob": id); identical files (vendored libraries, generated __init__.py
+files, copies) share one blob, and content that already has a blob is
+never encrypted or written again.
+
+Readers resolve paths through load_blob_map(); paths without a "blob"
+entry keep their loose <path>.enc file, so a tree may mix both layouts.
+"""
+
+import os
+import hmac
+import json
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Tuple, Union
+
+from mvp17.crypto.file_encryptor import FileEncryptor
+
+
+BLOBS_DIRNAME = "blobs"
+BLOB_SUFFIX = ".enc"
+
+PathLike = Union[str, Path]
+
+
+def content_hasher(aes_key: bytes):
+    """
+    Keyed hasher for the content hashes recorded in manifest.json.
+
+    HMAC-SHA256 under a key derived from the AES key, so the manifest can
+    be committed next to the .enc files without letting anyone confirm
+    guesses about file contents.
+    """
+    hash_key = hmac.new(aes_key, b"mvp17-manifest-content-hash", hashlib.sha256).digest()
+    return hmac.new(hash_key, digestmod=hashlib.sha256)
+
+
+def file_content_hash(aes_key: bytes, file_path: PathLike) -> str:
+    """Stream a file through the keyed content hasher."""
+    hasher = content_hasher(aes_key)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def blob_name(blob_id: str) -> str:
+    """Path of a blob relative to the encrypted root."""
+    return f"{BLOBS_DIRNAME}/{blob_id[:2]}/{blob_id}{BLOB_SUFFIX}"
+
+
+def blob_path(encrypted_dir: PathLike, blob_id: str) -> Path:
+    return Path(encrypted_dir) / blob_name(blob_id)
+
+
+def uses_blob_store(encrypted_dir: PathLike) -> bool:
+    """Whether the tree in encrypted_dir is (at least partly) deduplicated."""
+    return (Path(encrypted_dir) / BLOBS_DIRNAME).is_dir()
+
+
+def store_file(aes_key: bytes, encrypted_dir: PathLike, file_path: PathLike,
+               blob_id: Optional[str] = None) -> Tuple[str, int, bool]:
+    """
+    Make sure a blob holding file_path's content exists.
+
+    The file is hashed first; only if no blob has that id yet is it
+    encrypted. The hash is recomputed while encrypting, so a file edited
+    in between still lands under the id of what was actually encrypted.
+
+    Args:
+        blob_id: The file's content hash, if already known
+
+    Returns:
+        (blob_id, plaintext size, whether a new blob was written)
+    """
+    if blob_id is None:
+        blob_id = file_content_hash(aes_key, file_path)
+    target = blob_path(encrypted_dir, blob_id)
+    if target.exists():
+        return blob_id, os.stat(file_path).st_size, False
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    hasher = content_hasher(aes_key)
+    # Unique temp name: parallel workers may store the same content at once
+    fd, tmp_path = tempfile.mkstemp(dir=target.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'wb') as dst, open(file_path, 'rb') as src:
+            size = FileEncryptor(aes_key).encrypt_stream(
+                src, dst, os.fstat(src.fileno()).st_size, hasher)
+        actual_id = hasher.hexdigest()
+        if actual_id != blob_id:
+            blob_id = actual_id
+            target = blob_path(encrypted_dir, blob_id)
+            target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return blob_id, size, True
+
+
+def load_blob_map(encrypted_dir: PathLike, pack=None) -> Dict[str, str]:
+    """
+    Map "<path>.enc" names to the blob holding them, from manifest.json.
+
+    Args:
+        pack: PackFile to read the manifest from instead of the directory
+
+    Returns:
+        Relative .enc name -> relative blob name, for deduplicated paths only
+    """
+    try:
+        if pack is not None:
+            data = pack.read_raw("manifest.json")
+        else:
+            with open(Path(encrypted_dir) / "manifest.json", 'rb') as f:
+                data = f.read()
+        manifest = json.loads(data)
+    except (KeyError, OSError, ValueError):
+        return {}
+    blobs = {}
+    for path, entry in manifest.items():
+        if entry.get('blob'):
+            blobs[path.replace('\\', '/') + ".enc"] = blob_name(entry['blob'])
+    return blobs
+
+
+def remove_unreferenced_blobs(encrypted_dir: PathLike,
+                              manifest: Mapping[str, dict]) -> int:
+    """
+    Delete blobs no manifest entry points to any more.
+
+    Returns:
+        Number of blobs removed
+    """
+    blobs_dir = Path(encrypted_dir) / BLOBS_DIRNAME
+    if not blobs_dir.is_dir():
+        return 0
+    referenced = {entry['blob'] for entry in manifest.values() if entry.get('blob')}
+    removed = 0
+    for fanout_dir in blobs_dir.iterdir():
+        if not fanout_dir.is_dir():
+            continue
+        for path in fanout_dir.glob(f"*{BLOB_SUFFIX}"):
+            if path.name[:-len(BLOB_SUFFIX)] not in referenced:
+                path.unlink()
+                removed += 1
+        if not any(fanout_dir.iterdir()):
+            fanout_dir.rmdir()
+    return removed
+
+
+def locate(encrypted_dir: PathLike, enc_name: str) -> Path:
+    """File holding "<path>.enc": its blob if deduplicated, else the loose file."""
+    blob = load_blob_map(encrypted_dir).get(enc_name)
+    return Path(encrypted_dir) / (blob or enc_name)
+
+
+def update_manifest_entries(encrypted_dir: PathLike,
+                            updates: Mapping[str, dict]) -> Dict[str, dict]:
+    """
+    Merge fields into manifest.json entries and write it atomically.
+
+    Args:
+        updates: Relative path (manifest key) -> fields to set; paths
+                 without an entry are skipped
+
+    Returns:
+        The updated manifest
+    """
+    manifest_path = Path(encrypted_dir) / "manifest.json"
+    with open(manifest_path, 'r') as f:
+        manifest = json.load(f)
+    for relative_path, fields in updates.items():
+        if relative_path in manifest:
+            manifest[relative_path].update(fields)
+
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(dict(sorted(manifest.items())), f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def update_blob(aes_key: bytes, encrypted_dir: PathLike, relative_path: str,
+                file_path: PathLike) -> str:
+    """
+    Store file_path as the new content of a deduplicated path.
+
+    Points the path's manifest.json entry at the new blob and removes the
+    old blob if nothing else uses it.
+
+    Returns:
+        The new blob id
+    """
+    return update_blobs(aes_key, encrypted_dir, {relative_path: file_path})[relative_path]
+
+
+def update_blobs(aes_key: bytes, encrypted_dir: PathLike,
+                 files: Mapping[str, PathLike], executor=None) -> Dict[str, str]:
+    """
+    update_blob() for many paths, with one manifest write and one cleanup.
+
+    Args:
+        files: Relative path (manifest key) -> file holding its new content
+        executor: concurrent.futures executor to store the blobs in parallel
+
+    Returns:
+        Relative path -> new blob id
+    """
+    encrypted_dir = Path(encrypted_dir)
+    paths = list(files)
+    store = lambda path: store_file(aes_key, encrypted_dir, files[path])
+    results = executor.map(store, paths) if executor is not None else map(store, paths)
+    blob_ids, updates = {}, {}
+    for relative_path, (blob_id, size, _) in zip(paths, results):
+        updates[relative_path] = {
+            'blob': blob_id, 'content_hash': blob_id, 'size': size,
+            'encrypted': blob_path(encrypted_dir, blob_id).as_posix(),
+        }
+        blob_ids[relative_path] = blob_id
+
+    manifest = update_manifest_entries(encrypted_dir, updates)
+    remove_unreferenced_blobs(encrypted_dir, manifest)
+    return blob_ids
@@ -0,0 +1,264 @@
+"""
+Import hook that loads Python modules straight from encrypted/.
+
+Once installed, `import crypto.fhe_engine` resolves to
+encrypted/crypto/fhe_engine.py.enc and `import utils` to
+encrypted/utils/__init__.py.enc. A module is only decrypted - in memory,
+never to disk - when it is first imported, so modules that are never
+imported are never decrypted.
+
+Compiled code objects are cached next to the module as
+encrypted/<pkg>/__pycache__/<name>.<cache_tag>.pyc.enc, encrypted with the
+same key. A cache entry is bound to the interpreter's bytecode magic number
+and a SHA-256 of the .enc file, so editing the module, re-encrypting it or
+switching Python versions invalidates it automatically. Warm imports skip
+both the source decrypt and compile().
+
+If encrypted/ holds an up-to-date encrypted.pack (see mvp17.crypto.packfile),
+modules and any packed bytecode caches are read from the memory-mapped
+pack instead of one file each; fresh caches are still written to disk.
+
+In a deduplicated tree (see mvp17.crypto.blob_store) a module's bytes live in the
+blob manifest.json maps it to; its __file__ and bytecode cache keep the
+module's own path.
+"""
+
+import os
+import sys
+import marshal
+import hashlib
+import tempfile
+import importlib.abc
+import importlib.machinery
+import importlib.util
+from pathlib import Path
+from typing import Optional, Union
+
+from mvp17.crypto.blob_store import load_blob_map
+from mvp17.crypto.file_encryptor import FileEncryptor
+from mvp17.crypto.packfile import PackFile, open_pack
+from mvp17.utils import metrics
+
+
+ENC_SUFFIX = ".py.enc"
+CACHE_SUFFIX = ".pyc.enc"
+
+
+def cache_path_for(enc_path: Path) -> Optional[Path]:
+    """Location of the encrypted bytecode cache for a .py.enc file."""
+    cache_tag = sys.implementation.cache_tag
+    if cache_tag is None:
+        return None
+    name = enc_path.name[:-len(ENC_SUFFIX)]
+    return enc_path.parent / "__pycache__" / f"{name}.{cache_tag}{CACHE_SUFFIX}"
+
+
+class EncryptedModuleLoader(importlib.abc.InspectLoader):
+    """Decrypts and executes a single .py.enc module on demand."""
+
+    def __init__(self, encryptor: FileEncryptor, path: Path, is_package: bool,
+                 pack: Optional[PackFile] = None, pack_name: Optional[str] = None,
+                 blob: Union[str, Path, None] = None):
+        """
+        Args:
+            encryptor: FileEncryptor holding the repository key
+            path: The module's .py.enc path (also its __file__)
+            is_package: Whether the module is a package __init__
+            pack: Pack to read from instead of path, if the module is packed
+            pack_name: The module's relative path inside the pack
+            blob: Where a deduplicated tree stores the module instead of
+                  path - a pack entry name if pack is given, else a file
+        """
+        self.encryptor = encryptor
+        self.path = path
+        self._is_package = is_package
+        self.pack = pack
+        self.pack_name = pack_name
+        self.blob = blob
+
+    def _read_encrypted(self) -> bytes:
+        if self.pack is not None:
+            return self.pack.read_raw(self.blob or self.pack_name)
+        with open(self.blob or self.path, 'rb') as f:
+            return f.read()
+
+    def create_module(self, spec):
+        return None  # default module creation
+
+    def exec_module(self, module):
+        code = self.get_code(module.__name__)
+        with metrics.span(f"exec:{module.__name__}"):
+            exec(code, module.__dict__)
+
+    def is_package(self, fullname: str) -> bool:
+        return self._is_package
+
+    def get_source(self, fullname: str) -> str:
+        """Decrypted source text (also used by linecache for tracebacks)."""
+        return importlib.util.decode_source(self.encryptor.decrypt_bytes(self._read_encrypted()))
+
+    def get_code(self, fullname: str):
+        encrypted_source = self._read_encrypted()
+        cache_key = importlib.util.MAGIC_NUMBER + hashlib.sha256(encrypted_source).digest()
+
+        code = self._read_cache(cache_key)
+        if code is not None:
+            return code
+
+        with metrics.span("aes_decrypt"):
+            source = self.encryptor.decrypt_bytes(encrypted_source)
+        metrics.DECRYPTED_BYTES.inc(len(source))
+        with metrics.span("compile"):
+            code = compile(source, str(self.path), 'exec', dont_inherit=True)
+        self._write_cache(cache_key, code)
+        return code
+
+    def _read_cache(self, cache_key: bytes):
+        """Return the cached code object, or None if missing or stale."""
+        cache_path = cache_path_for(self.path)
+        if cache_path is None:
+            return None
+        try:
+            with open(cache_path, 'rb') as f:
+                blob = f.read()
+        except OSError:
+            # Fall back to a cache that was packed along with the module
+            cache_name = cache_path_for(Path(self.pack_name)).as_posix() if self.pack else None
+            if cache_name is None or cache_name not in self.pack:
+                return None
+            blob = self.pack.read_raw(cache_name)
+        try:
+            data = self.encryptor.decrypt_bytes(blob)
+        except ValueError:
+            return None
+        if data[:len(cache_key)] != cache_key:
+            return None
+        try:
+            return marshal.loads(data[len(cache_key):])
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def _write_cache(self, cache_key: bytes, code):
+        """Best-effort write of the encrypted bytecode cache."""
+        cache_path = cache_path_for(self.path)
+        if cache_path is None or sys.dont_write_bytecode:
+            return
+        blob = self.encryptor.encrypt_bytes(cache_key + marshal.dumps(code))
+        try:
+            # parents: a packed tree may have no directory for the module yet
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            # Unique temp name: several workers may warm the cache at once
+            fd, tmp_path = tempfile.mkstemp(dir=cache_path.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(blob)
+                os.replace(tmp_path, cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError:
+            pass  # read-only deployment - run without a cache
+
+
+class EncryptedModuleFinder(importlib.abc.MetaPathFinder):
+    """Resolves module names to .py.enc files under an encrypted/ folder."""
+
+    def __init__(self, encrypted_dir: Union[str, Path], key: bytes,
+                 pack: Optional[PackFile] = None):
+        """
+        Args:
+            encrypted_dir: Root of the encrypted tree
+            key: The repository AES key
+            pack: Packed archive of the tree to read modules from
+        """
+        self.encrypted_dir = Path(encrypted_dir).resolve()
+        self.encryptor = FileEncryptor(key)
+        self.pack = pack
+        # "<module>.py.enc" -> "blobs/..." for deduplicated modules
+        self.blobs = load_blob_map(self.encrypted_dir, pack)
+
+    def find_spec(self, fullname: str, path=None, target=None):
+        parts = fullname.split('.')
+        base = self.encrypted_dir.joinpath(*parts)
+
+        # Package: encrypted/<pkg>/__init__.py.enc
+        package_init = base / f"__init__{ENC_SUFFIX}"
+        if self._exists(package_init):
+            return self._make_spec(fullname, package_init, package_dir=base)
+
+        # Module: encrypted/<pkg>/<name>.py.enc
+        module_file = base.with_name(parts[-1] + ENC_SUFFIX)
+        if self._exists(module_file):
+            return self._make_spec(fullname, module_file)
+
+        return None
+
+    def _pack_name(self, path: Path) -> str:
+        return path.relative_to(self.encrypted_dir).as_posix()
+
+    def _blob_name(self, path: Path) -> Optional[str]:
+        return self.blobs.get(self._pack_name(path)) if self.blobs else None
+
+    def _exists(self, path: Path) -> bool:
+        name = self._blob_name(path) or self._pack_name(path)
+        if self.pack is not None:
+            return name in self.pack
+        return (self.encrypted_dir / name).is_file()
+
+    def get_code(self, fullname: str):
+        """
+        Code object for an encrypted module without importing it.
+
+        Used by the launchers to run web_app.py as __main__ through the
+        bytecode cache.
+        """
+        spec = self.find_spec(fullname)
+        if spec is None:
+            raise ImportError(f"No encrypted module named {fullname!r}", name=fullname)
+        return spec.loader.get_code(fullname)
+
+    def _make_spec(self, fullname: str, enc_path: Path,
+                   package_dir: Optional[Path] = None):
+        pack_name = self._pack_name(enc_path) if self.pack is not None else None
+        blob = self._blob_name(enc_path)
+        if blob is not None and self.pack is None:
+            blob = self.encrypted_dir / blob
+        loader = EncryptedModuleLoader(self.encryptor, enc_path, package_dir is not None,
+                                       self.pack, pack_name, blob)
+        spec = importlib.machinery.ModuleSpec(
+            fullname, loader, origin=str(enc_path),
+            is_package=package_dir is not None
+        )
+        if package_dir is not None:
+            spec.submodule_search_locations = [str(package_dir)]
+        spec.has_location = True  # sets __file__ to the .enc path
+        return spec
+
+
+def install(encrypted_dir: Union[str, Path], key: bytes) -> EncryptedModuleFinder:
+    """
+    Register an EncryptedModuleFinder on sys.meta_path.
+
+    The finder goes in front of the regular path-based finder, so encrypted
+    modules win over plaintext ones on sys.path but built-in and frozen
+    modules are unaffected. An up-to-date encrypted/encrypted.pack is used
+    in place of the loose .enc files.
+
+    Returns:
+        The installed finder (pass it to uninstall() to remove it)
+    """
+    finder = EncryptedModuleFinder(encrypted_dir, key, pack=open_pack(encrypted_dir, key))
+
+    position = len(sys.meta_path)
+    for i, entry in enumerate(sys.meta_path):
+        if entry is importlib.machinery.PathFinder:
+            position = i
+            break
+    sys.meta_path.insert(position, finder)
+    return finder
+
+
+def uninstall(finder: EncryptedModuleFinder):
+    """Remove a finder previously returned by install()."""
+    if finder in sys.meta_path:
+        sys.meta_path.remove(finder)
@@ -0,0 +1,411 @@
+"""
+Fully Homomorphic Encryption engine (TenSEAL / Microsoft SEAL, CKKS).
+
+Values are packed into ciphertext slots: one CKKS ciphertext at polynomial
+degree N holds N/2 values, and every add/multiply acts on all of them at
+once. Inputs longer than the slot count are split across several
+ciphertexts (EncryptedVector), so any length works and the number of
+ciphertext operations grows with len / slots rather than with len.
+
+Reductions (sum, mean, dot) first add whole chunks together slot-wise and
+then fold the remaining ciphertext with log2(slots) rotations, which is why
+the context carries Galois keys.
+
+Building a context with Galois and relinearization keys takes seconds and a
+lot of memory at large degrees, so it happens lazily on the first operation
+that needs it, and - when a cache key is supplied - the serialized context
+(secret key included) is stored encrypted at rest as
+keys/fhe/<param_hash>.ctx.enc and reused by later processes.
+"""
+
+import os
+import hmac
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from mvp17.crypto.file_encryptor import FileEncryptor
+from mvp17.utils import metrics
+
+
+DEFAULT_POLY_MODULUS_DEGREE = 8192
+DEFAULT_COEFF_MOD_BIT_SIZES = (60, 40, 40, 60)
+DEFAULT_GLOBAL_SCALE = 2 ** 40
+DEFAULT_CACHE_DIR = Path("keys") / "fhe"
+CONTEXT_SUFFIX = ".ctx.enc"
+
+ArrayLike = Union[Sequence[float], np.ndarray]
+
+
+def _import_tenseal():
+    """Import TenSEAL on first use so importing this module stays cheap."""
+    try:
+        import tenseal
+    except ImportError as e:
+        raise RuntimeError("TenSEAL is required for FHE operations: pip install tenseal") from e
+    return tenseal
+
+
+class EncryptedVector:
+    """A vector of any length packed into one or more CKKS ciphertexts."""
+
+    def __init__(self, chunks: List[Any], sizes: List[int]):
+        """
+        Args:
+            chunks: TenSEAL CKKSVector per slot-sized chunk
+            sizes: Number of values held by each chunk
+        """
+        self.chunks = chunks
+        self.sizes = sizes
+
+    def __len__(self) -> int:
+        return sum(self.sizes)
+
+    @property
+    def ciphertext_count(self) -> int:
+        return len(self.chunks)
+
+    def serialize(self) -> Dict[str, Any]:
+        """Picklable form (see FHEEngine.deserialize)."""
+        return {'sizes': list(self.sizes),
+                'chunks': [chunk.serialize() for chunk in self.chunks]}
+
+
+class FHEEngine:
+    """Slot-packed CKKS operations on NumPy arrays and Python sequences."""
+
+    def __init__(self, poly_modulus_degree: int = DEFAULT_POLY_MODULUS_DEGREE,
+                 coeff_mod_bit_sizes: Sequence[int] = DEFAULT_COEFF_MOD_BIT_SIZES,
+                 global_scale: float = DEFAULT_GLOBAL_SCALE,
+                 cache_key: Optional[bytes] = None,
+                 cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR):
+        """
+        Args:
+            poly_modulus_degree: CKKS ring degree; slots = degree / 2
+            coeff_mod_bit_sizes: Modulus chain (its length bounds multiplicative depth)
+            global_scale: CKKS encoding scale
+            cache_key: Repository AES key; enables the encrypted context cache
+            cache_dir: Where cached contexts are stored
+        """
+        self.poly_modulus_degree = poly_modulus_degree
+        self.coeff_mod_bit_sizes = list(coeff_mod_bit_sizes)
+        self.global_scale = global_scale
+        self.cache_dir = Path(cache_dir)
+        self._cache_key = cache_key
+        self._cache_encryptor = None
+        if cache_key is not None:
+            self._cache_encryptor = FileEncryptor(
+                hmac.new(cache_key, b"mvp17-fhe-context-cache", hashlib.sha256).digest()
+            )
+        self._context = None
+        self._context_lock = threading.Lock()
+        self._preloaded: Optional[bytes] = None
+
+    @property
+    def slot_count(self) -> int:
+        return self.poly_modulus_degree // 2
+
+    # ------------------------------------------------------------------
+    # Context
+    # ------------------------------------------------------------------
+
+    def params(self) -> Dict[str, Any]:
+        """Constructor arguments that recreate this engine (e.g. in a worker)."""
+        return {
+            'poly_modulus_degree': self.poly_modulus_degree,
+            'coeff_mod_bit_sizes': self.coeff_mod_bit_sizes,
+            'global_scale': self.global_scale,
+            'cache_key': self._cache_key,
+            'cache_dir': self.cache_dir,
+        }
+
+    @property
+    def param_hash(self) -> str:
+        """Short hash identifying the parameter set (names the cache file)."""
+        params = {
+            'scheme': 'CKKS',
+            'poly_modulus_degree': self.poly_modulus_degree,
+            'coeff_mod_bit_sizes': self.coeff_mod_bit_sizes,
+            'global_scale': self.global_scale,
+        }
+        encoded = json.dumps(params, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()[:16]
+
+    @property
+    def cache_path(self) -> Path:
+        return self.cache_dir / f"{self.param_hash}{CONTEXT_SUFFIX}"
+
+    @property
+    def context(self):
+        """The TenSEAL context, loaded from the cache or built on first access."""
+        if self._context is None:
+            with self._context_lock:
+                if self._context is None:
+                    with metrics.span("fhe_context"):
+                        if self._preloaded is not None:
+                            self.load_context(self._preloaded)
+                        else:
+                            self._context = self._load_cached_context() or self.create_context()
+        return self._context
+
+    def preload(self) -> int:
+        """
+        Prepare the context in a pre-fork server's master process.
+
+        Keeps the serialized context (from the cache, or generated once) in
+        memory without building a live one: a TenSEAL context owns a thread
+        pool, which doesn't survive fork(). Forked workers share the bytes
+        copy-on-write and deserialize them on first use instead of each
+        generating keys or reading the cache.
+
+        Returns:
+            Size of the serialized context in bytes
+        """
+        data = None
+        if self._cache_encryptor is not None and self.cache_path.is_file():
+            try:
+                data = self._cache_encryptor.read_file(self.cache_path)
+            except ValueError as e:
+                print(f"⚠️  Ignoring FHE context cache {self.cache_path}: {e}")
+        if data is None:
+            with metrics.span("fhe_context"):
+                _, data = self._generate()
+        self._preloaded = data
+        metrics.FHE_CONTEXT_BYTES.set(len(data))
+        return len(data)
+
+    def serialized_context(self) -> bytes:
+        """
+        The context as bytes (e.g. to hand to worker processes).
+
+        Serializes the live context if there already is one; otherwise
+        preloads - from the cache, or by generating keys once - without
+        building a live context in this process.
+        """
+        if self._context is not None:
+            return self._context.serialize(save_public_key=True, save_secret_key=True,
+                                           save_galois_keys=True, save_relin_keys=True)
+        if self._preloaded is None:
+            self.preload()
+        return self._preloaded
+
+    def create_context(self):
+        """Create the CKKS context with Galois (rotation) and relinearization keys."""
+        self._context, _ = self._generate()
+        return self._context
+
+    def _generate(self):
+        """Generate a context and its keys; returns (context, serialized bytes)."""
+        ts = _import_tenseal()
+        context = ts.context(
+            ts.SCHEME_TYPE.CKKS,
+            poly_modulus_degree=self.poly_modulus_degree,
+            coeff_mod_bit_sizes=self.coeff_mod_bit_sizes
+        )
+        context.global_scale = self.global_scale
+        context.generate_galois_keys()
+        context.generate_relin_keys()
+        data = context.serialize(save_public_key=True, save_secret_key=True,
+                                 save_galois_keys=True, save_relin_keys=True)
+        metrics.FHE_CONTEXT_BYTES.set(len(data))
+        self._save_cached_context(data)
+        return context, data
+
+    def load_context(self, data: bytes):
+        """Use a context serialized by another engine (e.g. the pool's parent)."""
+        ts = _import_tenseal()
+        self._context = ts.context_from(data)
+        metrics.FHE_CONTEXT_BYTES.set(len(data))
+        return self._context
+
+    def _load_cached_context(self):
+        """Load the encrypted cached context, or None if absent or unusable."""
+        if self._cache_encryptor is None or not self.cache_path.is_file():
+            return None
+        ts = _import_tenseal()
+        try:
+            data = self._cache_encryptor.read_file(self.cache_path)
+            context = ts.context_from(data)
+            metrics.FHE_CONTEXT_BYTES.set(len(data))
+            return context
+        except Exception as e:
+            # Wrong key, tampering or a TenSEAL format change: rebuild
+            print(f"⚠️  Ignoring FHE context cache {self.cache_path}: {e}")
+            return None
+
+    def _save_cached_context(self, data: bytes):
+        """Store the serialized context (with secret and evaluation keys) encrypted."""
+        if self._cache_encryptor is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(self.cache_path.name + ".tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(self._cache_encryptor.encrypt_bytes(data))
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️  Could not write FHE context cache: {e}")
+
+    def clear_cache(self):
+        """Drop the in-memory context and its cache file for this parameter set."""
+        self._context = None
+        self._preloaded = None
+        if self.cache_path.exists():
+            self.cache_path.unlink()
+
+    def status(self) -> Dict[str, Any]:
+        """Engine parameters and context state (for /api/status)."""
+        return {
+            'scheme': 'CKKS',
+            'poly_modulus_degree': self.poly_modulus_degree,
+            'coeff_mod_bit_sizes': self.coeff_mod_bit_sizes,
+            'slot_count': self.slot_count,
+            'context_ready': self._context is not None,
+            'context_preloaded': self._preloaded is not None,
+            'context_cached': self._cache_encryptor is not None and self.cache_path.is_file(),
+        }
+
+    # ------------------------------------------------------------------
+    # Packing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _as_array(values: ArrayLike) -> np.ndarray:
+        return np.asarray(values, dtype=np.float64).ravel()
+
+    def _split(self, array: np.ndarray, sizes: Optional[List[int]] = None) -> List[np.ndarray]:
+        """Split into slot-sized chunks (or into the given chunk sizes)."""
+        if sizes is None:
+            sizes = [min(self.slot_count, len(array) - start)
+                     for start in range(0, max(len(array), 1), self.slot_count)]
+        chunks, start = [], 0
+        for size in sizes:
+            chunks.append(array[start:start + size])
+            start += size
+        return chunks
+
+    def encrypt(self, values: ArrayLike) -> EncryptedVector:
+        """Encrypt a 1-D array (any length) into as few ciphertexts as possible."""
+        ts = _import_tenseal()
+        context = self.context
+        array = self._as_array(values)
+        if len(array) == 0:
+            raise ValueError("Cannot encrypt an empty vector")
+        parts = self._split(array)
+        chunks = [ts.ckks_vector(context, part.tolist()) for part in parts]
+        return EncryptedVector(chunks, [len(part) for part in parts])
+
+    def deserialize(self, data: Dict[str, Any]) -> EncryptedVector:
+        """Rebuild an EncryptedVector from EncryptedVector.serialize() output."""
+        ts = _import_tenseal()
+        context = self.context
+        chunks = [ts.ckks_vector_from(context, chunk) for chunk in data['chunks']]
+        return EncryptedVector(chunks, list(data['sizes']))
+
+    def decrypt(self, vector: EncryptedVector) -> np.ndarray:
+        """Decrypt back to a NumPy array of the original length."""
+        parts = [np.asarray(chunk.decrypt(), dtype=np.float64)[:size]
+                 for chunk, size in zip(vector.chunks, vector.sizes)]
+        return np.concatenate(parts)
+
+    # ------------------------------------------------------------------
+    # Elementwise operations (one ciphertext op per chunk)
+    # ------------------------------------------------------------------
+
+    def _elementwise(self, op: str, a: EncryptedVector,
+                     b: Union[EncryptedVector, ArrayLike, float]) -> EncryptedVector:
+        if isinstance(b, EncryptedVector):
+            if b.sizes != a.sizes:
+                raise ValueError(f"Length mismatch: {len(a)} vs {len(b)}")
+            operands = b.chunks
+        elif np.isscalar(b):
+            operands = [float(b)] * len(a.chunks)
+        else:
+            array = self._as_array(b)
+            if len(array) != len(a):
+                raise ValueError(f"Length mismatch: {len(a)} vs {len(array)}")
+            operands = [part.tolist() for part in self._split(array, a.sizes)]
+
+        chunks = [getattr(chunk, op)(operand) for chunk, operand in zip(a.chunks, operands)]
+        return EncryptedVector(chunks, list(a.sizes))
+
+    def add(self, a: EncryptedVector, b) -> EncryptedVector:
+        """a + b elementwise (b: encrypted vector, array or scalar)."""
+        return self._elementwise('add', a, b)
+
+    def subtract(self, a: EncryptedVector, b) -> EncryptedVector:
+        """a - b elementwise (b: encrypted vector, array or scalar)."""
+        return self._elementwise('sub', a, b)
+
+    def multiply(self, a: EncryptedVector, b) -> EncryptedVector:
+        """a * b elementwise (b: encrypted vector, array or scalar)."""
+        return self._elementwise('mul', a, b)
+
+    # ------------------------------------------------------------------
+    # Reductions (rotations)
+    # ------------------------------------------------------------------
+
+    def sum(self, vector: EncryptedVector) -> EncryptedVector:
+        """
+        Encrypted sum of all elements (a length-1 EncryptedVector).
+
+        Full chunks are first added slot-wise, so the rotate-and-add fold
+        runs at most twice (once for the full chunks, once for a shorter
+        final chunk) regardless of the input length.
+        """
+        full = [c for c, size in zip(vector.chunks, vector.sizes) if size == self.slot_count]
+        partial = [c for c, size in zip(vector.chunks, vector.sizes) if size != self.slot_count]
+
+        folded = []
+        if full:
+            accumulator = full[0]
+            for chunk in full[1:]:
+                accumulator = accumulator + chunk
+            folded.append(accumulator.sum())
+        folded.extend(chunk.sum() for chunk in partial)
+
+        total = folded[0]
+        for part in folded[1:]:
+            total = total + part
+        return EncryptedVector([total], [1])
+
+    def mean(self, vector: EncryptedVector) -> EncryptedVector:
+        """Encrypted arithmetic mean (a length-1 EncryptedVector)."""
+        return self.multiply(self.sum(vector), 1.0 / len(vector))
+
+    def dot(self, a: EncryptedVector, b: Union[EncryptedVector, ArrayLike]) -> EncryptedVector:
+        """Encrypted dot product with an encrypted or plaintext vector."""
+        return self.sum(self.multiply(a, b))
+
+    # ------------------------------------------------------------------
+    # Convenience wrappers (plaintext in, plaintext out)
+    # ------------------------------------------------------------------
+
+    def compute(self, operation: str, values: ArrayLike,
+                other: Optional[ArrayLike] = None) -> np.ndarray:
+        """
+        Encrypt, run one operation homomorphically and decrypt the result.
+
+        Args:
+            operation: sum, mean, dot, add, subtract or multiply
+            values: First operand
+            other: Second operand for dot/add/subtract/multiply (kept plaintext)
+        """
+        if operation not in ('sum', 'mean', 'dot', 'add', 'subtract', 'multiply'):
+            raise ValueError(f"Unknown operation: {operation}")
+        if operation not in ('sum', 'mean') and other is None:
+            raise ValueError(f"'{operation}' needs a second operand")
+
+        self.context  # built outside the fhe_compute span
+        with metrics.span("fhe_compute"):
+            encrypted = self.encrypt(values)
+            if operation in ('sum', 'mean'):
+                result = getattr(self, operation)(encrypted)
+            else:
+                result = getattr(self, operation)(encrypted, other)
+            return self.decrypt(result)
@@ -0,0 +1,160 @@
+"""
+Process pool for CPU-heavy FHE work.
+
+TenSEAL operations hold the CPU for the whole computation, so running them
+in request handlers puts every FHE request on one core. FHEPool runs them in
+worker processes instead. Each worker loads the CKKS context once, in its
+initializer - from the encrypted context cache when there is one, otherwise
+from the serialized context the parent prepared - so jobs only carry values
+or serialized ciphertexts.
+
+Workers are started with "forkserver" ("spawn" where that is unavailable),
+never plain fork(): a TenSEAL context owns a thread pool that does not
+survive fork(), and the parent may hold one (e.g. a web app's FHEEngine).
+The parent itself never builds a live context for the pool, only bytes.
+
+Jobs are independent, so multi-vector requests and concurrent users spread
+across all cores:
+
+    with FHEPool(engine) as pool:
+        futures = [pool.submit('mean', column) for column in columns]
+        means = [f.result() for f in futures]
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from mvp17.crypto.fhe_engine import FHEEngine
+
+
+UNARY_OPERATIONS = ('sum', 'mean')
+BINARY_OPERATIONS = ('dot', 'add', 'subtract', 'multiply')
+
+# Set in each worker process by _init_worker()
+_engine: Optional[FHEEngine] = None
+
+
+def _mp_context():
+    """forkserver where the platform has it (Linux, macOS), else spawn (Windows)."""
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def _init_worker(params: Dict[str, Any], context_data: Optional[bytes]):
+    global _engine
+    _engine = FHEEngine(**params)
+    if context_data is not None:
+        _engine.load_context(context_data)
+    else:
+        _engine.context  # load from the encrypted cache now, not on the first job
+
+
+def _apply(operation: str, encrypted, other):
+    if operation in UNARY_OPERATIONS:
+        return getattr(_engine, operation)(encrypted)
+    if operation in BINARY_OPERATIONS:
+        if other is None:
+            raise ValueError(f"'{operation}' needs a second operand")
+        if isinstance(other, dict):
+            other = _engine.deserialize(other)
+        return getattr(_engine, operation)(encrypted, other)
+    raise ValueError(f"Unknown operation: {operation}")
+
+
+def _run(operation: str, values, other) -> np.ndarray:
+    return _engine.decrypt(_apply(operation, _engine.encrypt(values), other))
+
+
+def _encrypt(values) -> Dict[str, Any]:
+    return _engine.encrypt(values).serialize()
+
+
+def _compute(operation: str, data: Dict[str, Any], other) -> Dict[str, Any]:
+    return _apply(operation, _engine.deserialize(data), other).serialize()
+
+
+def _decrypt(data: Dict[str, Any]) -> np.ndarray:
+    return _engine.decrypt(_engine.deserialize(data))
+
+
+class FHEPool:
+    """ProcessPoolExecutor whose workers each hold a ready FHE context."""
+
+    def __init__(self, engine: FHEEngine, workers: Optional[int] = None):
+        """
+        Args:
+            engine: Engine whose parameters, cache and context the workers share
+            workers: Number of worker processes (defaults to the CPU count)
+        """
+        # Generate keys at most once, here, so workers never do; the workers
+        # read the encrypted cache themselves when there is one
+        params = engine.params()
+        if engine.status()['context_cached']:
+            context_data = None
+        else:
+            context_data = engine.serialized_context()
+        self.workers = workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=_mp_context(),
+            initializer=_init_worker,
+            initargs=(params, context_data)
+        )
+
+    # ------------------------------------------------------------------
+    # Jobs
+    # ------------------------------------------------------------------
+
+    def submit(self, operation: str, values, other=None) -> Future:
+        """
+        Encrypt, compute and decrypt in one worker (nothing crosses processes
+        but the plaintext in and the result out).
+
+        Returns:
+            Future resolving to a NumPy array
+        """
+        return self._executor.submit(_run, operation, values, other)
+
+    def map(self, jobs: Iterable[Tuple]) -> List[np.ndarray]:
+        """Run (operation, values[, other]) jobs in parallel, results in order."""
+        futures = [self.submit(*job) for job in jobs]
+        return [future.result() for future in futures]
+
+    def encrypt(self, values) -> Future:
+        """Future resolving to a serialized EncryptedVector."""
+        return self._executor.submit(_encrypt, values)
+
+    def compute(self, operation: str, data: Dict[str, Any], other=None) -> Future:
+        """
+        Apply an operation to a serialized ciphertext.
+
+        Args:
+            operation: sum, mean, dot, add, subtract or multiply
+            data: Serialized EncryptedVector
+            other: Plain array/scalar or another serialized EncryptedVector
+
+        Returns:
+            Future resolving to the serialized result
+        """
+        return self._executor.submit(_compute, operation, data, other)
+
+    def decrypt(self, data: Dict[str, Any]) -> Future:
+        """Future resolving to the decrypted NumPy array."""
+        return self._executor.submit(_decrypt, data)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_futures)
+
+    def __enter__(self) -> "FHEPool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
@@ -0,0 +1,847 @@
+"""
+AES-256-GCM (or ChaCha20-Poly1305) file encryption for the encrypted/ tree.
+
+Two on-disk layouts are understood:
+
+v1 (legacy, read-only):
+    [nonce (16)][tag (16)][ciphertext]
+    A single GCM message over the whole file.
+
+v2 (segmented, written by default):
+    [header][segment 0][segment 1]...[segment N-1]
+
+    header  = MAGIC (8) | version (1) | flags (1) | segment_size (4, BE) | nonce_prefix (7)
+    segment = ciphertext (segment_size bytes, the last one may be shorter) | tag (16)
+
+    Segment i is sealed with nonce = nonce_prefix | i (4, BE) | last (1) and
+    the header as associated data. Reordered, dropped or truncated segments,
+    and segments spliced in from another file, therefore fail authentication.
+    Only one segment is held in memory at a time.
+
+    The low nibble of flags is the compression codec (0 none, 3 zlib,
+    4 lzma). Each segment_size slice of plaintext is compressed on its own
+    and then sealed, and a compressed segment is stored with its length in
+    front, since it no longer has a fixed size:
+
+    segment = stored length (4, BE) | ciphertext | tag
+
+    Plaintext offsets therefore still map to segment indexes, and random
+    access only has to walk the 4-byte length prefixes to find a segment,
+    not decrypt the ones before it. Codecs 1 (zlib) and 2 (lzma) compressed
+    the whole plaintext as one stream; such files are still read, but no
+    longer written. With compression="auto" the codec is picked per file
+    from a quick zlib sample: none for data that doesn't shrink (images,
+    archives), lzma for large files, zlib otherwise. Being part of the
+    header, the codec is authenticated like everything else. Compressed
+    sizes do reveal how compressible a file (and each segment) is.
+
+    The high nibble of flags is the AEAD cipher: 0 AES-256-GCM (every file
+    written before the field existed), 1 ChaCha20-Poly1305 under a key
+    derived from the AES key, for hosts without AES-NI. Segment nonces are
+    12 bytes for both.
+
+The AEAD implementation is pluggable: "cryptography" (OpenSSL, AES-NI and
+PCLMUL) or "pycryptodome". Both produce identical bytes; by default the
+faster one on this host is picked by a one-off micro-benchmark
+(fastest_backend()), or forced with MVP17_AEAD_BACKEND=<name>.
+"""
+
+import io
+import os
+import hmac
+import lzma
+import mmap
+import time
+import zlib
+import struct
+import hashlib
+import functools
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional, Tuple, Union
+
+
+MAGIC = b"MVP17ENC"
+FORMAT_V1 = 1
+FORMAT_V2 = 2
+
+KEY_SIZE = 32
+TAG_SIZE = 16
+V1_NONCE_SIZE = 16
+NONCE_PREFIX_SIZE = 7
+DEFAULT_SEGMENT_SIZE = 64 * 1024
+
+_HEADER = struct.Struct(">8sBBI7s")
+HEADER_SIZE = _HEADER.size
+
+CODEC_NONE = 0
+CODEC_ZLIB = 1                     # whole-stream codecs, read-only
+CODEC_LZMA = 2
+CODEC_ZLIB_SEGMENTS = 3            # per-segment codecs, written by default
+CODEC_LZMA_SEGMENTS = 4
+CODECS = {"none": CODEC_NONE, "zlib": CODEC_ZLIB_SEGMENTS, "lzma": CODEC_LZMA_SEGMENTS}
+STREAM_CODECS = (CODEC_ZLIB, CODEC_LZMA)
+SEGMENT_CODECS = (CODEC_ZLIB_SEGMENTS, CODEC_LZMA_SEGMENTS)
+READABLE_CODECS = (CODEC_NONE,) + STREAM_CODECS + SEGMENT_CODECS
+CODEC_MASK = 0x0F
+
+_SEGMENT_LENGTH = struct.Struct(">I")
+
+CIPHER_AES_GCM = 0
+CIPHER_CHACHA20_POLY1305 = 1
+CIPHERS = {"aes-256-gcm": CIPHER_AES_GCM, "chacha20-poly1305": CIPHER_CHACHA20_POLY1305}
+CIPHER_SHIFT = 4
+
+BACKEND_ENV = "MVP17_AEAD_BACKEND"
+BENCHMARK_SIZE = 128 * 1024        # bytes sealed per backend by fastest_backend()
+CHACHA_MIN_SPEEDUP = 1.5           # cipher="auto" only leaves AES for a clear win
+
+SAMPLE_SIZE = 16 * 1024            # bytes test-compressed to pick a codec
+MIN_COMPRESS_SIZE = 128            # smaller files aren't worth a codec
+MAX_COMPRESSED_RATIO = 0.9         # sample must shrink at least this much
+LZMA_MIN_SIZE = 1024 * 1024        # lzma's better ratio pays off from here
+ZLIB_LEVEL = 6
+LZMA_PRESET = 6
+
+PathLike = Union[str, Path]
+
+
+class _CryptographyAead:
+    """AEAD from the cryptography package (OpenSSL)."""
+
+    name = "cryptography"
+
+    def __init__(self, cipher: int, key: bytes):
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+        self._key = key
+        self._aead = (AESGCM if cipher == CIPHER_AES_GCM else ChaCha20Poly1305)(key)
+
+    def seal(self, nonce: bytes, aad: bytes, plaintext: bytes) -> bytes:
+        return self._aead.encrypt(nonce, plaintext, aad)
+
+    def open(self, nonce: bytes, aad: bytes, data: bytes) -> bytes:
+        from cryptography.exceptions import InvalidTag
+
+        try:
+            return self._aead.decrypt(nonce, data, aad)
+        except InvalidTag:
+            raise ValueError("MAC check failed") from None
+
+    def v1_decryptor(self, nonce: bytes, tag: bytes):
+        from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+
+        return _CryptographyV1Decryptor(
+            Cipher(algorithms.AES(self._key), modes.GCM(nonce, tag)).decryptor())
+
+
+class _CryptographyV1Decryptor:
+    def __init__(self, decryptor):
+        self._decryptor = decryptor
+
+    def update(self, chunk: bytes) -> bytes:
+        return self._decryptor.update(chunk)
+
+    def verify(self):
+        from cryptography.exceptions import InvalidTag
+
+        try:
+            self._decryptor.finalize()
+        except InvalidTag:
+            raise ValueError("MAC check failed") from None
+
+
+class _PycryptodomeAead:
+    """AEAD from pycryptodome."""
+
+    name = "pycryptodome"
+
+    def __init__(self, cipher: int, key: bytes):
+        from Crypto.Cipher import AES, ChaCha20_Poly1305
+
+        self._key = key
+        if cipher == CIPHER_AES_GCM:
+            self._new = lambda nonce: AES.new(key, AES.MODE_GCM, nonce=nonce)
+        else:
+            self._new = lambda nonce: ChaCha20_Poly1305.new(key=key, nonce=nonce)
+
+    def seal(self, nonce: bytes, aad: bytes, plaintext: bytes) -> bytes:
+        cipher = self._new(nonce)
+        cipher.update(aad)
+        ciphertext, tag = cipher.encrypt_and_digest(plaintext)
+        return ciphertext + tag
+
+    def open(self, nonce: bytes, aad: bytes, data: bytes) -> bytes:
+        cipher = self._new(nonce)
+        cipher.update(aad)
+        return cipher.decrypt_and_verify(data[:-TAG_SIZE], data[-TAG_SIZE:])
+
+    def v1_decryptor(self, nonce: bytes, tag: bytes):
+        return _PycryptodomeV1Decryptor(self._new(nonce), tag)
+
+
+class _PycryptodomeV1Decryptor:
+    def __init__(self, cipher, tag: bytes):
+        self._cipher = cipher
+        self._tag = tag
+
+    def update(self, chunk: bytes) -> bytes:
+        return self._cipher.decrypt(chunk)
+
+    def verify(self):
+        self._cipher.verify(self._tag)
+
+
+BACKENDS = {backend.name: backend for backend in (_CryptographyAead, _PycryptodomeAead)}
+
+
+@functools.lru_cache(maxsize=None)
+def available_backends() -> Tuple[str, ...]:
+    """Names of the AEAD backends whose library is installed."""
+    names = []
+    for name, backend in BACKENDS.items():
+        try:
+            backend(CIPHER_AES_GCM, bytes(KEY_SIZE))
+        except ImportError:
+            continue
+        names.append(name)
+    return tuple(names)
+
+
+def benchmark_backends(cipher: int = CIPHER_AES_GCM,
+                       size: int = BENCHMARK_SIZE) -> Dict[str, float]:
+    """
+    Seconds each available backend takes to seal size bytes in 64 KB and
+    1 KB messages (bulk files and small modules), best of three.
+    """
+    key = os.urandom(KEY_SIZE)
+    nonce = bytes(12)
+    messages = [bytes(DEFAULT_SEGMENT_SIZE)] * max(1, size // 2 // DEFAULT_SEGMENT_SIZE)
+    messages += [bytes(1024)] * max(1, size // 2 // 1024)
+    timings = {}
+    for name in available_backends():
+        aead = BACKENDS[name](cipher, key)
+        best = None
+        for _ in range(3):
+            start = time.perf_counter()
+            for message in messages:
+                aead.seal(nonce, b"", message)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+    return timings
+
+
+@functools.lru_cache(maxsize=None)
+def fastest_backend(cipher: int = CIPHER_AES_GCM) -> str:
+    """
+    The AEAD backend to use for cipher on this host.
+
+    MVP17_AEAD_BACKEND wins if set; otherwise the backends are benchmarked
+    once per process (a few milliseconds).
+
+    Raises:
+        ImportError: If neither cryptography nor pycryptodome is installed
+    """
+    forced = os.environ.get(BACKEND_ENV)
+    if forced:
+        if forced not in available_backends():
+            raise ImportError(f"{BACKEND_ENV}={forced} is not available "
+                              f"(installed: {', '.join(available_backends()) or 'none'})")
+        return forced
+    available = available_backends()
+    if not available:
+        raise ImportError("No AEAD backend - pip install cryptography (or pycryptodome)")
+    if len(available) == 1:
+        return available[0]
+    timings = benchmark_backends(cipher)
+    return min(timings, key=timings.get)
+
+
+@functools.lru_cache(maxsize=None)
+def preferred_cipher() -> int:
+    """AES-256-GCM unless ChaCha20-Poly1305 is clearly faster (no AES-NI)."""
+    aes = benchmark_backends(CIPHER_AES_GCM)
+    chacha = benchmark_backends(CIPHER_CHACHA20_POLY1305)
+    if min(chacha.values()) * CHACHA_MIN_SPEEDUP < min(aes.values()):
+        return CIPHER_CHACHA20_POLY1305
+    return CIPHER_AES_GCM
+
+
+class FileEncryptor:
+    """Encrypt and decrypt files with AES-256-GCM (or ChaCha20) in bounded memory."""
+
+    def __init__(self, key: Optional[bytes] = None,
+                 segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 compression: str = "auto", cipher: str = "aes-256-gcm",
+                 backend: str = "auto"):
+        """
+        Args:
+            key: 32-byte AES key (can also be set later via generate_key())
+            segment_size: Plaintext bytes per authenticated v2 segment
+            compression: "auto" (per-file choice), "zlib", "lzma" or "none"
+            cipher: AEAD for files written: "aes-256-gcm", "chacha20-poly1305"
+                    or "auto" (ChaCha20 only where AES is slow); reading
+                    follows each file's header
+            backend: "auto" (fastest installed), "cryptography" or "pycryptodome"
+        """
+        if segment_size <= 0:
+            raise ValueError("segment_size must be positive")
+        if compression != "auto" and compression not in CODECS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if cipher != "auto" and cipher not in CIPHERS:
+            raise ValueError(f"Unknown cipher: {cipher}")
+        if backend != "auto" and backend not in BACKENDS:
+            raise ValueError(f"Unknown backend: {backend}")
+        self.key = key
+        self.segment_size = segment_size
+        self.compression = compression
+        self.cipher = cipher
+        self.backend = backend
+        self._aeads = {}
+
+    def generate_key(self) -> Tuple[bytes, str]:
+        """
+        Generate a new random AES-256 key and use it for this encryptor.
+
+        Returns:
+            (key, key_hex)
+        """
+        self.key = os.urandom(KEY_SIZE)
+        self._aeads = {}
+        return self.key, self.key.hex()
+
+    def _require_key(self) -> bytes:
+        if self.key is None:
+            raise ValueError("No AES key set - call generate_key() or pass key=")
+        return self.key
+
+    # ------------------------------------------------------------------
+    # v2 segment primitives
+    # ------------------------------------------------------------------
+
+    def _aead(self, cipher: int):
+        """Keyed AEAD object for cipher, created once per encryptor."""
+        aead = self._aeads.get(cipher)
+        if aead is None:
+            key = self._require_key()
+            if cipher == CIPHER_CHACHA20_POLY1305:
+                # Never use one key with two different ciphers
+                key = hmac.new(key, b"mvp17-chacha20-poly1305", hashlib.sha256).digest()
+            backend = fastest_backend(cipher) if self.backend == "auto" else self.backend
+            aead = self._aeads[cipher] = BACKENDS[backend](cipher, key)
+        return aead
+
+    def _write_cipher(self) -> int:
+        if self.cipher == "auto":
+            return preferred_cipher()
+        return CIPHERS[self.cipher]
+
+    @staticmethod
+    def _segment_nonce(prefix: bytes, index: int, last: bool) -> bytes:
+        return prefix + struct.pack(">IB", index, 1 if last else 0)
+
+    def _seal_segment(self, header: bytes, prefix: bytes, index: int,
+                      last: bool, plaintext: bytes, cipher: int = CIPHER_AES_GCM) -> bytes:
+        return self._aead(cipher).seal(self._segment_nonce(prefix, index, last),
+                                       header, plaintext)
+
+    def _open_segment(self, header: bytes, prefix: bytes, index: int,
+                      last: bool, segment: bytes, cipher: int = CIPHER_AES_GCM) -> bytes:
+        if len(segment) < TAG_SIZE:
+            raise ValueError("Encrypted file is truncated")
+        return self._aead(cipher).open(self._segment_nonce(prefix, index, last),
+                                       header, segment)
+
+    @staticmethod
+    def _parse_header(header: bytes) -> Tuple[int, bytes, int, int]:
+        """Validate a v2 header and return (segment_size, nonce_prefix, codec, cipher)."""
+        magic, version, flags, segment_size, prefix = _HEADER.unpack(header)
+        if magic != MAGIC or version != FORMAT_V2:
+            raise ValueError("Not a v2 encrypted file")
+        codec = flags & CODEC_MASK
+        cipher = flags >> CIPHER_SHIFT
+        if codec not in READABLE_CODECS or cipher not in CIPHERS.values():
+            raise ValueError(f"Unsupported v2 flags: {flags:#04x}")
+        if segment_size <= 0:
+            raise ValueError("Invalid segment size in header")
+        return segment_size, prefix, codec, cipher
+
+    @staticmethod
+    def detect_format(head: bytes) -> int:
+        """Return FORMAT_V2 or FORMAT_V1 for the first bytes of a .enc file."""
+        if len(head) >= HEADER_SIZE and head[:len(MAGIC)] == MAGIC \
+                and head[len(MAGIC)] == FORMAT_V2:
+            return FORMAT_V2
+        return FORMAT_V1
+
+    # ------------------------------------------------------------------
+    # Compression
+    # ------------------------------------------------------------------
+
+    def choose_codec(self, sample: bytes, size_hint: Optional[int] = None) -> int:
+        """
+        Codec for a file, judged from its first bytes.
+
+        Args:
+            sample: The start of the plaintext
+            size_hint: Total plaintext size, if known
+        """
+        if self.compression != "auto":
+            return CODECS[self.compression]
+        sample = sample[:SAMPLE_SIZE]
+        if len(sample) < MIN_COMPRESS_SIZE:
+            return CODEC_NONE
+        if len(zlib.compress(sample, 1)) > len(sample) * MAX_COMPRESSED_RATIO:
+            return CODEC_NONE
+        if size_hint is not None and size_hint >= LZMA_MIN_SIZE:
+            return CODEC_LZMA_SEGMENTS
+        return CODEC_ZLIB_SEGMENTS
+
+    @staticmethod
+    def _decompressor(codec: int):
+        """Decompressor for the whole-stream codecs of older files."""
+        if codec == CODEC_ZLIB:
+            return zlib.decompressobj()
+        if codec == CODEC_LZMA:
+            return lzma.LZMADecompressor()
+        return None
+
+    def _compressed_segment(self, header: bytes, prefix: bytes, index: int,
+                            last: bool, plaintext: bytes, codec: int, cipher: int) -> bytes:
+        """Compress, seal and length-prefix one segment of a per-segment codec file."""
+        sealed = self._seal_segment(header, prefix, index, last,
+                                    _compress_segment(codec, plaintext, self.segment_size),
+                                    cipher)
+        return _SEGMENT_LENGTH.pack(len(sealed)) + sealed
+
+    def _open_compressed_segment(self, header: bytes, prefix: bytes, index: int,
+                                 last: bool, segment: bytes, codec: int, cipher: int,
+                                 segment_size: int) -> bytes:
+        """Authenticate and decompress one segment of a per-segment codec file."""
+        plaintext = _decompress_segment(
+            codec, self._open_segment(header, prefix, index, last, segment, cipher),
+            segment_size)
+        if len(plaintext) > segment_size or (not last and len(plaintext) != segment_size):
+            raise ValueError("Corrupt compressed segment")
+        return plaintext
+
+    @staticmethod
+    def _stored_length(raw: bytes, segment_size: int) -> int:
+        """Parse and sanity-check a compressed segment's length prefix."""
+        if len(raw) < _SEGMENT_LENGTH.size:
+            raise ValueError("Encrypted file is truncated")
+        length = _SEGMENT_LENGTH.unpack(raw)[0]
+        if not TAG_SIZE <= length <= _max_stored_length(segment_size):
+            raise ValueError("Corrupt segment length")
+        return length
+
+    def _segment_spans(self, mm, segment_size: int, stop: Optional[int] = None):
+        """
+        Yield (index, start, end, last) for the stored segments of a
+        per-segment codec file, from its length prefixes alone.
+
+        Args:
+            mm: The whole file (mmap or bytes)
+            stop: Stop after this segment index
+        """
+        size = len(mm)
+        position = HEADER_SIZE
+        index = 0
+        while True:
+            length = self._stored_length(mm[position:position + _SEGMENT_LENGTH.size],
+                                         segment_size)
+            start = position + _SEGMENT_LENGTH.size
+            position = start + length
+            if position > size:
+                raise ValueError("Encrypted file is truncated")
+            last = position == size
+            yield index, start, position, last
+            if last or (stop is not None and index >= stop):
+                return
+            index += 1
+
+    # ------------------------------------------------------------------
+    # Streams
+    # ------------------------------------------------------------------
+
+    def encrypt_stream(self, src: BinaryIO, dst: BinaryIO,
+                       size_hint: Optional[int] = None, hasher=None) -> int:
+        """
+        Encrypt everything readable from src into dst using the v2 layout.
+
+        Args:
+            size_hint: Plaintext size if known (helps pick the codec)
+            hasher: Optional hashlib/hmac object fed with the plaintext
+
+        Returns:
+            Number of plaintext bytes encrypted
+        """
+        if hasher is not None:
+            src = _HashingReader(src, hasher)
+        sample = _read_exact(src, SAMPLE_SIZE)
+        codec = self.choose_codec(sample, size_hint)
+        reader = _PrefixedReader(sample, src)
+
+        cipher = self._write_cipher()
+        prefix = os.urandom(NONCE_PREFIX_SIZE)
+        header = _HEADER.pack(MAGIC, FORMAT_V2, cipher << CIPHER_SHIFT | codec,
+                              self.segment_size, prefix)
+        dst.write(header)
+
+        index = 0
+        chunk = _read_exact(reader, self.segment_size)
+        while True:
+            # Read one segment ahead so we know which segment is the last
+            following = _read_exact(reader, self.segment_size) if len(chunk) == self.segment_size else b""
+            last = not following
+            if codec == CODEC_NONE:
+                dst.write(self._seal_segment(header, prefix, index, last, chunk, cipher))
+            else:
+                dst.write(self._compressed_segment(header, prefix, index, last,
+                                                   chunk, codec, cipher))
+            if last:
+                return reader.consumed
+            chunk = following
+            index += 1
+
+    def decrypt_stream(self, src: BinaryIO, dst: BinaryIO) -> int:
+        """
+        Decrypt a v1 or v2 stream from src into dst.
+
+        v2 output is only written after each segment verifies. v1 files are a
+        single GCM message, so their plaintext is written incrementally and the
+        tag is checked at the end - callers writing to disk should discard dst
+        if this raises (decrypt_file() does).
+
+        Returns:
+            Number of plaintext bytes written
+        """
+        head = _read_exact(src, HEADER_SIZE)
+        if self.detect_format(head) == FORMAT_V1:
+            return self._decrypt_v1_stream(head, src, dst)
+
+        segment_size, prefix, codec, cipher = self._parse_header(head)
+        if codec in SEGMENT_CODECS:
+            return self._decrypt_segmented_stream(head, src, dst, segment_size,
+                                                  prefix, codec, cipher)
+        segment_len = segment_size + TAG_SIZE
+        decompressor = self._decompressor(codec)
+
+        total = 0
+        index = 0
+        segment = _read_exact(src, segment_len)
+        while True:
+            following = _read_exact(src, segment_len) if len(segment) == segment_len else b""
+            last = not following
+            plaintext = self._open_segment(head, prefix, index, last, segment, cipher)
+            if decompressor is not None:
+                try:
+                    plaintext = decompressor.decompress(plaintext)
+                except (zlib.error, lzma.LZMAError) as e:
+                    raise ValueError(f"Corrupt compressed stream: {e}") from e
+            dst.write(plaintext)
+            total += len(plaintext)
+            if last:
+                if decompressor is not None and not decompressor.eof:
+                    raise ValueError("Compressed stream is truncated")
+                return total
+            segment = following
+            index += 1
+
+    def _decrypt_segmented_stream(self, head: bytes, src: BinaryIO, dst: BinaryIO,
+                                  segment_size: int, prefix: bytes, codec: int,
+                                  cipher: int) -> int:
+        total = 0
+        index = 0
+        raw = _read_exact(src, _SEGMENT_LENGTH.size)
+        while True:
+            length = self._stored_length(raw, segment_size)
+            segment = _read_exact(src, length)
+            if len(segment) < length:
+                raise ValueError("Encrypted file is truncated")
+            # An empty read after a segment marks the last one
+            raw = _read_exact(src, _SEGMENT_LENGTH.size)
+            last = not raw
+            plaintext = self._open_compressed_segment(head, prefix, index, last, segment,
+                                                      codec, cipher, segment_size)
+            dst.write(plaintext)
+            total += len(plaintext)
+            if last:
+                return total
+            index += 1
+
+    def _decrypt_v1_stream(self, head: bytes, src: BinaryIO, dst: BinaryIO) -> int:
+        prefix = head + _read_exact(src, V1_NONCE_SIZE + TAG_SIZE - len(head))
+        if len(prefix) < V1_NONCE_SIZE + TAG_SIZE:
+            raise ValueError("Encrypted file is truncated")
+        nonce = prefix[:V1_NONCE_SIZE]
+        tag = prefix[V1_NONCE_SIZE:V1_NONCE_SIZE + TAG_SIZE]
+
+        decryptor = self._aead(CIPHER_AES_GCM).v1_decryptor(nonce, tag)
+        total = 0
+        while True:
+            chunk = src.read(self.segment_size)
+            if not chunk:
+                break
+            dst.write(decryptor.update(chunk))
+            total += len(chunk)
+        decryptor.verify()
+        return total
+
+    # ------------------------------------------------------------------
+    # Files and bytes
+    # ------------------------------------------------------------------
+
+    def encrypt_file(self, input_path: PathLike, output_path: PathLike,
+                     hasher=None) -> int:
+        """
+        Encrypt input_path to output_path (v2), replacing it atomically.
+
+        Args:
+            hasher: Optional hashlib/hmac object fed with the plaintext as it
+                    is read, so callers can hash a file without a second pass
+
+        Returns:
+            Number of plaintext bytes encrypted
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(input_path, 'rb') as src:
+            size = os.fstat(src.fileno()).st_size
+            return _write_atomic(output_path,
+                                 lambda dst: self.encrypt_stream(src, dst, size, hasher))
+
+    def decrypt_file(self, input_path: PathLike, output_path: PathLike) -> int:
+        """
+        Decrypt input_path (v1 or v2) to output_path.
+
+        The output only appears once the whole file has been authenticated.
+
+        Returns:
+            Number of plaintext bytes written
+        """
+        output_path = Path(output_path)
+        output_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(input_path, 'rb') as src:
+            return _write_atomic(output_path, lambda dst: self.decrypt_stream(src, dst))
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        """Encrypt an in-memory buffer into a v2 blob."""
+        dst = io.BytesIO()
+        self.encrypt_stream(io.BytesIO(data), dst, size_hint=len(data))
+        return dst.getvalue()
+
+    def decrypt_bytes(self, blob: bytes) -> bytes:
+        """Decrypt an in-memory v1 or v2 blob."""
+        dst = io.BytesIO()
+        self.decrypt_stream(io.BytesIO(blob), dst)
+        return dst.getvalue()
+
+    def read_file(self, path: PathLike) -> bytes:
+        """Decrypt a .enc file straight into memory (for code that is exec'd)."""
+        dst = io.BytesIO()
+        with open(path, 'rb') as src:
+            self.decrypt_stream(src, dst)
+        return dst.getvalue()
+
+    # ------------------------------------------------------------------
+    # Random access
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _v2_layout(size: int, segment_size: int) -> Tuple[int, int]:
+        """Return (segment_count, plaintext_size) for a v2 file of the given size."""
+        body = size - HEADER_SIZE
+        segment_len = segment_size + TAG_SIZE
+        count = (body + segment_len - 1) // segment_len
+        last_len = body - (count - 1) * segment_len
+        if count < 1 or last_len < TAG_SIZE:
+            raise ValueError("Encrypted file is truncated")
+        return count, (count - 1) * segment_size + last_len - TAG_SIZE
+
+    def plaintext_size(self, path: PathLike) -> int:
+        """
+        Plaintext length of a .enc file.
+
+        Read from the header and file size alone. Per-segment compressed
+        files also need their length prefixes walked and the last segment
+        decrypted; only files using an old whole-stream codec have to be
+        decrypted in full.
+        """
+        with open(path, 'rb') as f:
+            head = _read_exact(f, HEADER_SIZE)
+            size = os.fstat(f.fileno()).st_size
+            if self.detect_format(head) == FORMAT_V1:
+                return max(0, size - V1_NONCE_SIZE - TAG_SIZE)
+            segment_size, prefix, codec, cipher = self._parse_header(head)
+            if codec in STREAM_CODECS:
+                return len(self.read_file(path))
+            if codec == CODEC_NONE:
+                return self._v2_layout(size, segment_size)[1]
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                *_, (index, start, end, _) = self._segment_spans(mm, segment_size)
+                tail = self._open_compressed_segment(head, prefix, index, True, mm[start:end],
+                                                     codec, cipher, segment_size)
+        return index * segment_size + len(tail)
+
+    def read_range(self, path: PathLike, offset: int, length: int) -> bytes:
+        """
+        Decrypt plaintext bytes [offset, offset + length) of a .enc file.
+
+        The file is memory-mapped and only the v2 segments overlapping the
+        range are touched and authenticated, so e.g. a 4 KB preview of a
+        large file costs one segment. For per-segment compressed files the
+        length prefixes of the segments before the range are read as well.
+        Reads past the end are clipped. v1 files (a single GCM message) and
+        files using an old whole-stream codec are decrypted whole.
+
+        Args:
+            path: Path to the .enc file
+            offset: Plaintext byte offset to start at
+            length: Maximum number of bytes to return
+        """
+        if offset < 0 or length < 0:
+            raise ValueError("offset and length must be non-negative")
+
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < HEADER_SIZE:
+                return self.decrypt_bytes(f.read())[offset:offset + length]
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                head = mm[:HEADER_SIZE]
+                if self.detect_format(head) == FORMAT_V1:
+                    return self.decrypt_bytes(mm[:])[offset:offset + length]
+
+                segment_size, prefix, codec, cipher = self._parse_header(head)
+                if codec in STREAM_CODECS:
+                    return self.decrypt_bytes(mm[:])[offset:offset + length]
+                if codec in SEGMENT_CODECS:
+                    return self._read_compressed_range(mm, head, segment_size, prefix,
+                                                       codec, cipher, offset, length)
+                count, total = self._v2_layout(size, segment_size)
+                end = min(offset + length, total)
+                if offset >= end:
+                    return b""
+
+                segment_len = segment_size + TAG_SIZE
+                first = offset // segment_size
+                last = (end - 1) // segment_size
+                parts = []
+                for index in range(first, last + 1):
+                    start = HEADER_SIZE + index * segment_len
+                    segment = mm[start:start + segment_len]
+                    parts.append(self._open_segment(head, prefix, index,
+                                                    index == count - 1, segment, cipher))
+
+        skip = offset - first * segment_size
+        return b"".join(parts)[skip:skip + end - offset]
+
+    def _read_compressed_range(self, mm, head: bytes, segment_size: int, prefix: bytes,
+                               codec: int, cipher: int, offset: int, length: int) -> bytes:
+        if length == 0:
+            return b""
+        first = offset // segment_size
+        parts = []
+        for index, start, end, last in self._segment_spans(
+                mm, segment_size, stop=(offset + length - 1) // segment_size):
+            if index >= first:
+                parts.append(self._open_compressed_segment(head, prefix, index, last,
+                                                           mm[start:end], codec, cipher,
+                                                           segment_size))
+        skip = offset - first * segment_size
+        return b"".join(parts)[skip:skip + length]
+
+
+class _PrefixedReader:
+    """read() over already-read bytes followed by the rest of src; counts bytes."""
+
+    def __init__(self, head: bytes, src: BinaryIO):
+        self._head = head
+        self._src = src
+        self.consumed = 0
+
+    def read(self, size: int = -1) -> bytes:
+        if self._head:
+            data, self._head = self._head[:size], self._head[size:]
+        else:
+            data = self._src.read(size)
+        self.consumed += len(data)
+        return data
+
+
+def _lzma_filters(segment_size: int):
+    # Raw LZMA2 (no per-segment container header); the dictionary never needs
+    # to be larger than one segment
+    return [{"id": lzma.FILTER_LZMA2, "preset": LZMA_PRESET,
+             "dict_size": min(max(segment_size, 4096), 64 * 1024 * 1024)}]
+
+
+def _max_stored_length(segment_size: int) -> int:
+    """Upper bound of a sealed compressed segment (incompressible data grows a little)."""
+    return segment_size + segment_size // 16 + 1024 + TAG_SIZE
+
+
+def _compress_segment(codec: int, data: bytes, segment_size: int) -> bytes:
+    if codec == CODEC_ZLIB_SEGMENTS:
+        compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    return lzma.compress(data, format=lzma.FORMAT_RAW, filters=_lzma_filters(segment_size))
+
+
+def _decompress_segment(codec: int, data: bytes, segment_size: int) -> bytes:
+    """Decompress one segment, never producing more than segment_size + 1 bytes."""
+    if codec == CODEC_ZLIB_SEGMENTS:
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+    else:
+        decompressor = lzma.LZMADecompressor(lzma.FORMAT_RAW, filters=_lzma_filters(segment_size))
+    try:
+        plaintext = decompressor.decompress(data, segment_size + 1)
+    except (zlib.error, lzma.LZMAError) as e:
+        raise ValueError(f"Corrupt compressed segment: {e}") from e
+    if not decompressor.eof:
+        raise ValueError("Corrupt compressed segment")
+    return plaintext
+
+
+class _HashingReader:
+    """Minimal read() wrapper that feeds every chunk through a hasher."""
+
+    def __init__(self, src: BinaryIO, hasher):
+        self._src = src
+        self._hasher = hasher
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._src.read(size)
+        self._hasher.update(data)
+        return data
+
+
+def _read_exact(src: BinaryIO, size: int) -> bytes:
+    """Read up to size bytes, looping over short reads (pipes, sockets)."""
+    buf = src.read(size)
+    if not buf or len(buf) == size:
+        return buf
+    parts = [buf]
+    remaining = size - len(buf)
+    while remaining:
+        more = src.read(remaining)
+        if not more:
+            break
+        parts.append(more)
+        remaining -= len(more)
+    return b"".join(parts)
+
+
+def _write_atomic(output_path: Path, write):
+    """Run write(dst) against a temp file and move it over output_path on success."""
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as dst:
+            result = write(dst)
+        os.replace(tmp_path, output_path)
+        return result
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
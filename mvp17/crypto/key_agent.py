@@ -0,0 +1,179 @@
+"""
+Local key agent that caches unwrapped AES data keys (ssh-agent style).
+
+Unwrapping encrypted/aes_key.bin is an RSA-4096 private-key operation and
+dominates the latency of small edits and scripted runs. The agent loads the
+private key once, unwraps each wrapped data key on first request and serves
+it to local clients over a Unix socket until its lifetime (TTL) runs out.
+
+Protocol: one JSON object per line in each direction.
+    {"op": "ping"}                    -> {"ok": true, "expires_in": ..., "keys": n}
+    {"op": "unwrap", "wrapped": b64}  -> {"ok": true, "key": b64}
+    {"op": "stop"}                    -> {"ok": true}
+
+Only the owning user can connect: the socket is created mode 0600 and, where
+the platform supports it, the peer's uid is checked on every connection.
+"""
+
+import os
+import json
+import time
+import base64
+import socket
+import struct
+import hashlib
+import threading
+import socketserver
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+
+SOCKET_ENV = "MVP17_KEY_AGENT_SOCK"
+DEFAULT_SOCKET = Path("keys") / "agent.sock"
+DEFAULT_TTL = 60 * 60
+CLIENT_TIMEOUT = 2.0
+
+
+def socket_path() -> Path:
+    """Agent socket location ($MVP17_KEY_AGENT_SOCK or keys/agent.sock)."""
+    return Path(os.environ.get(SOCKET_ENV, DEFAULT_SOCKET))
+
+
+def agent_supported() -> bool:
+    return hasattr(socket, "AF_UNIX")
+
+
+class _AgentHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        if not self.server.peer_allowed(self.request):
+            return
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+class KeyAgent(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix-socket server holding the private key and unwrapped data keys."""
+
+    daemon_threads = True
+
+    def __init__(self, key_manager, path: Union[str, Path, None] = None,
+                 ttl: int = DEFAULT_TTL):
+        """
+        Args:
+            key_manager: KeyManager with the private key already loaded
+            path: Socket path (defaults to socket_path())
+            ttl: Seconds until the agent forgets all keys and exits
+        """
+        self.key_manager = key_manager
+        self.path = Path(path) if path else socket_path()
+        self.expires_at = time.monotonic() + ttl
+        self._keys: Dict[bytes, bytes] = {}
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()  # stale socket from a crashed agent
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(str(self.path), _AgentHandler)
+        finally:
+            os.umask(old_umask)
+
+    def peer_allowed(self, conn) -> bool:
+        """Reject connections from other users (Linux SO_PEERCRED)."""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED,
+                                struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def dispatch(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "expires_in": int(self.expires_at - time.monotonic()),
+                    "keys": len(self._keys)}
+        if op == "unwrap":
+            wrapped = base64.b64decode(request["wrapped"])
+            return {"ok": True, "key": base64.b64encode(self._unwrap(wrapped)).decode()}
+        if op == "stop":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {"ok": True}
+        return {"ok": False, "error": f"unknown op: {op}"}
+
+    def _unwrap(self, wrapped: bytes) -> bytes:
+        digest = hashlib.sha256(wrapped).digest()
+        with self._lock:
+            key = self._keys.get(digest)
+            if key is None:
+                key = self.key_manager.decrypt_data(wrapped)
+                self._keys[digest] = key
+            return key
+
+    def serve_until_expired(self):
+        """Serve requests until the TTL runs out or a client sends "stop"."""
+        def expire():
+            remaining = self.expires_at - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            self.shutdown()
+
+        threading.Thread(target=expire, daemon=True).start()
+        try:
+            self.serve_forever()
+        finally:
+            self._keys.clear()
+            self.server_close()
+            if self.path.exists():
+                self.path.unlink()
+
+
+def request(message: dict, path: Union[str, Path, None] = None) -> Optional[dict]:
+    """Send one request to the agent; None if no agent is reachable."""
+    if not agent_supported():
+        return None
+    path = Path(path) if path else socket_path()
+    if not path.exists():
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.settimeout(CLIENT_TIMEOUT)
+            conn.connect(str(path))
+            conn.sendall(json.dumps(message).encode() + b"\n")
+            with conn.makefile('rb') as f:
+                line = f.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+def unwrap_aes_key(encrypted_key: bytes, key_manager=None) -> Optional[bytes]:
+    """
+    Unwrap an RSA-encrypted AES key, through the agent when it is running.
+
+    Falls back to loading the private key and unwrapping locally.
+
+    Args:
+        encrypted_key: Contents of encrypted/aes_key.bin
+        key_manager: KeyManager to use for the fallback (created if None)
+
+    Returns:
+        The AES key, or None if no agent is running and no private key exists
+    """
+    response = request({"op": "unwrap",
+                        "wrapped": base64.b64encode(encrypted_key).decode()})
+    if response and response.get("ok"):
+        return base64.b64decode(response["key"])
+
+    if key_manager is None:
+        from crypto.key_manager import KeyManager
+        key_manager = KeyManager()
+    if not key_manager.load_private_key():
+        return None
+    return key_manager.decrypt_data(encrypted_key)
@@ -0,0 +1,243 @@
+"""
+Single-file packed archive of the encrypted tree.
+
+encrypted/encrypted.pack holds every file of encrypted/ back to back,
+followed by an index mapping each relative path to (offset, length,
+sha256 of the stored bytes, sealed flag). The index itself is AES-GCM
+encrypted, so file names and the path -> blob mapping stay hidden.
+
+    [header: MAGIC "MVP17PAK" | version | index offset | index length]
+    [blob][blob]...[encrypted index]
+
+.enc files are stored exactly as they are on disk, so packing needs no
+re-encryption of the code. Every other file (manifest.json,
+search_index.json, ...) is sealed with the index key first, since those
+list file names, content hashes and sizes in plaintext. What the pack
+does not hide: each .enc blob keeps its plaintext format header (see
+mvp17.crypto.file_encryptor), so blob boundaries - and with them the
+approximate size of every stored file - can be found by scanning for it.
+
+The file is memory-mapped: opening it costs a stat() walk of encrypted/
+(to spot a stale pack), one open() and one small decrypt, and every
+lookup after that is a dict access plus a slice - no per-module open(),
+and a deploy copies one file instead of thousands.
+
+aes_key.bin stays outside the pack; it is needed to read the index.
+"""
+
+import os
+import hmac
+import json
+import mmap
+import struct
+import hashlib
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from mvp17.crypto.file_encryptor import FileEncryptor
+
+
+PACK_FILENAME = "encrypted.pack"
+PACK_MAGIC = b"MVP17PAK"
+PACK_VERSION = 2
+# Version 1 packs stored every file as-is (no sealed flag in the index)
+READABLE_VERSIONS = (1, PACK_VERSION)
+
+_HEADER = struct.Struct(">8sB3xQQ")
+
+# Not packed: the wrapped key (needed to open the pack) and the pack itself
+EXCLUDED_NAMES = ("aes_key.bin", PACK_FILENAME)
+
+
+def _index_encryptor(key: bytes) -> FileEncryptor:
+    return FileEncryptor(hmac.new(key, b"mvp17-packfile-index", hashlib.sha256).digest())
+
+
+def _packable_files(encrypted_dir: Path) -> List[Tuple[str, Path]]:
+    files = []
+    for path in sorted(encrypted_dir.rglob("*")):
+        if not path.is_file() or path.name.endswith(".tmp"):
+            continue
+        relative_path = path.relative_to(encrypted_dir).as_posix()
+        if relative_path in EXCLUDED_NAMES:
+            continue
+        files.append((relative_path, path))
+    return files
+
+
+def build_pack(encrypted_dir: Union[str, Path], key: bytes,
+               output_path: Union[str, Path, None] = None) -> int:
+    """
+    Pack every file under encrypted_dir into one archive.
+
+    Args:
+        encrypted_dir: The encrypted tree (.enc files, manifest, caches)
+        key: The repository AES key (encrypts the index)
+        output_path: Where to write (defaults to encrypted_dir/encrypted.pack)
+
+    Returns:
+        Number of files packed
+    """
+    encrypted_dir = Path(encrypted_dir)
+    output_path = Path(output_path) if output_path else encrypted_dir / PACK_FILENAME
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    index: Dict[str, List] = {}
+    sealer = _index_encryptor(key)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with open(tmp_path, 'wb') as pack:
+            pack.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, 0, 0))
+            for relative_path, path in _packable_files(encrypted_dir):
+                with open(path, 'rb') as f:
+                    blob = f.read()
+                sealed = not relative_path.endswith(".enc")
+                if sealed:
+                    blob = sealer.encrypt_bytes(blob)
+                index[relative_path] = [pack.tell(), len(blob),
+                                        hashlib.sha256(blob).hexdigest(), sealed]
+                pack.write(blob)
+
+            index_blob = sealer.encrypt_bytes(
+                json.dumps(index, separators=(',', ':')).encode('utf-8'))
+            index_offset = pack.tell()
+            pack.write(index_blob)
+            pack.seek(0)
+            pack.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION, index_offset, len(index_blob)))
+        os.replace(tmp_path, output_path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    return len(index)
+
+
+class PackFile:
+    """Read-only, memory-mapped view of an encrypted.pack archive."""
+
+    def __init__(self, path: Union[str, Path], key: bytes):
+        """
+        Args:
+            path: The .pack file
+            key: The repository AES key
+
+        Raises:
+            ValueError: If the file is not a pack or its index fails to authenticate
+        """
+        self.path = Path(path)
+        self.encryptor = FileEncryptor(key)
+        self._sealer = _index_encryptor(key)
+        with open(self.path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            magic, version, index_offset, index_length = _HEADER.unpack_from(self._mmap, 0)
+            if magic != PACK_MAGIC or version not in READABLE_VERSIONS:
+                raise ValueError(f"{self.path} is not a version {PACK_VERSION} pack file")
+            index_blob = self._mmap[index_offset:index_offset + index_length]
+            index = json.loads(self._sealer.decrypt_bytes(index_blob))
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise
+        self._index: Dict[str, Tuple[int, int, str, bool]] = {
+            name: (entry[0], entry[1], entry[2], len(entry) > 3 and bool(entry[3]))
+            for name, entry in index.items()
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def names(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def entry(self, name: str) -> Tuple[int, int, str, bool]:
+        """(offset, length, sha256, sealed) of a packed file."""
+        return self._index[name]
+
+    def read_raw(self, name: str, verify: bool = False) -> bytes:
+        """
+        The file as it is on disk (still encrypted for .enc files).
+
+        Args:
+            verify: Also check the stored bytes against the sha256 in the index
+
+        Raises:
+            KeyError: If name is not in the pack
+            ValueError: If verify is set and the entry is corrupt, or a
+                        sealed entry fails to authenticate
+        """
+        offset, length, digest, sealed = self._index[name]
+        blob = self._mmap[offset:offset + length]
+        if verify and hashlib.sha256(blob).hexdigest() != digest:
+            raise ValueError(f"Corrupt pack entry: {name}")
+        return self._sealer.decrypt_bytes(blob) if sealed else blob
+
+    def read(self, name: str) -> bytes:
+        """Decrypted contents of a packed .enc file."""
+        return self.encryptor.decrypt_bytes(self.read_raw(name))
+
+    def verify(self) -> List[str]:
+        """Names of entries whose blob doesn't match its recorded hash."""
+        bad = []
+        for name in self._index:
+            try:
+                self.read_raw(name, verify=True)
+            except ValueError:
+                bad.append(name)
+        return bad
+
+    def extract(self, output_dir: Union[str, Path]):
+        """Write all entries back out as a loose encrypted tree."""
+        output_dir = Path(output_dir)
+        for name in self._index:
+            target = output_dir / name
+            target.parent.mkdir(parents=True, exist_ok=True)
+            with open(target, 'wb') as f:
+                f.write(self.read_raw(name, verify=True))
+
+    def close(self):
+        self._mmap.close()
+
+    def __enter__(self) -> "PackFile":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _newest_mtime_ns(encrypted_dir: Path) -> int:
+    """Newest mtime of the files a pack of encrypted_dir would hold (0 if none)."""
+    newest = 0
+    stack = [encrypted_dir]
+    while stack:
+        with os.scandir(stack.pop()) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    # Bytecode caches are rewritten at runtime and checked on their own
+                    if entry.name != "__pycache__":
+                        stack.append(entry.path)
+                elif entry.name not in EXCLUDED_NAMES and not entry.name.endswith(".tmp"):
+                    newest = max(newest, entry.stat().st_mtime_ns)
+    return newest
+
+
+def open_pack(encrypted_dir: Union[str, Path], key: bytes) -> Optional[PackFile]:
+    """
+    The pack in encrypted_dir if it should be used, else None.
+
+    A pack older than any loose file next to it (an .enc file, a blob,
+    manifest.json, ...; bytecode caches aside) is stale - the tree was
+    re-encrypted or a file was saved after packing - and is ignored in
+    favour of the loose files.
+    """
+    encrypted_dir = Path(encrypted_dir)
+    pack_path = encrypted_dir / PACK_FILENAME
+    if not pack_path.is_file():
+        return None
+    if _newest_mtime_ns(encrypted_dir) > pack_path.stat().st_mtime_ns:
+        print(f"⚠️  Ignoring stale {pack_path} (older than the loose encrypted files)")
+        return None
+    return PackFile(pack_path, key)
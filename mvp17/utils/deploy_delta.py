@@ -0,0 +1,332 @@
+"""
+Delta deployment packages.
+
+Every deploy package (deploy/) carries deploy_manifest.json: the sha256
+and size of each file in it plus a package id, the hash of that list.
+`deploy_production.py --delta` compares the new package with the previous
+one and writes only what changed into a delta archive:
+
+    deltas/delta-<base id>-<target id>.tar.gz
+        DELTA.json      {"base", "target", "files": {path: {sha256, size}}, "removed": [...]}
+        files/<path>    new content of each added or changed file
+
+This module is copied into every package as apply_delta.py, which applies
+a delta on the server:
+
+    python apply_delta.py deltas/delta-....tar.gz
+    python apply_delta.py --verify
+
+A delta built against a different package version is refused, files about
+to be replaced or removed must still match the base manifest, and every
+payload file is checked against DELTA.json before anything is touched.
+Only the standard library is used, so it runs without the rest of the
+repository.
+"""
+
+import io
+import os
+import sys
+import json
+import zlib
+import shutil
+import hashlib
+import tarfile
+import argparse
+from pathlib import Path, PurePosixPath
+from typing import Dict, List, Optional, Tuple, Union
+
+
+MANIFEST_NAME = "deploy_manifest.json"
+DELTA_NAME = "DELTA.json"
+PAYLOAD_DIR = "files"
+STAGING_DIR = ".delta-staging"
+MANIFEST_VERSION = 1
+
+PathLike = Union[str, Path]
+
+
+class DeltaError(Exception):
+    """Raised when a delta doesn't fit the package or fails verification."""
+
+
+def _sha256_file(path: PathLike) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _manifest_id(files: Dict[str, dict]) -> str:
+    canonical = json.dumps(files, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def _is_tracked(relative_path: str) -> bool:
+    # Bytecode caches are rebuilt on the server, temp files are in flight
+    parts = relative_path.split("/")
+    return not (relative_path == MANIFEST_NAME or parts[0] == STAGING_DIR
+                or "__pycache__" in parts or relative_path.endswith(".tmp"))
+
+
+def _safe_relative(name: str) -> PurePosixPath:
+    """Reject absolute paths, .. and package metadata in names taken from a delta."""
+    if not isinstance(name, str) or not name:
+        raise DeltaError(f"Unsafe path in delta: {name!r}")
+    path = PurePosixPath(name)
+    if (path.is_absolute() or not path.parts or ".." in path.parts
+            or not _is_tracked(path.as_posix())):
+        raise DeltaError(f"Unsafe path in delta: {name!r}")
+    return path
+
+
+def build_manifest(package_dir: PathLike) -> dict:
+    """Hash every tracked file of a package into a manifest."""
+    package_dir = Path(package_dir)
+    files = {}
+    for path in sorted(package_dir.rglob("*")):
+        relative_path = path.relative_to(package_dir).as_posix()
+        if path.is_file() and _is_tracked(relative_path):
+            files[relative_path] = {'sha256': _sha256_file(path),
+                                    'size': path.stat().st_size}
+    return {'version': MANIFEST_VERSION, 'id': _manifest_id(files), 'files': files}
+
+
+def load_manifest(package_dir: PathLike) -> Optional[dict]:
+    manifest_path = Path(package_dir) / MANIFEST_NAME
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def write_manifest(package_dir: PathLike, manifest: dict):
+    manifest_path = Path(package_dir) / MANIFEST_NAME
+    tmp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def diff_manifests(base: dict, target: dict) -> Tuple[List[str], List[str]]:
+    """(added or changed paths, removed paths) going from base to target."""
+    changed = [path for path, info in target['files'].items()
+               if base['files'].get(path) != info]
+    removed = [path for path in base['files'] if path not in target['files']]
+    return sorted(changed), sorted(removed)
+
+
+def create_delta(package_dir: PathLike, base: dict, target: dict,
+                 output_dir: PathLike) -> Optional[Path]:
+    """
+    Write the delta from base to target (the manifest of package_dir).
+
+    Returns:
+        Path of the archive, or None if nothing changed
+    """
+    changed, removed = diff_manifests(base, target)
+    if not changed and not removed:
+        return None
+
+    package_dir = Path(package_dir)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    delta = {
+        'version': MANIFEST_VERSION,
+        'base': base['id'],
+        'target': target['id'],
+        'files': {path: target['files'][path] for path in changed},
+        'removed': removed,
+    }
+    delta_path = output_dir / f"delta-{base['id'][:12]}-{target['id'][:12]}.tar.gz"
+    tmp_path = delta_path.with_name(delta_path.name + ".tmp")
+    try:
+        with tarfile.open(tmp_path, 'w:gz') as tar:
+            data = json.dumps(delta, indent=2, sort_keys=True).encode('utf-8')
+            info = tarfile.TarInfo(DELTA_NAME)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+            for path in changed:
+                tar.add(package_dir / path, arcname=f"{PAYLOAD_DIR}/{path}", recursive=False)
+        os.replace(tmp_path, delta_path)
+    except BaseException:
+        if tmp_path.exists():
+            tmp_path.unlink()
+        raise
+    return delta_path
+
+
+def _extract(tar: tarfile.TarFile, name: str):
+    """Readable member of a delta archive, or None if absent or not a file."""
+    try:
+        return tar.extractfile(name)
+    except KeyError:
+        return None
+    except (EOFError, zlib.error, tarfile.TarError) as e:
+        raise DeltaError(f"Corrupt delta archive: {e}") from e
+
+
+def _load_delta(tar: tarfile.TarFile, delta_path: PathLike) -> dict:
+    """DELTA.json of a delta archive, with every path in it checked."""
+    member = _extract(tar, DELTA_NAME)
+    if member is None:
+        raise DeltaError(f"{delta_path} has no {DELTA_NAME}")
+    try:
+        delta = json.load(member)
+        valid = (isinstance(delta['base'], str) and isinstance(delta['target'], str)
+                 and isinstance(delta['files'], dict) and isinstance(delta['removed'], list))
+    except (ValueError, KeyError, TypeError, EOFError, zlib.error, tarfile.TarError):
+        valid = False
+    if not valid:
+        raise DeltaError(f"{delta_path} has a malformed {DELTA_NAME}")
+    for path in list(delta['files']) + delta['removed']:
+        _safe_relative(path)
+    return delta
+
+
+def verify_package(package_dir: PathLike) -> List[str]:
+    """Paths that are missing or don't match deploy_manifest.json."""
+    package_dir = Path(package_dir)
+    manifest = load_manifest(package_dir)
+    if manifest is None:
+        raise DeltaError(f"No {MANIFEST_NAME} in {package_dir}")
+    bad = []
+    for path, info in manifest['files'].items():
+        full_path = package_dir / path
+        if not full_path.is_file() or _sha256_file(full_path) != info['sha256']:
+            bad.append(path)
+    return bad
+
+
+def apply_delta(package_dir: PathLike, delta_path: PathLike,
+                force: bool = False) -> Tuple[List[str], List[str]]:
+    """
+    Bring package_dir from the delta's base version to its target version.
+
+    Args:
+        force: Replace files even if they no longer match the base manifest
+
+    Returns:
+        (written paths, removed paths); both empty if already applied
+
+    Raises:
+        DeltaError: If the delta doesn't fit the package or fails verification
+    """
+    package_dir = Path(package_dir)
+    current = load_manifest(package_dir)
+    if current is None:
+        raise DeltaError(f"No {MANIFEST_NAME} in {package_dir} - deploy a full package first")
+
+    try:
+        tar = tarfile.open(delta_path, 'r:*')
+    except (OSError, tarfile.TarError) as e:
+        raise DeltaError(f"Can't read delta {delta_path}: {e}") from e
+    with tar:
+        # Every path is checked here, before any of them is looked at on disk
+        delta = _load_delta(tar, delta_path)
+
+        if current['id'] == delta['target']:
+            return [], []
+        if current['id'] != delta['base']:
+            raise DeltaError(f"Package is at {current['id'][:12]}, "
+                             f"delta expects {delta['base'][:12]}")
+
+        # The server's copy must still be the version the delta was made against
+        touched = list(delta['files']) + delta['removed']
+        drifted = [path for path in touched if path in current['files'] and (
+            not (package_dir / path).is_file()
+            or _sha256_file(package_dir / path) != current['files'][path]['sha256'])]
+        if drifted and not force:
+            raise DeltaError(f"Files changed on the server since the last deploy: "
+                             f"{', '.join(drifted)}")
+
+        files = dict(current['files'])
+        files.update(delta['files'])
+        for path in delta['removed']:
+            files.pop(path, None)
+        if _manifest_id(files) != delta['target']:
+            raise DeltaError("Delta does not produce its target manifest")
+
+        staging = package_dir / STAGING_DIR
+        shutil.rmtree(staging, ignore_errors=True)
+        try:
+            # Extract and verify everything before replacing anything
+            for path, info in delta['files'].items():
+                relative_path = _safe_relative(path)
+                member = _extract(tar, f"{PAYLOAD_DIR}/{relative_path}")
+                if member is None:
+                    raise DeltaError(f"Delta is missing {path}")
+                staged = staging / relative_path
+                staged.parent.mkdir(parents=True, exist_ok=True)
+                digest = hashlib.sha256()
+                size = 0
+                with open(staged, 'wb') as f:
+                    try:
+                        for chunk in iter(lambda: member.read(1024 * 1024), b''):
+                            digest.update(chunk)
+                            size += len(chunk)
+                            f.write(chunk)
+                    except (EOFError, zlib.error, tarfile.TarError) as e:
+                        raise DeltaError(f"Corrupt file in delta: {path}") from e
+                if digest.hexdigest() != info['sha256'] or size != info['size']:
+                    raise DeltaError(f"Corrupt file in delta: {path}")
+
+            for path in delta['files']:
+                target = package_dir / _safe_relative(path)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                os.replace(staging / _safe_relative(path), target)
+            for path in delta['removed']:
+                target = package_dir / _safe_relative(path)
+                if target.exists():
+                    target.unlink()
+                parent = target.parent
+                while parent != package_dir and parent.exists() and not any(parent.iterdir()):
+                    parent.rmdir()
+                    parent = parent.parent
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    write_manifest(package_dir, {'version': MANIFEST_VERSION,
+                                 'id': delta['target'], 'files': files})
+    return sorted(delta['files']), sorted(delta['removed'])
+
+
+def main():
+    """Main entry point (apply_delta.py in a deploy package)."""
+    parser = argparse.ArgumentParser(description='Apply a delta deployment archive in place')
+    parser.add_argument('delta', nargs='?', help='delta-*.tar.gz built by deploy_production.py --delta')
+    parser.add_argument('--dir', default=str(Path(__file__).resolve().parent),
+                       help='Package directory (default: the one holding this script)')
+    parser.add_argument('--verify', action='store_true',
+                       help='Check every file against deploy_manifest.json')
+    parser.add_argument('--force', action='store_true',
+                       help='Apply even if files changed on the server since the last deploy')
+    args = parser.parse_args()
+
+    try:
+        if args.delta:
+            written, removed = apply_delta(args.dir, args.delta, force=args.force)
+            if not written and not removed:
+                print("✅ Delta already applied")
+            else:
+                for path in written:
+                    print(f"   ✅ {path}")
+                for path in removed:
+                    print(f"   🗑️  {path}")
+                print(f"🔄 Applied delta: {len(written)} written, {len(removed)} removed")
+                print("   Restart the application to load the new code")
+        if args.verify or not args.delta:
+            bad = verify_package(args.dir)
+            if bad:
+                print(f"❌ {len(bad)} file(s) don't match {MANIFEST_NAME}:")
+                for path in bad:
+                    print(f"   {path}")
+                sys.exit(1)
+            print(f"✅ Package matches {MANIFEST_NAME}")
+    except DeltaError as e:
+        print(f"❌ Error: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
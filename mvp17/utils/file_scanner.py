@@ -0,0 +1,75 @@
+"""
+Repository file scanner.
+
+Walks a directory tree top-down with os.scandir() and consults RepoIgnore
+for every directory before descending into it, so ignored trees such as
+venv/, node_modules/ or build/ are pruned at their root instead of being
+listed and pattern-matched entry by entry.
+"""
+
+import os
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from mvp17.utils.repoignore import RepoIgnore
+
+
+class FileScanner:
+    """Lists the files under a directory that are not ignored."""
+
+    def __init__(self, repoignore: Optional[RepoIgnore] = None):
+        """
+        Args:
+            repoignore: Patterns to apply (defaults to ./.repoignore)
+        """
+        self.repoignore = repoignore if repoignore is not None else RepoIgnore()
+
+    def iter_files(self, root_dir: Union[str, Path],
+                   subdir: Optional[str] = None) -> Iterator[Path]:
+        """
+        Yield non-ignored files under root_dir, in sorted order per directory.
+
+        Paths are matched relative to root_dir. Symlinked directories are not
+        followed.
+
+        Args:
+            root_dir: Directory the ignore patterns are relative to
+            subdir: Only walk this directory (relative to root_dir); the
+                    caller is responsible for checking it isn't ignored
+        """
+        root_dir = Path(root_dir)
+        matches = self.repoignore.matches
+        if subdir:
+            subdir = subdir.strip('/')
+            stack = [(root_dir / subdir, subdir + "/")]
+        else:
+            stack = [(root_dir, "")]
+
+        while stack:
+            directory, prefix = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+
+            subdirs = []
+            for entry in entries:
+                relative_path = prefix + entry.name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+                if is_dir:
+                    # Prune: an ignored directory is never opened
+                    if not matches(relative_path, is_dir=True):
+                        subdirs.append((Path(entry.path), relative_path + "/"))
+                elif entry.is_file() and not matches(relative_path):
+                    yield Path(entry.path)
+
+            # Reversed so the stack pops subdirectories in sorted order
+            stack.extend(reversed(subdirs))
+
+    def scan(self, root_dir: Union[str, Path]) -> List[Path]:
+        """Return all non-ignored files under root_dir."""
+        return list(self.iter_files(root_dir))
@@ -0,0 +1,242 @@
+"""
+In-process hot reload of encrypted modules for run_local.py.
+
+Watches encrypted/ and, when .enc files change (e.g. after
+save_encrypted.py), re-decrypts only the affected modules and swaps the
+rebuilt Flask app into the running server - no restart, no second RSA
+unwrap, no full decrypt:
+
+    1. changed modules that are already imported are reloaded through the
+       import hook, followed by the imported modules that reference them
+    2. web_app.py is executed again (as on startup, not as __main__, so
+       app.run() is not called) and the new app gets the jobs/metrics APIs
+       via setup_app
+    3. the running app's wsgi_app is pointed at the new app, so the server
+       keeps its socket while routes, blueprints and hooks are replaced
+
+Bytecode-cache writes and temp files inside encrypted/ are ignored. If a
+reload fails (e.g. a syntax error) the previous code keeps serving.
+"""
+
+import sys
+import time
+import types
+import threading
+import importlib
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from mvp17.crypto.blob_store import BLOBS_DIRNAME, load_blob_map
+from mvp17.crypto.encrypted_import import ENC_SUFFIX, EncryptedModuleFinder, EncryptedModuleLoader
+from mvp17.utils.watch import ChangeCollector
+
+
+DEFAULT_DEBOUNCE = 0.1
+
+
+def module_name_for(enc_name: str) -> str:
+    """"pkg/mod.py.enc" -> "pkg.mod", "pkg/__init__.py.enc" -> "pkg"."""
+    parts = enc_name[:-len(ENC_SUFFIX)].split("/")
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+
+def find_flask_app(namespace: Dict[str, Any]):
+    """The Flask app defined in a module namespace ("app" preferred), or None."""
+    from flask import Flask
+
+    app = namespace.get('app')
+    if isinstance(app, Flask):
+        return app
+    return next((value for value in namespace.values() if isinstance(value, Flask)), None)
+
+
+def server_address(namespace: Dict[str, Any], app, host: str, port: int,
+                   port_name: str = 'PORT') -> Tuple[str, int]:
+    """
+    Host and port to serve web_app.py's app on.
+
+    The launchers run web_app.py under its module name, so its
+    `if __name__ == "__main__"` block (and the app.run() call in it) does
+    not run. A module-level HOST / port_name, then the app's SERVER_NAME
+    config ("host:port"), override the launcher's defaults instead.
+
+    Args:
+        namespace: Globals web_app.py was executed with
+        app: Its Flask app
+        host, port: Defaults if web_app.py configures neither
+        port_name: Global holding the port (LOCAL_DEV_PORT for run_local.py)
+    """
+    server_name = app.config.get('SERVER_NAME') or ''
+    config_host, _, config_port = server_name.partition(':')
+    return (namespace.get('HOST') or config_host or host,
+            int(namespace.get(port_name) or config_port or port))
+
+
+def _encrypted_modules() -> Dict[str, Any]:
+    return {
+        name: module for name, module in list(sys.modules.items())
+        if isinstance(getattr(getattr(module, '__spec__', None), 'loader', None),
+                      EncryptedModuleLoader)
+    }
+
+
+def _references(module, names: Set[str]) -> bool:
+    """Whether a module holds one of the named modules or objects defined in them."""
+    for value in vars(module).values():
+        if isinstance(value, types.ModuleType) and value.__name__ in names:
+            return True
+        if getattr(value, '__module__', None) in names:
+            return True
+    return False
+
+
+class HotReloader:
+    """Reloads changed encrypted modules into a running Flask app."""
+
+    def __init__(self, finder: EncryptedModuleFinder, main_globals: Dict[str, Any],
+                 setup_app: Optional[Callable[[Any], None]] = None,
+                 main_module: str = "web_app", debounce: float = DEFAULT_DEBOUNCE):
+        """
+        Args:
+            finder: The installed import hook
+            main_globals: Globals web_app.py is first executed with (copied
+                          now, before the script fills them)
+            setup_app: Called with every rebuilt app (jobs/metrics APIs)
+            main_module: Module name the launcher runs web_app.py under
+            debounce: Quiet period in seconds before a batch is reloaded
+        """
+        self.finder = finder
+        self.main_globals = dict(main_globals)
+        self.setup_app = setup_app
+        self.main_module = main_module
+        self.debounce = debounce
+        self.app = None
+        self._observer = None
+        self._collector = None
+        self._thread = None
+
+    def start(self, app):
+        """Watch encrypted/ and reload into app (the app the server runs)."""
+        try:
+            from watchdog.observers import Observer
+        except ImportError:
+            print("⚠️  watchdog is not installed - hot reload disabled (pip install watchdog)")
+            return
+        if self._observer is not None:
+            return
+        self.app = app
+        self._collector = ChangeCollector()
+        self._observer = Observer()
+        self._observer.schedule(self._collector, str(self.finder.encrypted_dir), recursive=True)
+        self._observer.daemon = True
+        self._observer.start()
+        self._thread = threading.Thread(target=self._loop, args=(self._collector,),
+                                        daemon=True, name="hot-reload")
+        self._thread.start()
+        print("♻️  Hot reload: watching encrypted/ for changes")
+
+    def stop(self):
+        """Stop watching; no reload runs once this returns."""
+        if self._observer is None:
+            return
+        self._observer.stop()
+        self._collector.close()
+        # Waits for a reload already in progress
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        self._observer = self._collector = self._thread = None
+
+    def _loop(self, collector: ChangeCollector):
+        while True:
+            changed = collector.drain(self.debounce)
+            # stop() may have been called while drain() was waiting
+            if collector.closed.is_set():
+                return
+            try:
+                self.reload(changed)
+            except Exception as e:
+                print(f"❌ Hot reload failed, still serving the previous code: {e!r}")
+
+    def changed_modules(self, paths: Iterable[str]) -> Set[str]:
+        """Module names affected by a batch of changed paths under encrypted/."""
+        root = self.finder.encrypted_dir
+        names = set()
+        blobs_changed = False
+        for path in paths:
+            try:
+                relative_path = Path(path).resolve().relative_to(root).as_posix()
+            except (ValueError, OSError):
+                continue
+            parts = relative_path.split("/")
+            if "__pycache__" in parts or relative_path.endswith(".tmp"):
+                continue
+            if relative_path == "manifest.json" or parts[0] == BLOBS_DIRNAME:
+                blobs_changed = True
+            elif relative_path.endswith(ENC_SUFFIX):
+                names.add(module_name_for(relative_path))
+
+        if blobs_changed or (names and self.finder.pack is not None):
+            # Edits land as loose files; a pack in use is stale from now on
+            self.finder.pack = None
+            old, new = self.finder.blobs, load_blob_map(root)
+            self.finder.blobs = new
+            names.update(module_name_for(name) for name in set(old) | set(new)
+                         if name.endswith(ENC_SUFFIX) and old.get(name) != new.get(name))
+        return names
+
+    def reload(self, paths: Iterable[str]) -> List[str]:
+        """
+        Reload the modules behind a batch of changed paths.
+
+        Returns:
+            Names of the reloaded modules (web_app last, if rebuilt)
+        """
+        start = time.perf_counter()
+        names = self.changed_modules(paths)
+        if not names:
+            return []
+        importlib.invalidate_caches()
+
+        reloaded = self._reload_modules(names - {self.main_module})
+        if reloaded or self.main_module in names:
+            self._reload_main()
+            reloaded.append(self.main_module)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"♻️  {time.strftime('%H:%M:%S')} reloaded {', '.join(reloaded)} "
+              f"in {elapsed:.0f} ms")
+        return reloaded
+
+    def _reload_modules(self, names: Set[str]) -> List[str]:
+        """Reload imported modules in names, then the modules that use them."""
+        modules = _encrypted_modules()
+        # Not imported yet: the next import picks up the new code anyway
+        pending = sorted(name for name in names if name in modules)
+        stale = set(pending)
+        reloaded = []
+        while pending:
+            name = pending.pop(0)
+            modules[name] = importlib.reload(modules[name])
+            reloaded.append(name)
+            for other, module in modules.items():
+                if other not in stale and _references(module, stale):
+                    stale.add(other)
+                    pending.append(other)
+        return reloaded
+
+    def _reload_main(self):
+        """Run web_app.py again and route the live server to the new app."""
+        code = self.finder.get_code(self.main_module)
+        namespace = dict(self.main_globals, __name__=self.main_module)
+        exec(code, namespace)
+
+        new_app = find_flask_app(namespace)
+        if new_app is None:
+            raise RuntimeError(f"{self.main_module} no longer defines a Flask app")
+        new_app.debug = self.app.debug
+        if self.setup_app is not None:
+            self.setup_app(new_app)
+        # Flask.__call__ dispatches through self.wsgi_app
+        self.app.wsgi_app = new_app.wsgi_app
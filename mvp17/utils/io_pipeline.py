@@ -0,0 +1,183 @@
+"""
+Overlapped read -> process -> write pipeline for bulk file work.
+
+A plain loop over files alternates blocking read, CPU work (encrypt,
+decrypt) and blocking write, so the disk and the CPU take turns sitting
+idle - on network filesystems that roughly doubles wall time. run_pipeline()
+runs the three stages for different files at once:
+
+    read   file n+1   (I/O thread pool)
+    process file n    (CPU thread(s))
+    write  file n-1   (I/O thread pool)
+
+asyncio drives the stages; the blocking calls run in the thread pools.
+Files are admitted in order against a byte budget (bytes read but not yet
+written), so memory stays bounded however many files are queued. A file
+larger than the whole budget is admitted once nothing else is in flight.
+Small files move through the stages in batches (up to BATCH_BYTES or
+MAX_BATCH_ITEMS), since a thread hand-off costs more than reading,
+encrypting or writing a few hundred bytes.
+"""
+
+import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional
+
+
+DEFAULT_IN_FLIGHT = 64 * 1024 * 1024
+DEFAULT_IO_THREADS = 4
+MIN_ITEM_COST = 4096               # per-file overhead, so empty files are bounded too
+BATCH_BYTES = 1024 * 1024          # small files are handed between stages in groups
+MAX_BATCH_ITEMS = 64
+
+
+class ByteBudget:
+    """Async limit on the bytes held by items in flight."""
+
+    def __init__(self, limit: int):
+        if limit <= 0:
+            raise ValueError("limit must be positive")
+        self.limit = limit
+        self.used = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, size: int) -> int:
+        """
+        Wait until size bytes fit into the budget and take them.
+
+        Returns:
+            The amount taken (capped at the limit) - pass it to release()
+        """
+        size = min(size, self.limit)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.used + size <= self.limit)
+            self.used += size
+        return size
+
+    async def release(self, size: int):
+        async with self._condition:
+            self.used -= size
+            self._condition.notify_all()
+
+
+def run_pipeline(items: Iterable[Any],
+                 read: Callable[[Any], Any],
+                 process: Callable[[Any, Any], tuple],
+                 write: Callable[[Any, Any], None],
+                 size_of: Callable[[Any], int] = lambda item: os.stat(item).st_size,
+                 max_in_flight: int = DEFAULT_IN_FLIGHT,
+                 io_threads: int = DEFAULT_IO_THREADS,
+                 cpu_threads: int = 1,
+                 on_error: Optional[Callable[[Any, Exception], Any]] = None) -> List[Any]:
+    """
+    Run read/process/write over items with the stages overlapped.
+
+    Args:
+        items: Work items (e.g. file paths)
+        read: read(item) -> data, in an I/O thread
+        process: process(item, data) -> (result, payload), in a CPU thread
+        write: write(item, payload), in an I/O thread; skipped if payload is None
+        size_of: Bytes an item holds in memory while in flight (estimate)
+        max_in_flight: Byte budget across all items between read and write
+        io_threads: Threads for read and write
+        cpu_threads: Threads for process
+        on_error: on_error(item, exc) -> result for a failed item
+                  (default: the exception propagates)
+
+    Returns:
+        One result per item, in input order
+    """
+    return asyncio.run(_run(list(items), read, process, write, size_of, max_in_flight,
+                            io_threads, cpu_threads, on_error))
+
+
+def _read_batch(read, batch):
+    out = []
+    for index, item in batch:
+        try:
+            out.append((index, item, read(item), None))
+        except Exception as e:
+            out.append((index, item, None, e))
+    return out
+
+
+def _process_batch(process, batch):
+    out = []
+    for index, item, data, error in batch:
+        if error is None:
+            try:
+                result, payload = process(item, data)
+                out.append((index, item, result, payload, None))
+                continue
+            except Exception as e:
+                error = e
+        out.append((index, item, None, None, error))
+    return out
+
+
+def _write_batch(write, batch):
+    out = []
+    for index, item, result, payload, error in batch:
+        if error is None and payload is not None:
+            try:
+                write(item, payload)
+            except Exception as e:
+                error = e
+        out.append((index, item, result, error))
+    return out
+
+
+async def _run(items, read, process, write, size_of, max_in_flight,
+               io_threads, cpu_threads, on_error):
+    loop = asyncio.get_running_loop()
+    budget = ByteBudget(max_in_flight)
+    results: List[Any] = [None] * len(items)
+    batch_bytes = min(BATCH_BYTES, max_in_flight)
+
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="pipeline-io") as io_pool, \
+            ThreadPoolExecutor(max_workers=cpu_threads, thread_name_prefix="pipeline-cpu") as cpu_pool:
+
+        async def run_batch(batch, cost):
+            try:
+                batch = await loop.run_in_executor(io_pool, _read_batch, read, batch)
+                batch = await loop.run_in_executor(cpu_pool, _process_batch, process, batch)
+                batch = await loop.run_in_executor(io_pool, _write_batch, write, batch)
+                for index, item, result, error in batch:
+                    if error is not None:
+                        if on_error is None:
+                            raise error
+                        result = on_error(item, error)
+                    results[index] = result
+            finally:
+                await budget.release(cost)
+
+        tasks = []
+
+        async def submit(batch, cost):
+            cost = await budget.acquire(cost)
+            tasks.append(asyncio.create_task(run_batch(batch, cost)))
+
+        try:
+            # Admit items in order so reads follow the input order; small
+            # files travel in batches so the per-hop overhead is amortised
+            batch, batch_cost = [], 0
+            for index, item in enumerate(items):
+                try:
+                    size = size_of(item)
+                except OSError:
+                    size = 0
+                batch.append((index, item))
+                batch_cost += max(size, MIN_ITEM_COST)
+                if batch_cost >= batch_bytes or len(batch) >= MAX_BATCH_ITEMS:
+                    await submit(batch, batch_cost)
+                    batch, batch_cost = [], 0
+            if batch:
+                await submit(batch, batch_cost)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+    return results
@@ -0,0 +1,375 @@
+"""
+Background jobs for long-running web requests (FHE computations, search).
+
+Instead of holding a request worker for the whole computation, a client
+submits a job and gets its id back immediately:
+
+    POST   /api/jobs                 {"type": "fhe-demo", "operation": "sum", "data": [...]}
+                                     -> 202 {"job_id": ..., "status_url": ..., "events_url": ...}
+    GET    /api/jobs/<id>            status, progress, partial results, result or error
+    GET    /api/jobs/<id>/events     server-sent events, one per progress update
+    DELETE /api/jobs/<id>            cancel
+
+Jobs run on a bounded thread pool (CPU-heavy FHE work can be handed on to
+mvp17.crypto.fhe_pool.FHEPool from there). At most max_queued jobs may wait for a
+worker; further submissions are rejected with 429 so a burst of heavy
+requests can't starve /api/status. Cancellation is immediate for queued
+jobs and cooperative for running ones: handlers call job.report(), which
+raises JobCancelled once the job has been cancelled.
+"""
+
+import json
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Imported before the launchers install the encrypted import hook, so these
+# are always the tooling modules and never same-named encrypted ones
+from mvp17.crypto.blind_index import BlindIndex
+from mvp17.crypto.fhe_engine import FHEEngine
+from mvp17.utils import metrics
+
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (DONE, FAILED, CANCELLED)
+
+SSE_KEEPALIVE = 15.0
+
+
+class JobCancelled(Exception):
+    """Raised inside a job handler when the job has been cancelled."""
+
+
+class QueueFullError(Exception):
+    """Raised by JobManager.submit() when too many jobs are waiting."""
+
+
+class Job:
+    """State of one background job; updates wake up SSE listeners."""
+
+    def __init__(self, kind: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.partial: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.version = 0
+        self.future = None
+        self._cancel_requested = threading.Event()
+        self._changed = threading.Condition()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_requested.is_set()
+
+    def _update(self, **fields):
+        with self._changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if fields.get('status') in FINISHED_STATES:
+                self.finished_at = time.time()
+            self.version += 1
+            self._changed.notify_all()
+
+    def report(self, progress: Optional[float] = None, message: Optional[str] = None,
+               partial: Any = None):
+        """
+        Publish progress from inside a handler.
+
+        Args:
+            progress: Fraction done, 0.0 - 1.0
+            message: Short human-readable step description
+            partial: A partial result to append to the job's partial list
+
+        Raises:
+            JobCancelled: If the job was cancelled (stop working and return)
+        """
+        if self.cancelled:
+            raise JobCancelled()
+        fields = {}
+        if progress is not None:
+            fields['progress'] = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            fields['message'] = message
+        if partial is not None:
+            fields['partial'] = self.partial + [partial]
+        self._update(**fields)
+
+    def wait_for_change(self, version: int, timeout: float) -> int:
+        """Block until the job's version differs from version (or timeout)."""
+        with self._changed:
+            self._changed.wait_for(lambda: self.version != version, timeout=timeout)
+            return self.version
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._changed:
+            return {
+                'job_id': self.id,
+                'type': self.kind,
+                'status': self.status,
+                'progress': self.progress,
+                'message': self.message,
+                'partial': list(self.partial),
+                'result': self.result,
+                'error': self.error,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at,
+            }
+
+
+class JobManager:
+    """Bounded background executor with a queue-depth limit and cancellation."""
+
+    def __init__(self, max_workers: int = 2, max_queued: int = 16,
+                 retention: float = 15 * 60):
+        """
+        Args:
+            max_workers: Jobs running at the same time
+            max_queued: Jobs allowed to wait for a worker before submit() fails
+            retention: Seconds a finished job stays queryable
+        """
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, handler: Callable[..., Any], *args) -> Job:
+        """
+        Queue handler(job, *args) to run in the background.
+
+        Raises:
+            QueueFullError: If max_queued jobs are already waiting
+        """
+        with self._lock:
+            self._prune()
+            waiting = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if waiting >= self.max_queued:
+                raise QueueFullError(f"{waiting} jobs already queued")
+            job = Job(kind)
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job, handler, args)
+        return job
+
+    @staticmethod
+    def _run(job: Job, handler: Callable[..., Any], args):
+        if job.cancelled:
+            job._update(status=CANCELLED)
+            return
+        job._update(status=RUNNING)
+        try:
+            result = handler(job, *args)
+        except JobCancelled:
+            job._update(status=CANCELLED)
+        except Exception as e:
+            job._update(status=FAILED, error=str(e))
+        else:
+            job._update(status=DONE, progress=1.0, result=result)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a job; returns it, or None if the id is unknown."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job._cancel_requested.set()
+        if job.future is not None and job.future.cancel():
+            job._update(status=CANCELLED)  # never started
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            counts = {state: 0 for state in (QUEUED, RUNNING) + FINISHED_STATES}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        return counts
+
+    def events(self, job: Job) -> Iterator[str]:
+        """Server-sent event stream of a job's state until it finishes."""
+        version = -1
+        while True:
+            current = job.wait_for_change(version, SSE_KEEPALIVE)
+            if current == version:
+                yield ": keepalive\n\n"
+                continue
+            version = current
+            snapshot = job.to_dict()
+            event = "end" if snapshot['status'] in FINISHED_STATES else "progress"
+            yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+            if event == "end":
+                return
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        for job in list(self._jobs.values()):
+            job._cancel_requested.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+# ----------------------------------------------------------------------
+# Handlers
+# ----------------------------------------------------------------------
+
+def fhe_demo_handler(engine) -> Callable[[Job, dict], dict]:
+    """Job handler for /api/fhe-demo style payloads ({"operation", "data"})."""
+    def run(job: Job, payload: dict) -> dict:
+        operation = payload.get('operation', 'sum')
+        data = [float(x) for x in payload.get('data', [])]
+        if not data:
+            raise ValueError("No input data")
+        if operation not in ('sum', 'mean'):
+            raise ValueError(f"Unsupported operation: {operation}")
+
+        job.report(0.05, "Loading FHE context")
+        engine.context
+        with metrics.span("fhe_compute"):
+            job.report(0.1, "Encrypting input")
+            encrypted = engine.encrypt(data)
+            job.report(0.4, f"Computing {operation} on {encrypted.ciphertext_count} ciphertext(s)")
+            result = getattr(engine, operation)(encrypted)
+            job.report(0.8, "Decrypting result")
+            value = float(engine.decrypt(result)[0])
+
+        expected = sum(data) if operation == 'sum' else sum(data) / len(data)
+        return {
+            'operation': operation,
+            'input_data': data,
+            'result': round(value, 4),
+            'expected': round(expected, 4),
+            'message': f"Computed {operation} on encrypted data",
+        }
+    return run
+
+
+def search_handler(index) -> Callable[[Job, dict], dict]:
+    """Job handler for /api/search style payloads ({"keyword", "prefix"})."""
+    def run(job: Job, payload: dict) -> dict:
+        keyword = str(payload.get('keyword', '')).strip()
+        if not keyword:
+            raise ValueError("No keyword")
+        job.report(0.1, "Searching blind index")
+        files = index.search(keyword, prefix=bool(payload.get('prefix')))
+        return {
+            'keyword': keyword,
+            'matches': [{'file': path} for path in files],
+            'count': len(files),
+        }
+    return run
+
+
+# ----------------------------------------------------------------------
+# Flask integration
+# ----------------------------------------------------------------------
+
+def create_jobs_blueprint(manager: JobManager,
+                          handlers: Dict[str, Callable[[Job, dict], Any]]):
+    """
+    Flask blueprint serving /api/jobs.
+
+    Args:
+        manager: JobManager the jobs run on
+        handlers: Job type (the "type" field of the POST body) -> handler(job, payload)
+    """
+    from flask import Blueprint, Response, jsonify, request, url_for
+
+    blueprint = Blueprint('jobs', __name__, url_prefix='/api/jobs')
+
+    def _not_found(job_id):
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+
+    @blueprint.route('', methods=['POST'])
+    def submit_job():
+        payload = request.get_json(silent=True) or {}
+        kind = payload.get('type')
+        handler = handlers.get(kind)
+        if handler is None:
+            return jsonify({'error': f'Unknown job type: {kind}',
+                            'types': sorted(handlers)}), 400
+        try:
+            job = manager.submit(kind, handler, payload)
+        except QueueFullError as e:
+            return jsonify({'error': f'Job queue is full ({e})'}), 429
+        return jsonify({
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': url_for('jobs.job_status', job_id=job.id),
+            'events_url': url_for('jobs.job_events', job_id=job.id),
+        }), 202
+
+    @blueprint.route('/<job_id>', methods=['GET'])
+    def job_status(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            return _not_found(job_id)
+        return jsonify(job.to_dict())
+
+    @blueprint.route('/<job_id>', methods=['DELETE'])
+    def cancel_job(job_id):
+        job = manager.cancel(job_id)
+        if job is None:
+            return _not_found(job_id)
+        return jsonify(job.to_dict())
+
+    @blueprint.route('/<job_id>/events', methods=['GET'])
+    def job_events(job_id):
+        job = manager.get(job_id)
+        if job is None:
+            return _not_found(job_id)
+        return Response(manager.events(job), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+    return blueprint
+
+
+def register_jobs_api(app, key: bytes, encrypted_dir="encrypted",
+                      manager: Optional[JobManager] = None,
+                      fhe_engine: Optional[FHEEngine] = None,
+                      index: Optional[BlindIndex] = None) -> JobManager:
+    """
+    Register /api/jobs on a Flask app with the fhe-demo and search handlers.
+
+    Args:
+        app: Flask application
+        key: Repository AES key (blind index, FHE context cache)
+        encrypted_dir: Folder holding the encrypted tree and search index
+        manager: JobManager to run the jobs on (default: a new one)
+        fhe_engine: FHEEngine for fhe-demo jobs (default: one using the key's cache)
+        index: Loaded BlindIndex for search jobs (default: loaded from encrypted_dir)
+
+    Returns:
+        The JobManager backing the API
+    """
+    if manager is None:
+        manager = JobManager()
+    if fhe_engine is None:
+        fhe_engine = FHEEngine(cache_key=key)
+    if index is None:
+        index = BlindIndex(key, encrypted_dir).load()
+    handlers = {
+        'fhe-demo': fhe_demo_handler(fhe_engine),
+        'search': search_handler(index),
+    }
+    app.register_blueprint(create_jobs_blueprint(manager, handlers))
+    return manager
@@ -0,0 +1,274 @@
+"""
+In-process metrics in Prometheus text format.
+
+A minimal registry (counters, gauges, histograms with labels) plus timing
+spans for the stages of serving the encrypted web app:
+
+    rsa_unwrap      unwrapping aes_key.bin (launcher)
+    load_webapp     decrypting/compiling web_app.py or reading its cache (launcher)
+    aes_decrypt     decrypting a module's source (import hook)
+    compile         compiling decrypted source (import hook)
+    exec:<module>   running a module body (import hook)
+    fhe_context     building or loading the FHE context
+    fhe_compute     encrypt + operation + decrypt in FHEEngine.compute()
+    render:<name>   rendering a Flask template
+
+instrument_flask() adds per-endpoint request counters and latency
+histograms and serves everything at /api/metrics.
+
+    with metrics.span("rsa_unwrap"):
+        key = unwrap_aes_key(encrypted_key)
+"""
+
+import time
+import bisect
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+                   0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_labels(names: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, or is computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Evaluate function() on every scrape instead of storing a value."""
+        key = self._key(labels)
+        with self._lock:
+            self._functions[key] = function
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count], sum
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+                self._sums[key] = 0.0
+            counts[index] += 1
+            self._sums[key] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key])
+                           for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        return "\n".join(line for metric in metrics for line in metric.render()) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "mvp17_stage_duration_seconds", "Time spent per processing stage", ["stage"])
+DECRYPTED_BYTES = REGISTRY.counter(
+    "mvp17_decrypted_bytes_total", "Plaintext bytes decrypted into memory by this process")
+FHE_CONTEXT_BYTES = REGISTRY.gauge(
+    "mvp17_fhe_context_bytes", "Serialized size of the loaded FHE context (keys included)")
+HTTP_REQUESTS = REGISTRY.counter(
+    "mvp17_http_requests_total", "HTTP requests handled", ["endpoint", "method", "status"])
+HTTP_SECONDS = REGISTRY.histogram(
+    "mvp17_http_request_duration_seconds", "HTTP request latency", ["endpoint"])
+
+
+@contextmanager
+def span(stage: str):
+    """Time the enclosed block into mvp17_stage_duration_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=stage)
+
+
+def instrument_flask(app, path: str = "/api/metrics", registry: Optional[Registry] = None):
+    """
+    Record per-endpoint request counts/latency and template render time on a
+    Flask app, and serve the registry at path.
+    """
+    from flask import Response, g, request, template_rendered, before_render_template
+
+    registry = registry or REGISTRY
+
+    @app.before_request
+    def _start_timer():
+        g._mvp17_start = time.perf_counter()
+
+    @app.after_request
+    def _record_request(response):
+        start = g.pop('_mvp17_start', None)
+        endpoint = request.endpoint or "unmatched"
+        if start is not None:
+            HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method,
+                          status=str(response.status_code))
+        return response
+
+    def _before_render(sender, template, context, **extra):
+        g._mvp17_render_start = time.perf_counter()
+
+    def _after_render(sender, template, context, **extra):
+        start = g.pop('_mvp17_render_start', None)
+        if start is not None:
+            STAGE_SECONDS.observe(time.perf_counter() - start,
+                                  stage=f"render:{template.name}")
+
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    # Signal receivers are weakly referenced; keep them alive with the app
+    app.extensions['mvp17_metrics'] = (_before_render, _after_render)
+
+    def metrics_endpoint():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule(path, 'mvp17_metrics', metrics_endpoint)
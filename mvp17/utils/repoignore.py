@@ -0,0 +1,182 @@
+"""
+.repoignore parser (gitignore syntax).
+
+All patterns are compiled up front into a handful of combined regexes: runs
+of consecutive patterns with the same polarity (ignore vs. negated "!") are
+joined into one alternation, separately for directories and for files (which
+skip directory-only "dir/" patterns). A path is checked against those groups
+from last to first and the first group that matches decides, which gives
+gitignore's "last matching pattern wins" semantics in a few regex calls -
+a single one when there are no negations - instead of one per pattern.
+
+As in git, a file can't be re-included if one of its parent directories is
+ignored, which is what lets FileScanner prune ignored directories without
+descending into them.
+"""
+
+import re
+from pathlib import Path
+from typing import Iterable, List, NamedTuple, Optional, Pattern, Union
+
+
+class _Rule(NamedTuple):
+    regex: str
+    negated: bool
+    dir_only: bool
+
+
+class _Group(NamedTuple):
+    regex: Pattern
+    negated: bool
+
+
+def _translate_glob(glob: str) -> str:
+    """Translate one gitignore glob (without anchoring) into a regex fragment."""
+    out = []
+    i, n = 0, len(glob)
+    while i < n:
+        c = glob[i]
+        if c == '*':
+            if glob.startswith('**', i):
+                at_start = i == 0 or glob[i - 1] == '/'
+                at_end = i + 2 == n or glob[i + 2] == '/'
+                if at_start and at_end:
+                    if i + 2 == n:
+                        out.append('.*')       # "foo/**" - everything below
+                        i += 2
+                    else:
+                        out.append('(?:.*/)?')  # "**/" - zero or more dirs
+                        i += 3
+                    continue
+                out.append('[^/]*')
+                i += 2
+                continue
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[':
+            end = glob.find(']', i + 2 if glob.startswith('[!', i) or glob.startswith('[^', i) else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = glob[i + 1:end]
+                if body[:1] in ('!', '^'):
+                    body = '^' + body[1:]
+                out.append('[' + body.replace('\\', '\\\\') + ']')
+                i = end
+        elif c == '\\' and i + 1 < n:
+            i += 1
+            out.append(re.escape(glob[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def _parse_line(line: str) -> Optional[_Rule]:
+    """Turn one .repoignore line into a rule, or None for blanks/comments."""
+    line = line.rstrip('\n').rstrip('\r')
+    # Trailing spaces are ignored unless escaped
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    if not line or line.startswith('#'):
+        return None
+
+    negated = line.startswith('!')
+    if negated:
+        line = line[1:]
+    elif line.startswith('\\#') or line.startswith('\\!'):
+        line = line[1:]
+
+    dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+
+    # A slash anywhere but the end anchors the pattern to the root
+    anchored = '/' in line
+    line = line.lstrip('/')
+    prefix = '' if anchored else '(?:.*/)?'
+    return _Rule(prefix + _translate_glob(line), negated, dir_only)
+
+
+class RepoIgnore:
+    """Matches repository-relative paths against .repoignore patterns."""
+
+    def __init__(self, ignore_file: Union[str, Path] = ".repoignore",
+                 patterns: Optional[Iterable[str]] = None):
+        """
+        Args:
+            ignore_file: Pattern file to load (silently skipped if missing)
+            patterns: Extra patterns, applied after the file's
+        """
+        self.patterns: List[str] = []
+        ignore_path = Path(ignore_file)
+        if ignore_path.is_file():
+            with open(ignore_path, 'r', encoding='utf-8') as f:
+                self.patterns.extend(f.read().splitlines())
+        if patterns:
+            self.patterns.extend(patterns)
+        self._compile()
+
+    def add_pattern(self, pattern: str):
+        """Append a pattern (it takes precedence over earlier ones)."""
+        self.patterns.append(pattern)
+        self._compile()
+
+    def _compile(self):
+        rules = [rule for rule in map(_parse_line, self.patterns) if rule]
+        # Directories are tested against every rule, files skip "dir/" rules
+        self._dir_groups = self._group(rules)
+        self._file_groups = self._group([rule for rule in rules if not rule.dir_only])
+
+    @staticmethod
+    def _group(rules: List[_Rule]) -> List[_Group]:
+        """Join runs of same-polarity rules into one regex each, newest first."""
+        groups: List[_Group] = []
+        run: List[str] = []
+        for index, rule in enumerate(rules):
+            run.append(rule.regex)
+            following = rules[index + 1] if index + 1 < len(rules) else None
+            if following is None or following.negated != rule.negated:
+                regex = re.compile('(?:' + '|'.join(run) + r')\Z', re.DOTALL)
+                groups.append(_Group(regex, rule.negated))
+                run = []
+        # Checked last-to-first: the most recent matching pattern wins
+        return groups[::-1]
+
+    @staticmethod
+    def _normalize(path: Union[str, Path]) -> str:
+        path = str(path).replace('\\', '/')
+        while path.startswith('./'):
+            path = path[2:]
+        return path.strip('/')
+
+    def matches(self, relative_path: str, is_dir: bool = False) -> bool:
+        """
+        Check a single normalised path against the patterns.
+
+        Parent directories are NOT checked - this is the cheap per-entry test
+        used while walking a tree top-down (FileScanner prunes ignored
+        directories, so their children are never asked about).
+        """
+        for group in (self._dir_groups if is_dir else self._file_groups):
+            if group.regex.match(relative_path):
+                return not group.negated
+        return False
+
+    def is_ignored(self, path: Union[str, Path], is_dir: bool = False) -> bool:
+        """
+        Check whether a path (relative to the .repoignore root) is ignored.
+
+        A path is ignored if it matches itself or if any parent directory is
+        ignored.
+        """
+        relative_path = self._normalize(path)
+        if not relative_path:
+            return False
+        parts = relative_path.split('/')
+        for depth in range(1, len(parts)):
+            if self.matches('/'.join(parts[:depth]), is_dir=True):
+                return True
+        return self.matches(relative_path, is_dir=is_dir)
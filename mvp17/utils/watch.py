@@ -0,0 +1,63 @@
+"""
+Debounced file-system change collection (watchdog event handler).
+
+Used by `manage_encryption.py watch` (source/ -> encrypted/) and by the hot
+reloader in run_local.py (encrypted/ -> running app): events are gathered
+until the tree has been quiet for a moment, so an editor save or a git
+checkout is handled as one batch.
+"""
+
+import os
+import time
+import threading
+from typing import Set
+
+
+class ChangeCollector:
+    """Watchdog event handler that gathers changed paths for a debounce loop."""
+    
+    # Access-only events never change content
+    IGNORED_EVENTS = ("opened", "closed_no_write")
+    
+    def __init__(self):
+        self.paths = set()
+        self.last_event = 0.0
+        self.lock = threading.Lock()
+        self.pending = threading.Event()
+        self.closed = threading.Event()
+    
+    def dispatch(self, event):
+        if event.event_type in self.IGNORED_EVENTS:
+            return
+        with self.lock:
+            self.paths.add(os.fsdecode(event.src_path))
+            dest_path = getattr(event, 'dest_path', None)
+            if dest_path:
+                self.paths.add(os.fsdecode(dest_path))
+            self.last_event = time.monotonic()
+        self.pending.set()
+    
+    def close(self):
+        """Wake a blocked drain(); from now on it returns no paths."""
+        self.closed.set()
+        self.pending.set()
+    
+    def drain(self, debounce: float) -> Set[str]:
+        """
+        Block until events arrive and then stay quiet for debounce seconds.
+        
+        Returns an empty set, without waiting, once close() has been called.
+        """
+        self.pending.wait()
+        while not self.closed.is_set():
+            with self.lock:
+                remaining = self.last_event + debounce - time.monotonic()
+            if remaining <= 0:
+                break
+            self.closed.wait(remaining)
+        if self.closed.is_set():
+            return set()
+        with self.lock:
+            paths, self.paths = self.paths, set()
+            self.pending.clear()
+        return paths
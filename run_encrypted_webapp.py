@@ -1,9 +1,21 @@
 """
 Launcher script to run the web application from ENCRYPTED code.
 This script loads and executes encrypted Python files.
+
+For multi-worker servers it also exposes the Flask app as a WSGI entry
+point:
+
+    gunicorn --preload -w 4 -b 0.0.0.0:5000 run_encrypted_webapp:app
+
+With --preload the master process unwraps the AES key, decrypts and
+imports web_app.py and its modules, loads the search index and prepares
+the FHE context once, then forks the workers, which share all of it
+copy-on-write. Without --preload every worker does this itself.
 """
 
+import gc
 import sys
+import importlib
 from pathlib import Path
 
 # Add encrypted folder to path
@@ -14,8 +26,10 @@ sys.path.insert(0, str(encrypted_folder))
 source_folder = Path(__file__).parent / "source"
 sys.path.insert(0, str(source_folder))
 
-from crypto.key_manager import KeyManager
-from crypto.file_encryptor import FileEncryptor
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto import encrypted_import
+from mvp17.crypto.fhe_engine import FHEEngine
+from mvp17.utils import hot_reload, jobs, metrics
 
 def run_from_encrypted():
     """Load and execute web_app.py from encrypted folder."""
@@ -33,40 +47,31 @@ def run_from_encrypted():
     
     # Load and decrypt the AES key
     print("🔑 Loading encrypted AES key...")
-    key_manager = KeyManager()
-    if not key_manager.load_private_key():
-        print("❌ Error: Private key not found!")
-        sys.exit(1)
-    
     with open(key_path, 'rb') as f:
         encrypted_key = f.read()
     
-    key = key_manager.decrypt_data(encrypted_key)
+    # Served by the key agent if it is running, else unwrapped with the private key
+    with metrics.span("rsa_unwrap"):
+        key = unwrap_aes_key(encrypted_key)
+    if key is None:
+        print("❌ Error: Private key not found!")
+        sys.exit(1)
+    
+    # Modules imported by web_app.py are decrypted lazily from encrypted/
+    finder = encrypted_import.install(encrypted_folder, key)
     
-    # Check if web_app.py is encrypted
+    # Check if web_app.py is encrypted (loose or in encrypted.pack)
     encrypted_webapp = Path("encrypted/web_app.py.enc")
-    if not encrypted_webapp.exists():
+    if finder.find_spec("web_app") is None:
         print("❌ Error: Encrypted web_app.py not found!")
         print("   Please run encryption first: python source/main.py encrypt")
         sys.exit(1)
     
     print("🔓 Loading encrypted web_app.py...")
     
-    # Decrypt and execute web_app.py
-    from Crypto.Cipher import AES
-    
-    # Read encrypted file
-    with open(encrypted_webapp, 'rb') as f:
-        encrypted_data = f.read()
-    
-    # Extract nonce, tag, and ciphertext
-    nonce = encrypted_data[:16]
-    tag = encrypted_data[16:32]
-    ciphertext = encrypted_data[32:]
-    
-    # Decrypt
-    cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-    decrypted_code = cipher.decrypt_and_verify(ciphertext, tag)
+    # Decrypt and compile web_app.py in memory (or reuse its encrypted bytecode cache)
+    with metrics.span("load_webapp"):
+        webapp_code = finder.get_code("web_app")
     
     print("✅ Decrypted web application code")
     print("🚀 Starting Flask server...")
@@ -79,8 +84,76 @@ def run_from_encrypted():
     print("🛑 Press Ctrl+C to stop the server")
     print()
     
-    # Execute the decrypted code
-    exec(decrypted_code, {'__name__': '__main__', '__file__': str(encrypted_webapp)})
+    # Execute the decrypted code (not as __main__: the launcher starts the
+    # server, on HOST / PORT if web_app.py sets them)
+    namespace = {'__name__': 'web_app', '__file__': str(encrypted_webapp)}
+    exec(webapp_code, namespace)
+    app = hot_reload.find_flask_app(namespace)
+    if app is None:
+        print("❌ Error: web_app.py does not define a Flask app!")
+        sys.exit(1)
+
+    # Background job API (/api/jobs) and Prometheus metrics (/api/metrics)
+    jobs.register_jobs_api(app, key, encrypted_folder, fhe_engine=FHEEngine(cache_key=key))
+    metrics.instrument_flask(app)
+    host, port = hot_reload.server_address(namespace, app, '0.0.0.0', 5000)
+    app.run(host=host, port=port)
+
+
+def create_app():
+    """
+    Build the Flask app from encrypted web_app.py without starting a server.
+    
+    web_app is imported as a regular module (its `if __name__ ==
+    "__main__"` block does not run) and the jobs and metrics APIs are
+    attached directly, since app.run() is never called.
+    
+    Returns:
+        The Flask application
+    
+    Raises:
+        RuntimeError: If the key or the encrypted app can't be loaded
+    """
+    key_path = encrypted_folder / "aes_key.bin"
+    if not key_path.exists():
+        raise RuntimeError(f"Encryption key not found: {key_path}")
+    with open(key_path, 'rb') as f:
+        encrypted_key = f.read()
+    with metrics.span("rsa_unwrap"):
+        key = unwrap_aes_key(encrypted_key)
+    if key is None:
+        raise RuntimeError("Private key not found")
+    
+    finder = encrypted_import.install(encrypted_folder, key)
+    if finder.find_spec("web_app") is None:
+        raise RuntimeError("Encrypted web_app.py not found")
+    with metrics.span("load_webapp"):
+        web_app = importlib.import_module("web_app")
+    
+    application = hot_reload.find_flask_app(vars(web_app))
+    if application is None:
+        raise RuntimeError("web_app.py does not define a Flask app")
+    
+    # Serialized context only - live TenSEAL contexts don't survive fork()
+    fhe_engine = FHEEngine(cache_key=key)
+    fhe_engine.preload()
+    jobs.register_jobs_api(application, key, encrypted_folder, fhe_engine=fhe_engine)
+    metrics.instrument_flask(application)
+    
+    # Everything loaded so far lives as long as the process; move it out of
+    # the collector's reach so collections in forked workers don't write to
+    # (and so un-share) the pages holding it
+    gc.collect()
+    gc.freeze()
+    return application
+
+
+def __getattr__(name):
+    # `run_encrypted_webapp:app` - built on first access, once per process
+    if name == "app":
+        application = globals()['app'] = create_app()
+        return application
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
@@ -1,6 +1,9 @@
 """
 Run web application from ENCRYPTED source code for LOCAL development.
 Even in local development, we run from encrypted code.
+
+Changes to encrypted/ (e.g. from save_encrypted.py) are hot-reloaded into
+the running server - see mvp17/utils/hot_reload.py.
 """
 
 import sys
@@ -10,7 +13,10 @@ from pathlib import Path
 source_folder = Path(__file__).parent / "source"
 sys.path.insert(0, str(source_folder))
 
-from crypto.key_manager import KeyManager
+from mvp17.crypto.key_agent import unwrap_aes_key
+from mvp17.crypto import encrypted_import
+from mvp17.crypto.fhe_engine import FHEEngine
+from mvp17.utils import hot_reload, jobs, metrics
 
 print("\n" + "="*60)
 print("💻 MVP17 - LOCAL Development from ENCRYPTED Code")
@@ -25,6 +31,7 @@ print("📱 Open your browser to: http://localhost:5001")
 print()
 print("⚠️  Note: Running from ENCRYPTED code!")
 print("   Code is decrypted in-memory during execution.")
+print("♻️  Saved edits are hot-reloaded - no restart needed")
 print()
 print("🛑 Press Ctrl+C to stop the server")
 print()
@@ -39,19 +46,22 @@ if not key_path.exists():
 
 # Load and decrypt the AES key
 print("🔑 Loading encrypted AES key...")
-key_manager = KeyManager()
-if not key_manager.load_private_key():
-    print("❌ Error: Private key not found!")
-    sys.exit(1)
-
 with open(key_path, 'rb') as f:
     encrypted_key = f.read()
 
-key = key_manager.decrypt_data(encrypted_key)
+# Served by the key agent if it is running, else unwrapped with the private key
+with metrics.span("rsa_unwrap"):
+    key = unwrap_aes_key(encrypted_key)
+if key is None:
+    print("❌ Error: Private key not found!")
+    sys.exit(1)
+
+# Modules imported by web_app.py are decrypted lazily from encrypted/
+finder = encrypted_import.install(Path(__file__).parent / "encrypted", key)
 
-# Check if web_app.py is encrypted
+# Check if web_app.py is encrypted (loose or in encrypted.pack)
 encrypted_webapp = Path("encrypted/web_app.py.enc")
-if not encrypted_webapp.exists():
+if finder.find_spec("web_app") is None:
     print("❌ Error: Encrypted web_app.py not found!")
     print("   Please encrypt source code first:")
     print("   python manage_encryption.py encrypt")
@@ -59,33 +69,50 @@ if not encrypted_webapp.exists():
 
 print("🔓 Loading encrypted web_app.py...")
 
-# Decrypt and execute web_app.py
-from Crypto.Cipher import AES
-
-# Read encrypted file
-with open(encrypted_webapp, 'rb') as f:
-    encrypted_data = f.read()
-
-# Extract nonce, tag, and ciphertext
-nonce = encrypted_data[:16]
-tag = encrypted_data[16:32]
-ciphertext = encrypted_data[32:]
-
-# Decrypt
-cipher = AES.new(key, AES.MODE_GCM, nonce=nonce)
-decrypted_code = cipher.decrypt_and_verify(ciphertext, tag)
+# Decrypt and compile web_app.py in memory (or reuse its encrypted bytecode cache)
+with metrics.span("load_webapp"):
+    webapp_code = finder.get_code("web_app")
 
 print("✅ Decrypted web application code")
 print("🚀 Starting LOCAL Flask server...")
 print()
 
+# Background job API (/api/jobs) and Prometheus metrics (/api/metrics);
+# the job queue and FHE context outlive hot reloads of the app
+job_manager = jobs.JobManager()
+fhe_engine = FHEEngine(cache_key=key)
+
+
+def setup_app(app):
+    jobs.register_jobs_api(app, key, Path(__file__).parent / "encrypted",
+                           manager=job_manager, fhe_engine=fhe_engine)
+    metrics.instrument_flask(app)
+
+
 # Execute the decrypted code with modified port
-# We'll modify the Flask app to run on port 5001 for local dev
+# We'll modify the Flask app to run on port 5001 for local dev.
+# web_app.py is not run as __main__: the launcher attaches the extra APIs
+# to the app it builds and then starts the server itself, on HOST /
+# LOCAL_DEV_PORT if web_app.py sets them (see hot_reload.server_address).
 exec_globals = {
-    '__name__': '__main__',
+    '__name__': 'web_app',
     '__file__': str(encrypted_webapp),
     'LOCAL_DEV_MODE': True,
     'LOCAL_DEV_PORT': 5001
 }
 
-exec(decrypted_code, exec_globals)
+# Re-decrypt and swap in changed modules while the server runs
+reloader = hot_reload.HotReloader(finder, exec_globals, setup_app)
+
+exec(webapp_code, exec_globals)
+
+app = hot_reload.find_flask_app(exec_globals)
+if app is None:
+    print("❌ Error: web_app.py does not define a Flask app!")
+    sys.exit(1)
+
+setup_app(app)
+reloader.start(app)
+host, port = hot_reload.server_address(exec_globals, app, '127.0.0.1', 5001,
+                                       port_name='LOCAL_DEV_PORT')
+app.run(host=host, port=port)
@@ -0,0 +1,170 @@
+"""
+Tests for delta deployment packages (mvp17/utils/deploy_delta.py).
+"""
+
+import io
+import json
+import shutil
+import tarfile
+
+import pytest
+
+from mvp17.utils.deploy_delta import (
+    DELTA_NAME, MANIFEST_VERSION, PAYLOAD_DIR, DeltaError, _manifest_id, apply_delta,
+    build_manifest, create_delta, load_manifest, verify_package, write_manifest
+)
+
+
+def _package(path, files):
+    """Write a deploy package holding files plus its manifest."""
+    for name, data in files.items():
+        (path / name).parent.mkdir(parents=True, exist_ok=True)
+        (path / name).write_bytes(data)
+    manifest = build_manifest(path)
+    write_manifest(path, manifest)
+    return manifest
+
+
+def _write_delta(path, delta, payload):
+    """Write a delta archive by hand, e.g. one create_delta() would never build."""
+    with tarfile.open(path, 'w:gz') as tar:
+        for name, data in [(DELTA_NAME, json.dumps(delta).encode('utf-8'))] + [
+                (f"{PAYLOAD_DIR}/{name}", data) for name, data in payload.items()]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            tar.addfile(info, io.BytesIO(data))
+    return path
+
+
+@pytest.fixture
+def packages(tmp_path):
+    """(server package at the base version, delta to the target version)."""
+    base_files = {
+        "encrypted/a.enc": b"a" * 100,
+        "encrypted/b.enc": b"b" * 100,
+        "encrypted/old/c.enc": b"c" * 100,
+        "run_encrypted_webapp.py": b"print('launcher')\n",
+    }
+    server = tmp_path / "server"
+    base = _package(server, base_files)
+
+    build = tmp_path / "build"
+    shutil.copytree(server, build)
+    (build / "encrypted/a.enc").write_bytes(b"A" * 120)
+    (build / "encrypted/new.enc").write_bytes(b"n" * 10)
+    shutil.rmtree(build / "encrypted/old")
+    target = build_manifest(build)
+    delta_path = create_delta(build, base, target, tmp_path / "deltas")
+    return server, delta_path, base, target
+
+
+def test_apply_delta(packages):
+    server, delta_path, base, target = packages
+
+    written, removed = apply_delta(server, delta_path)
+
+    assert written == ["encrypted/a.enc", "encrypted/new.enc"]
+    assert removed == ["encrypted/old/c.enc"]
+    assert (server / "encrypted/a.enc").read_bytes() == b"A" * 120
+    assert not (server / "encrypted/old").exists()
+    assert load_manifest(server)['id'] == target['id']
+    assert verify_package(server) == []
+    # Applying it again is a no-op
+    assert apply_delta(server, delta_path) == ([], [])
+
+
+def test_apply_delta_refuses_other_base(packages, tmp_path):
+    server, delta_path, base, target = packages
+    (server / "encrypted/b.enc").write_bytes(b"other")
+    write_manifest(server, build_manifest(server))
+
+    with pytest.raises(DeltaError, match="delta expects"):
+        apply_delta(server, delta_path)
+
+
+def test_apply_delta_refuses_drift(packages):
+    server, delta_path, base, target = packages
+    (server / "encrypted/a.enc").write_bytes(b"edited on the server")
+
+    with pytest.raises(DeltaError, match="encrypted/a.enc"):
+        apply_delta(server, delta_path)
+    assert (server / "encrypted/a.enc").read_bytes() == b"edited on the server"
+    assert load_manifest(server)['id'] == base['id']
+
+    apply_delta(server, delta_path, force=True)
+    assert verify_package(server) == []
+
+
+def _unsafe_delta(tmp_path, base, removed):
+    """A delta that changes encrypted/a.enc and removes the given paths."""
+    files = dict(base['files'])
+    files["encrypted/a.enc"] = {'sha256': "0" * 64, 'size': 1}
+    delta = {'version': MANIFEST_VERSION, 'base': base['id'], 'target': _manifest_id(files),
+             'files': {"encrypted/a.enc": files["encrypted/a.enc"]}, 'removed': removed}
+    return _write_delta(tmp_path / "unsafe.tar.gz", delta, {"encrypted/a.enc": b"x"})
+
+
+@pytest.mark.parametrize("name", ["../escape", "/etc/passwd", "encrypted/../../escape",
+                                  "deploy_manifest.json", "", "."])
+def test_apply_delta_rejects_unsafe_path_before_touching_files(packages, tmp_path, name):
+    server, delta_path, base, target = packages
+
+    with pytest.raises(DeltaError, match="Unsafe path"):
+        apply_delta(server, _unsafe_delta(tmp_path, base, [name]))
+
+    assert (server / "encrypted/a.enc").read_bytes() == b"a" * 100
+    assert load_manifest(server)['id'] == base['id']
+    assert verify_package(server) == []
+
+
+def test_apply_delta_rejects_unsafe_payload_path(packages, tmp_path):
+    server, delta_path, base, target = packages
+    files = dict(base['files'])
+    files["../escape"] = {'sha256': "0" * 64, 'size': 1}
+    delta = {'version': MANIFEST_VERSION, 'base': base['id'], 'target': _manifest_id(files),
+             'files': {"../escape": files["../escape"]}, 'removed': []}
+
+    with pytest.raises(DeltaError, match="Unsafe path"):
+        apply_delta(server, _write_delta(tmp_path / "unsafe.tar.gz", delta, {"../escape": b"x"}))
+    assert not (tmp_path / "escape").exists()
+
+
+def test_apply_delta_rejects_corrupt_payload(packages, tmp_path):
+    server, delta_path, base, target = packages
+    with tarfile.open(delta_path, 'r:gz') as tar:
+        delta = json.load(tar.extractfile(DELTA_NAME))
+        payload = {name[len(PAYLOAD_DIR) + 1:]: tar.extractfile(name).read()
+                   for name in tar.getnames() if name.startswith(PAYLOAD_DIR + "/")}
+    payload["encrypted/new.enc"] = b"N" * 10
+
+    with pytest.raises(DeltaError, match="Corrupt file in delta: encrypted/new.enc"):
+        apply_delta(server, _write_delta(tmp_path / "corrupt.tar.gz", delta, payload))
+
+    assert (server / "encrypted/a.enc").read_bytes() == b"a" * 100
+    assert not (server / "encrypted/new.enc").exists()
+    assert load_manifest(server)['id'] == base['id']
+    assert verify_package(server) == []
+
+
+@pytest.mark.parametrize("content", [b"not a tar archive", None])
+def test_apply_delta_rejects_unreadable_archive(packages, tmp_path, content):
+    server, delta_path, base, target = packages
+    broken = tmp_path / "broken.tar.gz"
+    if content is None:
+        # Truncated mid-payload
+        broken.write_bytes(delta_path.read_bytes()[:-40])
+    else:
+        broken.write_bytes(content)
+
+    with pytest.raises(DeltaError):
+        apply_delta(server, broken)
+    assert load_manifest(server)['id'] == base['id']
+    assert verify_package(server) == []
+
+
+def test_apply_delta_rejects_malformed_delta_json(packages, tmp_path):
+    server, delta_path, base, target = packages
+    delta = {'base': base['id'], 'target': target['id'], 'files': [], 'removed': []}
+
+    with pytest.raises(DeltaError, match="malformed"):
+        apply_delta(server, _write_delta(tmp_path / "bad.tar.gz", delta, {}))
@@ -0,0 +1,367 @@
+"""
+Tests for the .enc formats of FileEncryptor (mvp17/crypto/file_encryptor.py).
+"""
+
+import os
+import lzma
+import zlib
+
+import pytest
+from Crypto.Cipher import AES
+
+from mvp17.crypto.file_encryptor import (
+    _HEADER, CIPHER_CHACHA20_POLY1305, CIPHER_SHIFT, CIPHERS, CODEC_LZMA,
+    CODEC_LZMA_SEGMENTS, CODEC_MASK, CODEC_NONE, CODEC_ZLIB, CODEC_ZLIB_SEGMENTS, CODECS,
+    FORMAT_V2, HEADER_SIZE, LZMA_MIN_SIZE, MAGIC, NONCE_PREFIX_SIZE, SAMPLE_SIZE, TAG_SIZE,
+    FileEncryptor, available_backends
+)
+
+
+KEY = bytes(range(32))
+SEGMENT = 64
+
+# Empty, shorter than / exactly / just over one segment, several segments
+SIZES = [0, 1, SEGMENT - 1, SEGMENT, SEGMENT + 1, 3 * SEGMENT, 4 * SEGMENT + 10]
+
+
+def _data(size):
+    return os.urandom(size)
+
+
+def _v1_blob(data, key=KEY):
+    """A file in the legacy layout: [nonce (16)][tag (16)][ciphertext]."""
+    nonce = os.urandom(16)
+    ciphertext, tag = AES.new(key, AES.MODE_GCM, nonce=nonce).encrypt_and_digest(data)
+    return nonce + tag + ciphertext
+
+
+def _encryptor(**kwargs):
+    kwargs.setdefault('compression', "none")
+    return FileEncryptor(KEY, segment_size=SEGMENT, **kwargs)
+
+
+# ----------------------------------------------------------------------
+# Round trips
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("size", SIZES)
+def test_v2_round_trip(size):
+    data = _data(size)
+    encryptor = _encryptor()
+
+    blob = encryptor.encrypt_bytes(data)
+
+    assert blob.startswith(b"MVP17ENC")
+    assert encryptor.decrypt_bytes(blob) == data
+
+
+def test_v2_file_round_trip(tmp_path):
+    data = _data(5 * SEGMENT + 3)
+    (tmp_path / "plain.py").write_bytes(data)
+    encryptor = _encryptor()
+
+    assert encryptor.encrypt_file(tmp_path / "plain.py", tmp_path / "plain.py.enc") == len(data)
+    assert encryptor.decrypt_file(tmp_path / "plain.py.enc", tmp_path / "out.py") == len(data)
+    assert (tmp_path / "out.py").read_bytes() == data
+    assert encryptor.read_file(tmp_path / "plain.py.enc") == data
+    assert encryptor.plaintext_size(tmp_path / "plain.py.enc") == len(data)
+
+
+@pytest.mark.parametrize("size", [0, 1, 100, 200 * 1024])
+def test_v1_files_are_still_read(tmp_path, size):
+    data = _data(size)
+    path = tmp_path / "legacy.py.enc"
+    path.write_bytes(_v1_blob(data))
+    encryptor = FileEncryptor(KEY)
+
+    assert encryptor.detect_format(path.read_bytes()[:HEADER_SIZE]) == 1
+    assert encryptor.decrypt_bytes(path.read_bytes()) == data
+    assert encryptor.read_file(path) == data
+    assert encryptor.plaintext_size(path) == size
+    assert encryptor.read_range(path, size // 2, 10) == data[size // 2:size // 2 + 10]
+    encryptor.decrypt_file(path, tmp_path / "out.py")
+    assert (tmp_path / "out.py").read_bytes() == data
+
+
+def test_v1_tampering_is_detected(tmp_path):
+    blob = bytearray(_v1_blob(_data(100)))
+    blob[-1] ^= 1
+
+    with pytest.raises(ValueError):
+        FileEncryptor(KEY).decrypt_bytes(bytes(blob))
+    # decrypt_file() never leaves unauthenticated plaintext behind
+    (tmp_path / "legacy.py.enc").write_bytes(bytes(blob))
+    with pytest.raises(ValueError):
+        FileEncryptor(KEY).decrypt_file(tmp_path / "legacy.py.enc", tmp_path / "out.py")
+    assert not (tmp_path / "out.py").exists()
+
+
+# ----------------------------------------------------------------------
+# Random access
+# ----------------------------------------------------------------------
+
+RANGES = [
+    (0, 0), (0, 1), (0, SEGMENT), (SEGMENT - 1, 1), (SEGMENT - 1, 2),
+    (SEGMENT, SEGMENT), (SEGMENT, 1), (2 * SEGMENT - 1, SEGMENT + 2),
+    (0, 4 * SEGMENT + 10), (4 * SEGMENT, 10), (4 * SEGMENT + 9, 1),
+    (4 * SEGMENT + 5, 100),     # clipped at the end
+    (4 * SEGMENT + 10, 5),      # starts at the end
+    (10 * SEGMENT, 5),          # starts past the end
+]
+
+
+@pytest.mark.parametrize("offset,length", RANGES)
+def test_read_range_at_segment_boundaries(tmp_path, offset, length):
+    data = _data(4 * SEGMENT + 10)
+    path = tmp_path / "data.enc"
+    path.write_bytes(_encryptor().encrypt_bytes(data))
+
+    assert _encryptor().read_range(path, offset, length) == data[offset:offset + length]
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_plaintext_size(tmp_path, size):
+    path = tmp_path / "data.enc"
+    path.write_bytes(_encryptor().encrypt_bytes(_data(size)))
+
+    assert _encryptor().plaintext_size(path) == size
+
+
+def test_read_range_rejects_negative_arguments(tmp_path):
+    path = tmp_path / "data.enc"
+    path.write_bytes(_encryptor().encrypt_bytes(b"x" * 10))
+
+    with pytest.raises(ValueError):
+        _encryptor().read_range(path, -1, 5)
+
+
+# ----------------------------------------------------------------------
+# Tamper detection
+# ----------------------------------------------------------------------
+
+def _segments(blob):
+    """Split an uncompressed v2 blob into (header, [stored segments])."""
+    step = SEGMENT + TAG_SIZE
+    body = blob[HEADER_SIZE:]
+    return blob[:HEADER_SIZE], [body[i:i + step] for i in range(0, len(body), step)]
+
+
+def _flip(blob, position):
+    blob = bytearray(blob)
+    blob[position] ^= 0x01
+    return bytes(blob)
+
+
+@pytest.mark.parametrize("position", [
+    0,                              # magic: read as v1, fails
+    9,                              # flags
+    12,                             # segment size
+    HEADER_SIZE - 1,                # nonce prefix
+    HEADER_SIZE,                    # first ciphertext byte
+    HEADER_SIZE + SEGMENT,          # first tag
+    HEADER_SIZE + SEGMENT + TAG_SIZE + 5,   # second segment
+    -1,                             # last tag
+])
+def test_flipped_bit_is_detected(position):
+    encryptor = _encryptor()
+    blob = encryptor.encrypt_bytes(_data(3 * SEGMENT + 5))
+
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(_flip(blob, position))
+
+
+def test_reordered_dropped_and_truncated_segments_are_detected():
+    encryptor = _encryptor()
+    header, segments = _segments(encryptor.encrypt_bytes(_data(3 * SEGMENT + 5)))
+
+    swapped = header + segments[1] + segments[0] + b"".join(segments[2:])
+    dropped_middle = header + segments[0] + b"".join(segments[2:])
+    dropped_last = header + b"".join(segments[:-1])
+    truncated = header + b"".join(segments)[:-1]
+    appended = header + b"".join(segments) + segments[-1]
+    for blob in (swapped, dropped_middle, dropped_last, truncated, appended, header):
+        with pytest.raises(ValueError):
+            encryptor.decrypt_bytes(blob)
+
+
+def test_segments_spliced_from_another_file_are_detected():
+    encryptor = _encryptor()
+    header_a, segments_a = _segments(encryptor.encrypt_bytes(_data(2 * SEGMENT + 5)))
+    _, segments_b = _segments(encryptor.encrypt_bytes(_data(2 * SEGMENT + 5)))
+
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(header_a + segments_b[0] + b"".join(segments_a[1:]))
+
+
+def test_wrong_key_is_detected():
+    blob = _encryptor().encrypt_bytes(_data(100))
+
+    with pytest.raises(ValueError):
+        FileEncryptor(os.urandom(32), segment_size=SEGMENT).decrypt_bytes(blob)
+
+
+def test_read_range_authenticates_the_segments_it_reads(tmp_path):
+    data = _data(4 * SEGMENT)
+    path = tmp_path / "data.enc"
+    path.write_bytes(_flip(_encryptor().encrypt_bytes(data), HEADER_SIZE + 2 * (SEGMENT + TAG_SIZE)))
+    encryptor = _encryptor()
+
+    # Untouched segments still read; the tampered one does not
+    assert encryptor.read_range(path, 0, SEGMENT) == data[:SEGMENT]
+    with pytest.raises(ValueError):
+        encryptor.read_range(path, 2 * SEGMENT, 1)
+
+
+def test_decrypt_file_leaves_no_output_on_failure(tmp_path):
+    encryptor = _encryptor()
+    blob = encryptor.encrypt_bytes(_data(3 * SEGMENT))
+    (tmp_path / "data.enc").write_bytes(_flip(blob, -1))
+
+    with pytest.raises(ValueError):
+        encryptor.decrypt_file(tmp_path / "data.enc", tmp_path / "out")
+    assert not (tmp_path / "out").exists()
+
+
+# ----------------------------------------------------------------------
+# Compression
+# ----------------------------------------------------------------------
+
+CODEC_NAMES = sorted(CODECS)
+
+
+def _text(size):
+    """Compressible plaintext with some random bytes mixed in."""
+    lines = b"".join(b"value_%d = compute(%d)  # %s\n" % (i, i * 7, os.urandom(2).hex().encode())
+                     for i in range(size // 20 + 1))
+    return lines[:size]
+
+
+def _stream_codec_blob(encryptor, data, codec):
+    """A v2 file in an old whole-stream codec layout (read-only today)."""
+    prefix = os.urandom(NONCE_PREFIX_SIZE)
+    header = _HEADER.pack(MAGIC, FORMAT_V2, codec, SEGMENT, prefix)
+    stream = zlib.compress(data) if codec == CODEC_ZLIB else lzma.compress(data)
+    chunks = [stream[i:i + SEGMENT] for i in range(0, len(stream), SEGMENT)]
+    return header + b"".join(encryptor._seal_segment(header, prefix, index,
+                                                     index == len(chunks) - 1, chunk)
+                             for index, chunk in enumerate(chunks))
+
+
+@pytest.mark.parametrize("compression", CODEC_NAMES)
+@pytest.mark.parametrize("size", SIZES)
+def test_codec_round_trip(tmp_path, compression, size):
+    data = _text(size)
+    encryptor = _encryptor(compression=compression)
+    blob = encryptor.encrypt_bytes(data)
+    path = tmp_path / "data.enc"
+    path.write_bytes(blob)
+
+    assert blob[9] & CODEC_MASK == CODECS[compression]
+    assert encryptor.decrypt_bytes(blob) == data
+    assert encryptor.read_file(path) == data
+    assert encryptor.plaintext_size(path) == size
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+def test_compression_shrinks_text(compression):
+    data = _text(64 * 1024)
+    blob = FileEncryptor(KEY, compression=compression).encrypt_bytes(data)
+
+    assert len(blob) < len(data) // 2
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+@pytest.mark.parametrize("offset,length", RANGES)
+def test_compressed_read_range_at_segment_boundaries(tmp_path, compression, offset, length):
+    data = _text(4 * SEGMENT + 10)
+    path = tmp_path / "data.enc"
+    path.write_bytes(_encryptor(compression=compression).encrypt_bytes(data))
+
+    assert _encryptor().read_range(path, offset, length) == data[offset:offset + length]
+
+
+@pytest.mark.parametrize("codec", [CODEC_ZLIB, CODEC_LZMA])
+def test_stream_codec_files_are_still_read(tmp_path, codec):
+    data = _text(20 * SEGMENT)
+    encryptor = _encryptor()
+    path = tmp_path / "data.enc"
+    path.write_bytes(_stream_codec_blob(encryptor, data, codec))
+
+    assert encryptor.decrypt_bytes(path.read_bytes()) == data
+    assert encryptor.plaintext_size(path) == len(data)
+    assert encryptor.read_range(path, SEGMENT - 3, SEGMENT) == data[SEGMENT - 3:2 * SEGMENT - 3]
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(_flip(path.read_bytes(), -1))
+
+
+@pytest.mark.parametrize("sample,size_hint,codec", [
+    (b"", None, CODEC_NONE),
+    (b"short", None, CODEC_NONE),
+    (None, None, CODEC_ZLIB_SEGMENTS),
+    (None, LZMA_MIN_SIZE, CODEC_LZMA_SEGMENTS),
+])
+def test_auto_codec_choice(sample, size_hint, codec):
+    if sample is None:
+        sample = _text(SAMPLE_SIZE)
+
+    assert FileEncryptor(KEY).choose_codec(sample, size_hint) == codec
+
+
+def test_auto_codec_skips_incompressible_data():
+    assert FileEncryptor(KEY).choose_codec(os.urandom(SAMPLE_SIZE)) == CODEC_NONE
+
+
+@pytest.mark.parametrize("compression", ["zlib", "lzma"])
+def test_compressed_tampering_is_detected(compression):
+    encryptor = _encryptor(compression=compression)
+    blob = encryptor.encrypt_bytes(_text(3 * SEGMENT + 5))
+
+    # Length prefix of the first segment, its ciphertext, the last tag, a truncation
+    for tampered in (_flip(blob, HEADER_SIZE + 3), _flip(blob, HEADER_SIZE + 6),
+                     _flip(blob, -1), blob[:-1], blob[:HEADER_SIZE + 2]):
+        with pytest.raises(ValueError):
+            encryptor.decrypt_bytes(tampered)
+
+
+# ----------------------------------------------------------------------
+# Ciphers and backends
+# ----------------------------------------------------------------------
+
+@pytest.mark.parametrize("backend", available_backends())
+@pytest.mark.parametrize("cipher", sorted(CIPHERS))
+@pytest.mark.parametrize("compression", CODEC_NAMES)
+def test_cipher_round_trip(tmp_path, backend, cipher, compression):
+    data = _text(3 * SEGMENT + 5)
+    encryptor = _encryptor(compression=compression, cipher=cipher, backend=backend)
+    blob = encryptor.encrypt_bytes(data)
+    path = tmp_path / "data.enc"
+    path.write_bytes(blob)
+
+    assert blob[9] >> CIPHER_SHIFT == CIPHERS[cipher]
+    assert encryptor.decrypt_bytes(blob) == data
+    assert encryptor.read_range(path, SEGMENT - 1, 2) == data[SEGMENT - 1:SEGMENT + 1]
+    # Readers follow the header, whatever cipher they write
+    assert _encryptor(cipher="aes-256-gcm").decrypt_bytes(blob) == data
+    with pytest.raises(ValueError):
+        encryptor.decrypt_bytes(_flip(blob, HEADER_SIZE + 8))
+
+
+@pytest.mark.parametrize("cipher", sorted(CIPHERS))
+def test_backends_are_interchangeable(cipher):
+    backends = available_backends()
+    if len(backends) < 2:
+        pytest.skip("needs both cryptography and pycryptodome")
+    data = _text(3 * SEGMENT + 5)
+
+    for writer in backends:
+        blob = _encryptor(cipher=cipher, backend=writer).encrypt_bytes(data)
+        for reader in backends:
+            assert _encryptor(backend=reader).decrypt_bytes(blob) == data
+
+
+def test_cipher_flag_is_authenticated():
+    blob = bytearray(_encryptor(cipher="aes-256-gcm").encrypt_bytes(_data(100)))
+    blob[9] |= CIPHER_CHACHA20_POLY1305 << CIPHER_SHIFT
+
+    with pytest.raises(ValueError):
+        _encryptor().decrypt_bytes(bytes(blob))
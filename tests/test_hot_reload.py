@@ -0,0 +1,80 @@
+"""
+Tests for stopping the hot reloader (mvp17/utils/hot_reload.py, mvp17/utils/watch.py).
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from mvp17.utils.hot_reload import HotReloader
+from mvp17.utils.watch import ChangeCollector
+
+pytest.importorskip("watchdog")
+
+
+def test_close_wakes_drain():
+    collector = ChangeCollector()
+    result = []
+    thread = threading.Thread(target=lambda: result.append(collector.drain(0.1)))
+    thread.start()
+
+    collector.close()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert result == [set()]
+
+
+def test_close_interrupts_debounce():
+    collector = ChangeCollector()
+    collector.dispatch(SimpleNamespace(event_type="modified", src_path="a.py.enc"))
+    threading.Timer(0.05, collector.close).start()
+
+    start = time.monotonic()
+    assert collector.drain(60) == set()
+    assert time.monotonic() - start < 5
+
+
+class _RecordingReloader(HotReloader):
+    def reload(self, paths):
+        self.reloads.append(set(paths))
+        return []
+
+
+def _reloader(tmp_path, debounce):
+    reloader = _RecordingReloader(SimpleNamespace(encrypted_dir=tmp_path), {}, debounce=debounce)
+    reloader.reloads = []
+    return reloader
+
+
+def test_stop_drops_queued_events(tmp_path):
+    reloader = _reloader(tmp_path, debounce=0.5)
+    reloader.start(app=None)
+    thread = reloader._thread
+
+    (tmp_path / "web_app.py.enc").write_bytes(b"changed")
+    time.sleep(0.2)  # delivered, still inside the debounce window
+    reloader.stop()
+
+    assert not thread.is_alive()
+    time.sleep(0.5)
+    assert reloader.reloads == []
+
+
+def test_restart_leaves_no_thread_behind(tmp_path):
+    reloader = _reloader(tmp_path, debounce=0.05)
+    reloader.start(app=None)
+    first = reloader._thread
+    reloader.stop()
+    reloader.start(app=None)
+
+    assert not first.is_alive()
+    (tmp_path / "web_app.py.enc").write_bytes(b"changed")
+    deadline = time.monotonic() + 5
+    while not reloader.reloads and time.monotonic() < deadline:
+        time.sleep(0.05)
+    reloader.stop()
+
+    assert reloader.reloads
@@ -0,0 +1,102 @@
+"""
+Tests for the .repoignore matcher (mvp17/utils/repoignore.py), checked
+against `git check-ignore` on the same patterns and tree.
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from mvp17.utils.repoignore import RepoIgnore
+
+pytestmark = pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+
+
+PATTERN_SETS = {
+    "basic": ["*.pyc", "build/", "/root_only.txt", "secret?.key", "[abc].txt"],
+    "anchoring": ["docs/*.md", "/top/", "nested/deep.txt", "*.d/"],
+    "double_star": ["**/logs", "a/**/z.txt", "cache/**", "**/tmp/*.bin"],
+    "negation": ["*.log", "!important.log", "temp/", "!temp/keep.txt", "out/*", "!out/keep/"],
+    "escapes": ["\\#hash", "\\!bang", "trailing   ", "# comment", "", "space\\ "],
+    "dir_only_vs_file": ["data/", "report", "!report/inner.txt"],
+}
+
+# Files to create; their parent directories are checked as directories
+FILES = [
+    "x.pyc", "src/x.pyc", "keep.pyc", "build/out.o", "src/build/out.o", "src/build.py",
+    "root_only.txt", "src/root_only.txt", "secret1.key", "secret12.key", "a.txt", "d.txt",
+    "docs/readme.md", "docs/sub/readme.md", "other/docs/readme.md", "top/file.py",
+    "src/top/file.py", "nested/deep.txt", "src/nested/deep.txt", "conf.d/x", "conf.d.py",
+    "logs/today", "src/logs", "src/app/logs/today", "a/z.txt", "a/b/z.txt", "a/b/c/z.txt",
+    "b/a/z.txt", "cache/x/y", "cache.py", "tmp/x.bin", "src/tmp/x.bin", "src/tmp/x/y.bin",
+    "debug.log", "src/important.log", "important.log", "temp/keep.txt", "temp/other.txt",
+    "out/file.txt", "out/keep/file.txt", "out/drop/file.txt", "#hash", "!bang", "trailing",
+    "space ", "data/file", "src/data", "report", "report2/inner.txt", "src/report/inner.txt",
+]
+
+
+def _git_ignored(root, paths):
+    """Paths git check-ignore reports as ignored (negated matches are not)."""
+    result = subprocess.run(
+        ["git", "-c", "core.quotePath=false", "check-ignore", "--no-index", "--stdin", "-z"],
+        cwd=root, input="\0".join(paths) + "\0", capture_output=True, text=True)
+    if result.returncode not in (0, 1):
+        raise RuntimeError(result.stderr)
+    return {path for path in result.stdout.split("\0") if path}
+
+
+@pytest.fixture(params=sorted(PATTERN_SETS))
+def tree(request, tmp_path):
+    """(root, patterns, {path: is_dir}) for a git repo holding FILES."""
+    subprocess.run(["git", "init", "-q", str(tmp_path)], check=True)
+    patterns = PATTERN_SETS[request.param]
+    (tmp_path / ".gitignore").write_text("\n".join(patterns) + "\n", encoding="utf-8")
+    (tmp_path / ".repoignore").write_text("\n".join(patterns) + "\n", encoding="utf-8")
+
+    paths = {}
+    for name in FILES:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_text("x", encoding="utf-8")
+        paths[name] = False
+        parts = name.split("/")
+        for depth in range(1, len(parts)):
+            paths.setdefault("/".join(parts[:depth]), True)
+    return tmp_path, patterns, paths
+
+
+def test_matches_git_check_ignore(tree):
+    root, patterns, paths = tree
+    ignore = RepoIgnore(root / ".repoignore")
+
+    expected = _git_ignored(root, sorted(paths))
+    actual = {path for path, is_dir in paths.items() if ignore.is_ignored(path, is_dir=is_dir)}
+
+    assert actual == expected
+
+
+def test_patterns_argument_matches_ignore_file(tree):
+    root, patterns, paths = tree
+    from_file = RepoIgnore(root / ".repoignore")
+    from_args = RepoIgnore(root / "missing", patterns=patterns)
+
+    for path, is_dir in paths.items():
+        assert from_args.is_ignored(path, is_dir) == from_file.is_ignored(path, is_dir)
+
+
+def test_normalizes_paths():
+    ignore = RepoIgnore("missing", patterns=["build/"])
+
+    assert ignore.is_ignored("./build/x.o")
+    assert ignore.is_ignored("build\\x.o")
+    assert ignore.is_ignored("build/", is_dir=True)
+    assert not ignore.is_ignored("")
+    assert not ignore.is_ignored(".")
+
+
+def test_add_pattern_takes_precedence():
+    ignore = RepoIgnore("missing", patterns=["*.log"])
+    ignore.add_pattern("!keep.log")
+
+    assert ignore.is_ignored("drop.log")
+    assert not ignore.is_ignored("keep.log")